@@ -0,0 +1,70 @@
+"""
+Benchmark of the generation of the source of a model by Author.
+
+Generates the source of chains of residual blocks (linear then add) of 1k and 10k runs, in memory, and reports:
+    - the time of the generation (lines emitted once into a buffer),
+    - the time the whitespace regex pass that the generation used to end with would add on the same source.
+
+Run from the root of the repository with:
+    PYTHONPATH=src python benchmarks/bench_author.py
+"""
+import logging
+import re
+import time
+
+from Base.author import Author
+from Base.modelskeleton import ModelSkeleton
+
+from common import ADD_PROPS, LINEAR_PROPS, make_template
+
+RUNS_SIZES = [1_000, 10_000]
+N_SUBMODELS = 50
+N_REPEATS = 5
+
+
+def residual_skeleton(n_runs):
+    """
+    :return: A chain of n_runs / 2 residual blocks, cycling through N_SUBMODELS linear and add submodels.
+    """
+    submodels = {}
+    for i in range(N_SUBMODELS):
+        submodels[f"linear{i}"] = make_template(LINEAR_PROPS)
+        submodels[f"add{i}"] = make_template(ADD_PROPS)
+    runs = []
+    previous = [-1, "x"]
+    for i in range(n_runs // 2):
+        runs.append({"id": f"linear{i % N_SUBMODELS}", "inputs": {"X": list(previous)}})
+        runs.append({"id": f"add{i % N_SUBMODELS}", "inputs": {"X1": list(previous), "X2": [len(runs) - 1, "Y"]}})
+        previous = [len(runs) - 1, "Y"]
+    return ModelSkeleton(submodels, runs, {"y": previous}, inputs=["x"])
+
+
+def generation_time(author):
+    best = float("inf")
+    for _ in range(N_REPEATS):
+        author.source = None
+        start = time.perf_counter()
+        author.generate()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def regex_time(source):
+    start = time.perf_counter()
+    re.sub(r" +", " ", source)
+    return time.perf_counter() - start
+
+
+def main():
+    logging.disable(logging.INFO)
+    print(f"{'runs':>8} {'lines':>8} {'generation (s)':>15} {'regex pass (s)':>15}")
+    for n_runs in RUNS_SIZES:
+        author = Author("residual", residual_skeleton(n_runs), export=False)
+        generation = generation_time(author)
+        compile(author.source, "<residual>", "exec")
+        n_lines = author.source.count("\n")
+        print(f"{n_runs:>8} {n_lines:>8} {generation:>15.4f} {regex_time(author.source):>15.4f}")
+
+
+if __name__ == "__main__":
+    main()
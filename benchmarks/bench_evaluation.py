@@ -0,0 +1,136 @@
+"""
+Scaling benchmark of the EvaluationEngine.
+
+Evaluates a population of random residual skeletons (solving, generation, loading and a few training steps per
+candidate) in the current process, then on pools of 1 to N_CPUS worker processes, and reports the speedup over the
+current process and the parallel efficiency (speedup / workers).
+
+Run from the root of the repository with:
+    PYTHONPATH=src python benchmarks/bench_evaluation.py
+"""
+import copy
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+
+import torch
+
+from Base.evaluationengine import EvaluationEngine
+from Base.modelskeleton import ModelSkeleton
+
+from common import ADD_PROPS, LINEAR_PROPS, make_template
+
+POPULATION_SIZE = 64
+N_TRAINING_STEPS = 20
+TEMPLATES_PACKAGE = "bench_templates"
+TEMPLATES_SOURCES = {
+    "Linear": """import torch
+class Linear(torch.nn.Module):
+    def __init__(self, input_dim, output_dim, device='cpu', dtype=torch.float32):
+        super().__init__()
+        self.linear = torch.nn.Linear(input_dim, output_dim, device=device, dtype=dtype)
+    def forward(self, X):
+        return {"Y": torch.relu(self.linear(X["X"]))}
+""",
+    "Add": """import torch
+class Add(torch.nn.Module):
+    def __init__(self, device='cpu', dtype=torch.float32):
+        super().__init__()
+    def forward(self, X):
+        return {"Y": X["X1"] + X["X2"]}
+""",
+}
+# the training data have 64 features
+WIDE_LINEAR_PROPS = dict(copy.deepcopy(LINEAR_PROPS), parameters={
+    "input_dim": {"type": "int", "default": 64}, "output_dim": {"type": "int", "default": 64}})
+
+
+def write_templates(directory):
+    package = os.path.join(directory, TEMPLATES_PACKAGE)
+    os.mkdir(package)
+    open(os.path.join(package, "__init__.py"), "w").close()
+    for name, source in TEMPLATES_SOURCES.items():
+        with open(os.path.join(package, name + ".py"), "w") as file:
+            file.write(source)
+
+
+def template(props):
+    return make_template(dict(copy.deepcopy(props), source=TEMPLATES_PACKAGE))
+
+
+def random_skeleton(rng, n_runs):
+    submodels = {}
+    runs = []
+    for run_id in range(n_runs):
+        sources = [[-1, "x"]] + [[i, "Y"] for i in range(run_id)]
+        if run_id and rng.random() < 0.3:
+            submodels[f"add{run_id}"] = template(ADD_PROPS)
+            runs.append({"id": f"add{run_id}", "inputs": {"X1": list(rng.choice(sources)),
+                                                         "X2": list(rng.choice(sources))}})
+        else:
+            submodels[f"linear{run_id}"] = template(WIDE_LINEAR_PROPS)
+            runs.append({"id": f"linear{run_id}", "inputs": {"X": list(rng.choice(sources[-3:]))}})
+    skeleton = ModelSkeleton(submodels, runs, {"y": [n_runs - 1, "Y"]}, inputs=["x"])
+    skeleton.prune_unused()
+    return skeleton
+
+
+def training_score(model, skeleton):
+    """
+    :return: The loss after a few training steps on random data.
+    """
+    generator = torch.Generator().manual_seed(0)
+    x = torch.randn(32, 64, generator=generator)
+    target = torch.randn(32, 64, generator=generator)
+    parameters = list(model.parameters())
+    optimizer = torch.optim.SGD(parameters, lr=1e-3) if parameters else None
+    loss = None
+    for _ in range(N_TRAINING_STEPS):
+        loss = torch.nn.functional.mse_loss(model({"x": x})["y"], target)
+        if optimizer is not None:
+            optimizer.zero_grad()
+            loss.backward()
+            optimizer.step()
+    return loss.item()
+
+
+def run(engine, skeletons):
+    with engine:
+        start = time.perf_counter()
+        results = engine.evaluate(skeletons)
+        duration = time.perf_counter() - start
+    errors = [result.error for result in results if result.error is not None]
+    if errors:
+        raise Exception(f"{len(errors)} evaluations failed, first error: {errors[0]}")
+    return duration
+
+
+def main():
+    logging.disable(logging.INFO)
+    torch.set_num_threads(1)
+    n_cpus = os.cpu_count() or 1
+    with tempfile.TemporaryDirectory() as directory:
+        write_templates(directory)
+        sys.path.insert(0, directory)
+        rng = random.Random(0)
+        skeletons = [random_skeleton(rng, rng.randint(10, 40)) for _ in range(POPULATION_SIZE)]
+
+        # first evaluation in the current process, to import and initialize everything before the measures
+        run(EvaluationEngine(0, score=training_score), skeletons[:4])
+        reference = run(EvaluationEngine(0, score=training_score), skeletons)
+        print(f"{POPULATION_SIZE} candidates, {n_cpus} CPUs (seconds)")
+        print(f"{'current process':>16}: {reference:.2f}")
+        workers = 1
+        while workers <= n_cpus:
+            engine = EvaluationEngine(workers, score=training_score, sys_paths=[directory])
+            duration = run(engine, skeletons)
+            speedup = reference / duration
+            print(f"{f'{workers} workers':>16}: {duration:.2f} (x{speedup:.2f}, efficiency {speedup / workers:.0%})")
+            workers *= 2
+
+
+if __name__ == "__main__":
+    main()
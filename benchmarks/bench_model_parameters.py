@@ -0,0 +1,75 @@
+"""
+Benchmark of the full and incremental solving of ModelParameters.
+
+For skeletons of 10 to 500 runs, a child is derived from a solved parent by adding one run, and the time to build its
+ModelParameters from scratch is compared with the time to derive it from the parent.
+
+Run from the root of the repository with:
+    PYTHONPATH=src python benchmarks/bench_model_parameters.py
+"""
+import copy
+import random
+import time
+
+from Base.modelskeleton import ModelSkeleton
+from Base.modelproperties import ModelParameters
+
+from common import CONCAT_PROPS, HEADS_PROPS, LINEAR_PROPS, make_template
+
+SIZES = [10, 50, 100, 250, 500]
+REPEATS = 3
+
+
+def chain_skeleton(rng, n_runs):
+    """
+    A chain of linear runs, with a concat run every few runs merging two branches, and a few heads runs.
+    Each run uses its own submodel.
+    """
+    submodels = {}
+    runs = []
+    for i in range(n_runs):
+        if i > 1 and i % 5 == 0:
+            submodels[f"concat{i}"] = make_template(CONCAT_PROPS)
+            runs.append({"id": f"concat{i}", "inputs": {"X1": [i - 1, "Y"], "X2": [rng.randrange(i - 1), "Y"]}})
+        elif i % 50 == 25:
+            submodels[f"heads{i}"] = make_template(HEADS_PROPS)
+            runs.append({"id": f"heads{i}", "inputs": {"X": [i - 1, "Y"]}})
+        else:
+            submodels[f"linear{i}"] = make_template(LINEAR_PROPS)
+            runs.append({"id": f"linear{i}", "inputs": {"X": [i - 1, "Y"] if i else [-1, "x"]}})
+    return ModelSkeleton(submodels, runs, {"y": [n_runs - 1, "Y"]})
+
+
+def add_one_run(skeleton):
+    child = ModelSkeleton(dict(skeleton.submodels), copy.deepcopy(skeleton.runs), copy.deepcopy(skeleton.outputs))
+    model_id = f"linear{len(child.runs)}"
+    child.submodels[model_id] = make_template(LINEAR_PROPS)
+    child.outputs["y"][0] = child.add_run({"id": model_id, "inputs": {"X": [len(child.runs) - 1, "Y"]}})
+    child.inputs = child.find_inputs()
+    return child
+
+
+def best_time(function):
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    rng = random.Random(0)
+    print(f"{'runs':>6} {'full (ms)':>12} {'incremental (ms)':>18} {'speedup':>9}")
+    for n_runs in SIZES:
+        parent_skeleton = chain_skeleton(rng, n_runs)
+        parent = ModelParameters(parent_skeleton)
+        child_skeleton = add_one_run(parent_skeleton)
+
+        full = best_time(lambda: ModelParameters(child_skeleton))
+        incremental = best_time(lambda: ModelParameters(child_skeleton, parent=parent))
+        print(f"{n_runs:>6} {full * 1000:>12.2f} {incremental * 1000:>18.2f} {full / incremental:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Memory benchmark of the graph objects of Base.Network, measured with tracemalloc.
+
+Reports the bytes allocated per object for 10k:
+    - parameters,
+    - variables (with their dimension parameters),
+    - variable instances,
+    - layers sharing a single model (with the variable instances of the layer),
+and the bytes per layer of a 10k-layer chain network of Linear layers, each with its own model.
+
+Run from the root of the repository with:
+    PYTHONPATH=src python benchmarks/bench_network_memory.py
+"""
+import gc
+import tracemalloc
+
+from Base.Network.Layer import Layer, LayerIOLink
+from Base.Network.LayerModel import InputModel, OutputModel, TemplatedModel
+from Base.Network.Network import Network
+from Base.Network.Parameter import Parameter
+from Base.Network.Variable import Variable
+
+N_OBJECTS = 10_000
+LINEAR_TEMPLATE = "src/basic_templates/Linear.json"
+
+
+def allocated_bytes(build):
+    """
+    :return: The bytes allocated by build and still referenced by its result.
+    """
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def build_chain_network(n_layers):
+    input_model = InputModel("input", [Variable("input", 1, "out", float, instantiable=False)])
+    output_model = OutputModel("output", [Variable("output", 1, "in", float)])
+    input_layer = Layer(input_model, "input_layer")
+    output_layer = Layer(output_model, "output_layer")
+    models = [input_model, output_model]
+    layers = [input_layer]
+    previous_layer, previous_variable = input_layer, "input"
+    for i in range(n_layers):
+        model = TemplatedModel(f"linear_{i}", LINEAR_TEMPLATE)
+        layer = Layer(model, f"linear_{i}")
+        LayerIOLink(previous_layer, previous_variable, layer, "X").make_link()
+        models.append(model)
+        layers.append(layer)
+        previous_layer, previous_variable = layer, "Y"
+    LayerIOLink(previous_layer, previous_variable, output_layer, "output").make_link()
+    layers.append(output_layer)
+    return Network(models, layers, input_layer, output_layer)
+
+
+def main():
+    # parse the template and build its prototype outside of the measures
+    TemplatedModel("warm_up", LINEAR_TEMPLATE)
+    hooks = [Parameter(f"hook_{i}", int) for i in range(N_OBJECTS)]
+    source = Variable("source", 1, "in", float)
+    shared_model = TemplatedModel("shared", LINEAR_TEMPLATE)
+    shared_model.input_variables
+
+    measures = {
+        "parameter": allocated_bytes(lambda: [Parameter("p", int) for _ in range(N_OBJECTS)]),
+        "variable": allocated_bytes(lambda: [Variable("v", 1, "in", float) for _ in range(N_OBJECTS)]),
+        "variable instance": allocated_bytes(lambda: [source.make_new_instance(hook) for hook in hooks]),
+        "layer (shared model)": allocated_bytes(lambda: [Layer(shared_model) for _ in range(N_OBJECTS)]),
+        "layer (chain network)": allocated_bytes(lambda: build_chain_network(N_OBJECTS)),
+    }
+    print(f"bytes per object, {N_OBJECTS} objects")
+    for name, size in measures.items():
+        print(f"{name:>22}: {size / N_OBJECTS:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
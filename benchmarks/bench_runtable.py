@@ -0,0 +1,87 @@
+"""
+Benchmark of the graph operations of RunTable against ModelSkeleton.
+
+On random skeletons of 1k and 10k runs, reports the durations of:
+    - the conversion of the skeleton to a RunTable,
+    - the direct children of 100 runs, after a mutation (the adjacency indexes of the skeleton are rebuilt once),
+    - the deletion of 10% of the runs,
+    - a reordering of the runs with a random permutation,
+    - the default reordering (by height),
+and the durations of a random permutation of the runs of a population of 500 skeletons of 100 runs, skeleton by
+skeleton, table by table and with a single batch of all the tables (reorder_tables).
+
+Run from the root of the repository with:
+    PYTHONPATH=src python benchmarks/bench_runtable.py
+"""
+import random
+import timeit
+
+from Base.runtable import RunTable, reorder_tables
+
+from common import fresh_copy, random_skeleton
+
+SIZES = [1_000, 10_000]
+POPULATION_SIZE = 500
+POPULATION_RUNS = 100
+REPEAT = 5
+
+
+def measure(setup, operation):
+    """
+    :return: The best duration of the operation over REPEAT runs, on a new object made by setup, in milliseconds.
+    """
+    durations = []
+    for _ in range(REPEAT):
+        item = setup()
+        durations.append(timeit.timeit(lambda: operation(item), number=1))
+    return min(durations) * 1000
+
+
+def children_queries(item, run_ids):
+    if hasattr(item, "invalidate_indexes"):
+        item.invalidate_indexes()
+    for run_id in run_ids:
+        item.get_direct_children(run_id)
+
+
+def main():
+    for size in SIZES:
+        rng = random.Random(0)
+        skeleton = random_skeleton(rng, size)
+        n_runs = len(skeleton.runs)
+        run_ids = rng.sample(range(n_runs), 100)
+        deleted = rng.sample(range(n_runs), n_runs // 10)
+        permutation = list(range(n_runs))
+        rng.shuffle(permutation)
+        table = RunTable.from_skeleton(skeleton)
+
+        print(f"{n_runs} runs (ms): skeleton / table")
+        print(f"    conversion: {measure(lambda: skeleton, RunTable.from_skeleton):.2f}")
+        for name, operation in [("children", lambda item: children_queries(item, run_ids)),
+                                ("deletion", lambda item: item.del_runs(deleted)),
+                                ("permutation", lambda item: item.reorder_runs(permutation)),
+                                ("reordering", lambda item: item.reorder_runs())]:
+            on_skeleton = measure(lambda: fresh_copy(skeleton), operation)
+            on_table = measure(lambda: RunTable.from_skeleton(table), operation)
+            print(f"    {name}: {on_skeleton:.2f} / {on_table:.2f} (x{on_skeleton / on_table:.1f})")
+
+    rng = random.Random(1)
+    skeletons = [random_skeleton(rng, POPULATION_RUNS) for _ in range(POPULATION_SIZE)]
+    permutations = [rng.sample(range(len(skeleton.runs)), len(skeleton.runs)) for skeleton in skeletons]
+    tables = [RunTable.from_skeleton(skeleton) for skeleton in skeletons]
+
+    def reorder_each(items):
+        for item, permutation in zip(items, permutations):
+            item.reorder_runs(permutation)
+
+    on_skeletons = measure(lambda: [fresh_copy(skeleton) for skeleton in skeletons], reorder_each)
+    on_tables = measure(lambda: [RunTable.from_skeleton(table) for table in tables], reorder_each)
+    batch = measure(lambda: [RunTable.from_skeleton(table) for table in tables],
+                    lambda items: reorder_tables(items, permutations))
+    print(f"population of {POPULATION_SIZE} skeletons of {POPULATION_RUNS} runs, permutation (ms):")
+    print(f"    skeletons: {on_skeletons:.2f}, tables: {on_tables:.2f}, batch: {batch:.2f} "
+          f"(x{on_skeletons / batch:.1f})")
+
+
+if __name__ == "__main__":
+    main()
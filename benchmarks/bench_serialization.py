@@ -0,0 +1,59 @@
+"""
+Benchmark of Base.serialization against pickle.
+
+Reports the size of the records and the durations of encoding, of reading a record in place (NetworkRecord,
+SkeletonRecord) and of decoding it into new objects, for a network of 500 layers (a chain of diamonds of Linear and
+Add layers) and for a skeleton of 500 runs.
+
+Pickle recurses along the links of the layers: the recursion limit is raised to pickle the network.
+
+Run from the root of the repository with:
+    PYTHONPATH=src python benchmarks/bench_serialization.py
+"""
+import pickle
+import random
+import sys
+import timeit
+
+from Base.serialization import NetworkRecord, SkeletonRecord, decode, encode
+
+from common import build_diamonds_network, random_skeleton
+
+N_LAYERS = 500
+N_RUNS = 500
+REPEAT = 20
+
+
+def measure(function):
+    """
+    :return: The best duration of the function over REPEAT calls, in milliseconds.
+    """
+    return min(timeit.repeat(function, number=1, repeat=REPEAT)) * 1000
+
+
+def compare(name, item, record_class):
+    pickled = pickle.dumps(item)
+    record = encode(item)
+    print(f"{name}:")
+    print(f"    size: pickle {len(pickled)} bytes, record {len(record)} bytes (x{len(pickled) / len(record):.1f})")
+    pickle_dumps = measure(lambda: pickle.dumps(item))
+    record_encode = measure(lambda: encode(item))
+    print(f"    encode: pickle {pickle_dumps:.2f} ms, record {record_encode:.2f} ms "
+          f"(x{pickle_dumps / record_encode:.1f})")
+    pickle_loads = measure(lambda: pickle.loads(pickled))
+    in_place = measure(lambda: record_class(memoryview(record)))
+    decoded = measure(lambda: decode(record))
+    print(f"    load: pickle {pickle_loads:.2f} ms, record in place {in_place:.3f} ms "
+          f"(x{pickle_loads / in_place:.0f}), record decoded {decoded:.2f} ms (x{pickle_loads / decoded:.1f})")
+
+
+def main():
+    sys.setrecursionlimit(100_000)
+    network, _ = build_diamonds_network((N_LAYERS - 2) // 3)
+    compare(f"network of {len(network.layers)} layers", network, NetworkRecord)
+    skeleton = random_skeleton(random.Random(0), N_RUNS)
+    compare(f"skeleton of {len(skeleton.runs)} runs", skeleton, SkeletonRecord)
+
+
+if __name__ == "__main__":
+    main()
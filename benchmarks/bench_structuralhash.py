@@ -0,0 +1,39 @@
+"""
+Benchmark of the structural hash of skeletons, on the run graphs that need the most rounds of refinement:
+    - chains of runs sharing a single submodel,
+    - chains of runs each using its own submodel.
+
+Run from the root of the repository with:
+    PYTHONPATH=src python benchmarks/bench_structuralhash.py
+"""
+import timeit
+
+from Base.modelskeleton import ModelSkeleton
+from Base.structuralhash import structural_hash
+
+SIZES = [100, 200, 400, 1000, 5000]
+REPEAT = 3
+
+
+def chain_skeleton(n_runs, shared):
+    """
+    :return: A chain of n_runs Linear runs, all the runs using the same submodel if shared.
+    """
+    names = ["linear"] * n_runs if shared else [f"linear_{i}" for i in range(n_runs)]
+    submodels = {name: {"type": "Linear", "source": "basic_templates"} for name in names}
+    runs = [{"id": name, "inputs": {"X": [i - 1, "Y"] if i else [-1, "x"]}} for i, name in enumerate(names)]
+    return ModelSkeleton(submodels, runs, {"y": [n_runs - 1, "Y"]}, inputs=["x"])
+
+
+def main():
+    print("structural hash of a chain (ms): shared submodel / distinct submodels")
+    for size in SIZES:
+        durations = []
+        for shared in (True, False):
+            skeleton = chain_skeleton(size, shared)
+            durations.append(min(timeit.repeat(lambda: structural_hash(skeleton), number=1, repeat=REPEAT)) * 1000)
+        print(f"{size:>6} runs: {durations[0]:.2f} / {durations[1]:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Micro-benchmark of the Subsets disjoint-set forest used to merge equality constraints between parameters.
+
+For 10k, 100k and 1M parameters, measures the time to:
+    - merge as many random pairs of parameters as there are parameters,
+    - chain-merge all the parameters in a single class (one class growing by one element per merge),
+    - look up the representative of every parameter,
+    - materialize the equivalence class of every parameter.
+
+Run from the root of the repository with:
+    PYTHONPATH=src python benchmarks/bench_subsets.py
+"""
+import random
+import time
+
+from Base.modelproperties import Subsets
+
+SIZES = [10_000, 100_000, 1_000_000]
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+
+def random_merges(names, pairs):
+    subsets = Subsets(names)
+    for a, b in pairs:
+        subsets.merge(a, b)
+    return subsets
+
+
+def chain_merges(names):
+    subsets = Subsets(names)
+    for i in range(1, len(names)):
+        subsets.merge(names[i - 1], names[i])
+    return subsets
+
+
+def main():
+    rng = random.Random(0)
+    print(f"{'parameters':>11} {'random merges':>14} {'chain merges':>13} {'lookups':>9} {'classes':>9}  (seconds)")
+    for n in SIZES:
+        names = [f"model{i // 8}__param_{i % 8}" for i in range(n)]
+        pairs = [(names[rng.randrange(n)], names[rng.randrange(n)]) for _ in range(n)]
+
+        random_time, subsets = timed(lambda: random_merges(names, pairs))
+        chain_time, _ = timed(lambda: chain_merges(names))
+        lookup_time, _ = timed(lambda: [subsets[name] for name in names])
+        classes_time, _ = timed(lambda: [subsets.get_equivalence_class(name) for name in names])
+        print(f"{n:>11} {random_time:>14.3f} {chain_time:>13.3f} {lookup_time:>9.3f} {classes_time:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Benchmark of the construction of TemplatedModel instances of the Linear template.
+
+Creates 20k models (best of 5 runs), without prototypes (every variable and parameter built from the template properties) and from
+the prototype of the template, in three uses:
+    - models that are only created,
+    - models attached to a layer, as in a network (forces the copy of the variables),
+    - models whose named variables are accessed (forces the copy of the variables and of the parameters).
+
+Run from the root of the repository with:
+    PYTHONPATH=src python benchmarks/bench_templated_model.py
+"""
+import gc
+import time
+
+from Base.Network.Layer import Layer
+from Base.Network.LayerModel import TemplatedModel
+
+N_MODELS = 20_000
+REPEAT = 5
+LINEAR_TEMPLATE = "src/basic_templates/Linear.json"
+USES = {
+    "created": lambda model: None,
+    "attached": Layer,
+    "named variables": lambda model: model.named_variables,
+}
+
+
+def build_models(use_prototypes, use):
+    TemplatedModel.use_prototypes = use_prototypes
+    durations = []
+    for _ in range(REPEAT):
+        gc.collect()
+        start = time.perf_counter()
+        models = [TemplatedModel(f"linear_{i}", LINEAR_TEMPLATE) for i in range(N_MODELS)]
+        layers = [use(model) for model in models]
+        durations.append(time.perf_counter() - start)
+        del models, layers
+    return min(durations)
+
+
+def main():
+    # parse the template and build the prototype outside of the measures
+    TemplatedModel("warm_up", LINEAR_TEMPLATE)
+    print(f"{N_MODELS} Linear models (ms): without prototypes / from prototype")
+    for name, use in USES.items():
+        reference = build_models(use_prototypes=False, use=use)
+        prototype = build_models(use_prototypes=True, use=use)
+        print(f"{name:>16}: {reference * 1000:.1f} / {prototype * 1000:.1f} (x{reference / prototype:.1f})")
+
+
+if __name__ == "__main__":
+    main()
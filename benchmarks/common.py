@@ -0,0 +1,11 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from test.fixtures import (ADD_PROPS, CONCAT_PROPS, HEADS_PROPS, LINEAR_PROPS, build_diamonds_network, fresh_copy,
+                           make_template, random_skeleton)
+
+"""
+Templates, skeletons and networks shared by the benchmarks: the fixtures of the tests, so that both measure and check
+the same inputs.
+"""
@@ -1,25 +1,183 @@
+import itertools
+import multiprocessing
+import os
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+WORKER_ID_SHIFT = 40
+
+_id_remapping = threading.local()
+
+
+def _restore_hashable(cls, hash_value: int) -> "Hashable":
+    """
+    Creates an unpickled Hashable with its id, before its state and before it is used as a key by containers.
+    Within remapped_ids, the id is replaced by an id of the current process.
+    """
+    hashable = object.__new__(cls)
+    mapping = getattr(_id_remapping, "mapping", None)
+    if mapping is not None:
+        new_hash = mapping.get(hash_value)
+        if new_hash is None:
+            new_hash = mapping[hash_value] = Hashable._next_id()
+        hash_value = new_hash
+    hashable.hash = hash_value
+    return hashable
+
+
+@contextmanager
+def remapped_ids() -> Iterator[Dict[int, int]]:
+    """
+    Within the context, the Hashable objects unpickled by the current thread receive new ids allocated by the current
+    process, so that objects built by other processes never collide with the local ones. Objects sharing an id in the
+    pickled data keep sharing an id.
+
+    :return: The mapping from the unpickled ids to the new ids, filled as objects are unpickled.
+    """
+    previous_mapping = getattr(_id_remapping, "mapping", None)
+    mapping: Dict[int, int] = {}
+    _id_remapping.mapping = mapping
+    try:
+        yield mapping
+    finally:
+        _id_remapping.mapping = previous_mapping
+
+
 class Hashable:
     """
     A class that represents an object that can be hashed and compared for equality.
 
-    Attributes:
-        counter (int): A counter used to assign unique hash values to each instance.
+    Ids are allocated by an atomic counter (itertools.count), so objects can be built from several threads. Each
+    process allocates ids in its own namespace, stored in the high bits of the ids (above WORKER_ID_SHIFT): the main
+    process uses namespace 0 and the processes started by multiprocessing (with any start method) and the forked
+    processes take the next namespace of a counter owned by the main process when they allocate their first id, so a
+    namespace is never given twice, even when the pid of a process is reused. Pool workers can also choose their
+    namespace with set_namespace (e.g. their worker id) to get deterministic ids.
 
     Methods:
         __init__: Initializes a new instance of the Hashable class.
         __hash__: Returns the hash value of the instance.
         __eq__: Compares the instance with another object for equality.
+        set_namespace: Sets the namespace of the ids allocated by the current process.
 
     """
 
-    counter = 0
+    __slots__ = ("hash",)
+
+    namespace = 0
+    _counters: Dict[int, "itertools.count"] = {0: itertools.count()}
+    _next_id = _counters[0].__next__
 
     def __init__(self):
-        self.hash = Hashable.counter
-        Hashable.counter += 1
+        self.hash = Hashable._next_id()
+
+    @staticmethod
+    def set_namespace(namespace: int) -> None:
+        """
+        Sets the namespace of the ids allocated by the current process. Going back to a namespace resumes its ids.
+        """
+        if namespace < 0:
+            raise ValueError(f"namespace must be non negative, got {namespace}")
+        counter = Hashable._counters.get(namespace)
+        if counter is None:
+            counter = Hashable._counters[namespace] = itertools.count(namespace << WORKER_ID_SHIFT)
+        Hashable.namespace = namespace
+        Hashable._next_id = counter.__next__
+
+    @staticmethod
+    def get_namespace(hash_value: int) -> int:
+        return hash_value >> WORKER_ID_SHIFT
 
     def __hash__(self):
         return self.hash
 
     def __eq__(self, other):
+        if not isinstance(other, Hashable):
+            return NotImplemented
         return self.hash == other.hash
+
+    def __reduce_ex__(self, protocol):
+        return _restore_hashable, (self.__class__, self.hash), self.__getstate__()
+
+    def __getstate__(self):
+        slots = {}
+        for cls in self.__class__.__mro__:
+            for name in cls.__dict__.get("__slots__", ()):
+                if name != "hash" and hasattr(self, name):
+                    slots[name] = getattr(self, name)
+        return getattr(self, "__dict__", None), slots
+
+    def __setstate__(self, state):
+        object_dict, slots = state
+        if object_dict:
+            self.__dict__.update(object_dict)
+        for name, value in slots.items():
+            setattr(self, name, value)
+
+
+class _NamespaceCounter:
+    """
+    The counter of the namespaces given to the processes, owned by the main process (which uses namespace 0) and shared
+    with all its descendants through the configuration of the processes, which multiprocessing copies into every process
+    it starts. The shared value is only created once a process is started: before a fork, or when the counter is pickled
+    for the spawn and forkserver start methods.
+    """
+
+    def __init__(self, value=None):
+        self._value = value
+
+    def value(self):
+        if self._value is None:
+            # the lock of a value created in the fork context cannot be shared with the spawned processes
+            self._value = multiprocessing.get_context("spawn").Value("q", 0)
+        return self._value
+
+    def next(self) -> int:
+        value = self.value()
+        with value.get_lock():
+            value.value += 1
+            return value.value
+
+    def __reduce__(self):
+        return _NamespaceCounter, (self.value(),)
+
+
+_NAMESPACES_KEY = "hashable_namespaces"
+_namespace_lock = threading.Lock()
+_forked = False
+
+# the processes started with spawn or forkserver import this module either after their bootstrap, when their
+# configuration already holds the counter of their parent, or while their process object is unpickled, before it
+# replaces the placeholder process whose configuration gets a counter of its own here
+_main_namespaces = None
+if _NAMESPACES_KEY not in multiprocessing.current_process()._config:
+    _main_namespaces = multiprocessing.current_process()._config[_NAMESPACES_KEY] = _NamespaceCounter()
+
+
+def _first_id() -> int:
+    # the namespace of a process is chosen with its first id, once multiprocessing has bootstrapped the process
+    with _namespace_lock:
+        if Hashable._next_id is _first_id:
+            counter = multiprocessing.current_process()._config[_NAMESPACES_KEY]
+            Hashable.set_namespace(0 if counter is _main_namespaces and not _forked else counter.next())
+    return Hashable._next_id()
+
+
+def _share_namespaces():
+    counter = multiprocessing.current_process()._config.get(_NAMESPACES_KEY)
+    if counter is not None:
+        counter.value()
+
+
+def _switch_to_process_namespace():
+    # a forked process inherits the counter of its parent: continuing it would allocate the same ids as the parent
+    global _forked, _namespace_lock
+    _forked = True
+    _namespace_lock = threading.Lock()
+    Hashable._next_id = _first_id
+
+
+Hashable._next_id = _first_id
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(before=_share_namespaces, after_in_child=_switch_to_process_namespace)
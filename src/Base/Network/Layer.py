@@ -1,9 +1,13 @@
-from typing import Dict, Tuple, List, Union
+from typing import Dict, Tuple, List, Union, Optional
+from typing import TYPE_CHECKING
 
 from ..Base import Hashable
 from .Variable import Variable
 from .LayerModel import LayerModel
 
+if TYPE_CHECKING:
+    from .Network import Network
+
 
 class LayerIOLink:
     def __init__(
@@ -48,9 +52,12 @@ class Layer(Hashable):
         model (LayerModel): The model used in the layer.
         inputs (dict): A dictionary mapping input variables to tuple of input layer and input variable.
         outputs (dict): A dictionary mapping output variables to list of tuples of output layer and output variable.
+        network (Network): The network the layer belongs to, if any. Reachability queries are delegated to it.
 
     """
 
+    __slots__ = ("model", "name", "inputs", "outputs", "network")
+
     def __init__(self, model: LayerModel, name: str = ""):
         super(Layer, self).__init__()
         self.model = model
@@ -58,6 +65,7 @@ class Layer(Hashable):
         model.attach_layer(self)
         self.inputs: Dict[Variable, Tuple[Layer, Variable]] = {}
         self.outputs: Dict[Variable, List[Tuple[Layer, Variable]]] = {}
+        self.network: Optional["Network"] = None
 
     def set_io_links(self, links: Union[LayerIOLink, list[LayerIOLink]]):
         if isinstance(links, LayerIOLink):
@@ -76,10 +84,17 @@ class Layer(Hashable):
                 variable_outputs.append((link.output_layer, link.output_variable))
 
             elif link.output_layer == self:
+                replaced_link = self.inputs.get(link.output_variable)
                 self.inputs[link.output_variable] = (
                     link.input_layer,
                     link.input_variable,
                 )
+                if self.network is not None:
+                    if replaced_link is not None:
+                        self.network.on_link_removed(
+                            LayerIOLink(*replaced_link, self, link.output_variable)
+                        )
+                    self.network.on_link_added(link)
             else:
                 raise ValueError(
                     (
@@ -98,12 +113,14 @@ class Layer(Hashable):
             )
         if link.output_layer == self:
             self.inputs[link.output_variable] = None
+        if self.network is not None:
+            self.network.on_link_removed(link)
 
     def get_inputs(self) -> Dict[Variable, Tuple["Layer", Variable]]:
         return self.inputs
 
     def get_input_layers(self) -> List["Layer"]:
-        return [layer for layer, variable in self.inputs.values()]
+        return [link[0] for link in self.inputs.values() if link is not None]
 
     def get_outputs(self) -> Dict[Variable, List[Tuple["Layer", Variable]]]:
         return self.outputs
@@ -123,33 +140,31 @@ class Layer(Hashable):
         return self.model
 
     def is_following_from(self, layer: "Layer") -> bool:
-        input_layers = self.get_input_layers()
-        if not input_layers:
-            return False
-        if layer in input_layers:
-            return True
-        else:
-            return any(
-                [
-                    input_layer.is_following_from(layer)
-                    for input_layer in self.get_input_layers()
-                ]
-            )
+        if self.network is not None and layer.network is self.network:
+            return self.network.is_ancestor(layer, self)
+        return layer in self._walk_previous_layers()
 
     def is_followed_by(self, layer: "Layer") -> bool:
         return layer.is_following_from(self)
 
     def get_all_previous_layers(self) -> List["Layer"]:
-        previous_layers = []
-
-        # The input layers are previous layers
-        input_layers = self.get_input_layers()
-        previous_layers.extend(input_layers)
-
-        # the previous layers from inputs layers are previous layers
-        for layer in input_layers:
-            previous_layers.extend(layer.get_all_previous_layers())
-        return list(set(previous_layers))
+        if self.network is not None:
+            return self.network.get_ancestors(self)
+        return list(self._walk_previous_layers())
+
+    def _walk_previous_layers(self) -> set:
+        """
+        Iterative walk of the upstream graph, used when the layer is not attached to a network.
+        Each layer is visited at most once, so the walk terminates even on cyclic graphs.
+        """
+        previous_layers = set()
+        stack = self.get_input_layers()
+        while stack:
+            layer = stack.pop()
+            if layer not in previous_layers:
+                previous_layers.add(layer)
+                stack.extend(layer.get_input_layers())
+        return previous_layers
 
     def __format__(self, format_spec):
         return f"{self.__class__.__name__}-{self.hash} using model {self.model})"
@@ -1,9 +1,8 @@
-from typing import List, Literal, Union, Optional
+from typing import Dict, List, Literal, Union, Optional
 from typing import TYPE_CHECKING
 
-import json
-
 from ..Base import Hashable
+from ..templatecache import template_registry
 from .Parameter import Parameter, ParameterListener
 from .Variable import Variable, VariableInstance
 
@@ -356,10 +355,46 @@ class OutputModel(LayerModel):
 
 
 class TemplatedModel(LayerModel):
+    """
+    TemplatedModel Class
+
+    A model whose variables and parameters are described by a template file.
+
+    The variables and parameters of a template are built once, on a prototype model that is never attached to any
+    layer. The next models of the same template are copies of the prototype: their variables on the one hand and their
+    parameters on the other hand are copied from the prototype the first time they are accessed, so that models that
+    are created but never used (e.g. discarded candidates of a search) only cost the model object itself, and models
+    that are only attached to layers do not copy their parameters. The prototype is rebuilt when the template
+    properties change.
+
+    Attributes:
+        use_prototypes (bool): Whether the models are copied from the prototype of their template.
+    """
+
+    use_prototypes = True
+    _prototypes: Dict[tuple, "TemplatedModel"] = {}
+    _copied_variables = frozenset(("input_variables", "output_variables", "named_variables"))
+    _copied_parameters = frozenset(("parameters", "named_parameters", "named_variables"))
+
     def __init__(self, name: str, template_source=""):
+        props = self.load_template_props(template_source)
+        prototype_key = (self.__class__, template_source)
+        if self.use_prototypes:
+            prototype = self._prototypes.get(prototype_key)
+            if prototype is not None and prototype._props is props:
+                self.hash = Hashable._next_id()
+                self.name = name
+                self.template_source = template_source
+                self._props = props
+                self.template_name = prototype.template_name
+                self.python_source = prototype.python_source
+                self.attached_layers = []
+                self._prototype = prototype
+                return
+
         super(TemplatedModel, self).__init__(name)
         self.template_source = template_source
-        self._props = self.load_template_props(template_source)
+        self._props = props
         self.template_name = self._props["name"]
         self.python_source = self._props["source"]
         # build variables and parameters
@@ -381,12 +416,67 @@ class TemplatedModel(LayerModel):
                                   )
             self.attach_parameters(parameter)
 
+        if self.use_prototypes:
+            self._prototypes[prototype_key] = self._make_prototype()
+
+    def _make_prototype(self) -> "TemplatedModel":
+        prototype = object.__new__(self.__class__)
+        Hashable.__init__(prototype)
+        prototype.name = ""
+        prototype.template_source = self.template_source
+        prototype._props = self._props
+        prototype.template_name = self.template_name
+        prototype.python_source = self.python_source
+        prototype.attached_layers = []
+        prototype._prototype = None
+        prototype._copy_variables(self)
+        prototype._copy_parameters(self)
+        # the position of the named variables and parameters in the lists of the model, to rebuild the dictionaries
+        # of the copies without looking the objects up
+        positions = {}
+        for attribute in ("input_variables", "output_variables", "parameters"):
+            for index, value in enumerate(getattr(self, attribute)):
+                positions[id(value)] = (attribute, index)
+        prototype._named_layout = tuple(
+            (attribute, tuple((key, positions[id(value)]) for key, value in getattr(self, attribute).items()))
+            for attribute in ("named_variables", "named_parameters"))
+        prototype._name_copies(prototype._named_layout)
+        return prototype
+
+    def __getattr__(self, item):
+        # only called when the attribute is missing: the variables, respectively the parameters, of a model created
+        # from a prototype are copied on the first access to any of them
+        prototype = self.__dict__.get("_prototype")
+        if prototype is None or not (item in TemplatedModel._copied_variables
+                                     or item in TemplatedModel._copied_parameters):
+            raise AttributeError(f"'{self.__class__.__name__}' object has no attribute '{item}'")
+        object_dict = self.__dict__
+        if item in TemplatedModel._copied_variables and "input_variables" not in object_dict:
+            self._copy_variables(prototype)
+        if item in TemplatedModel._copied_parameters and "parameters" not in object_dict:
+            self._copy_parameters(prototype)
+        if "named_variables" not in object_dict and "input_variables" in object_dict and "parameters" in object_dict:
+            self._name_copies(prototype._named_layout)
+        return object_dict[item]
+
+    def _name_copies(self, named_layout):
+        for attribute, layout in named_layout:
+            self.__dict__[attribute] = {key: getattr(self, values)[index] for key, (values, index) in layout}
+
+    def _copy_variables(self, model: "TemplatedModel"):
+        """
+        Structured copy of the variables of a model of the same template that is not attached to any layer. The
+        copies have their own identity and are attached to this model.
+        """
+        self.input_variables = [variable.copy(self) for variable in model.input_variables]
+        self.output_variables = [variable.copy(self) for variable in model.output_variables]
 
-
+    def _copy_parameters(self, model: "TemplatedModel"):
+        """
+        Structured copy of the parameters of a model of the same template, attached to this model.
+        """
+        self.parameters = [parameter.copy(self) for parameter in model.parameters]
 
     def load_template_props(self, source_file: str):
-        file = open(source_file, "r")
-        text = file.read()
-        file.close()
-
-        return json.loads(text)
+        # the properties are shared between all the models of a template and must not be modified
+        return template_registry.get(source_file)
@@ -1,8 +1,9 @@
-import json
 from typing import Any
 
 from abc import ABC, abstractmethod
 
+from ..templatecache import template_registry
+
 
 class ModelTemplate(ABC):
     def __init__(self):
@@ -55,10 +56,8 @@ class ModelTemplate:
         self._props = props
 
     def load_template(self, source_file: str):
-        text = open(source_file).read()
-        text2 = text.split("BEGIN_PROPS")[1]
-        text2 = text2.split("END_PROPS")[0]
-        self._props = json.loads(text2)
+        # ModelParameters completes the properties in place, so each template gets its own copy
+        self._props = template_registry.get_mutable(source_file)
 
     def build_complete_template(self):
         pass
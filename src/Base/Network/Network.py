@@ -26,6 +26,10 @@ class Network(Hashable):
     -------
     check_network()
         Checks the network for cycles.
+    is_ancestor(ancestor: Layer, layer: Layer) -> bool
+        Checks whether a layer is upstream of another one.
+    get_ancestors(layer: Layer) -> List[Layer]
+        Returns all the layers upstream of a layer.
     add_layers_link(link: LayerIOLink)
         Adds a link between two layers.
     layers_heights() -> Dict[Layer, int]
@@ -80,6 +84,19 @@ class Network(Hashable):
         self.output_layer = output_layer
         self.layers = list(set(layers))
         self.models = models
+
+        # reachability cache: ancestors of each layer as a bitset over the positions in self.layers
+        self._layers_index: Optional[Dict[Layer, int]] = None
+        self._ancestors: Optional[List[int]] = None
+
+        # bumped on every link or layer mutation, the caches below are only valid for the version they were built at
+        self._graph_version = 0
+        self._heights: Optional[Dict[Layer, int]] = None
+        self._heights_version = -1
+        self._layers_orders: Optional[List[Layer]] = None
+
+        for layer in self.layers:
+            layer.network = self
         self.check_network()
 
     def check_network(self):
@@ -91,9 +108,149 @@ class Network(Hashable):
         None
             Raises an exception if the network is invalid.
         """
-        for layer in self.layers:
-            if layer.is_following_from(layer):
-                raise Exception(f"There is a cycle in the graph of layers!")
+        self._build_reachability()
+
+    def _build_reachability(self):
+        """
+        Computes the ancestors of every layer in a single topological pass (Kahn's algorithm).
+
+        The ancestors of the layer at position i in self.layers are stored as an integer bitset in
+        self._ancestors[i].
+
+        Returns
+        -------
+        None
+            Raises an exception if there is a cycle in the graph of layers.
+        """
+        index = {layer: i for i, layer in enumerate(self.layers)}
+        pending = [0] * len(self.layers)
+        children: List[List[int]] = [[] for _ in self.layers]
+        for i, layer in enumerate(self.layers):
+            for input_layer in layer.get_input_layers():
+                j = index.get(input_layer)
+                if j is not None:
+                    pending[i] += 1
+                    children[j].append(i)
+
+        ancestors = [0] * len(self.layers)
+        queue = [i for i, count in enumerate(pending) if count == 0]
+        n_processed = 0
+        while queue:
+            j = queue.pop()
+            n_processed += 1
+            reach = ancestors[j] | (1 << j)
+            for i in children[j]:
+                ancestors[i] |= reach
+                pending[i] -= 1
+                if pending[i] == 0:
+                    queue.append(i)
+
+        if n_processed != len(self.layers):
+            self._invalidate_reachability()
+            raise Exception(f"There is a cycle in the graph of layers!")
+
+        self._layers_index = index
+        self._ancestors = ancestors
+
+    def _invalidate_reachability(self):
+        self._layers_index = None
+        self._ancestors = None
+
+    def is_ancestor(self, ancestor: Layer, layer: Layer) -> bool:
+        """
+        Checks whether a layer is upstream of another one.
+
+        Parameters
+        ----------
+        ancestor : Layer
+            The candidate upstream layer.
+        layer : Layer
+            The downstream layer.
+
+        Returns
+        -------
+        bool
+            True if there is a path of links going from ancestor to layer.
+        """
+        if self._ancestors is None:
+            self._build_reachability()
+        i = self._layers_index.get(layer)
+        j = self._layers_index.get(ancestor)
+        if i is None or j is None:
+            return False
+        return bool(self._ancestors[i] >> j & 1)
+
+    def get_ancestors(self, layer: Layer) -> List[Layer]:
+        """
+        Returns all the layers upstream of a layer.
+
+        Parameters
+        ----------
+        layer : Layer
+            The layer whose ancestors are looked for.
+
+        Returns
+        -------
+        List[Layer]
+            The layers from which there is a path of links to the given layer.
+        """
+        if self._ancestors is None:
+            self._build_reachability()
+        if layer not in self._layers_index:
+            return []
+        bits = self._ancestors[self._layers_index[layer]]
+        ancestors = []
+        while bits:
+            lowest_bit = bits & -bits
+            ancestors.append(self.layers[lowest_bit.bit_length() - 1])
+            bits ^= lowest_bit
+        return ancestors
+
+    def on_link_added(self, link: LayerIOLink):
+        """
+        Updates the reachability cache after a link was made between two layers of the network.
+
+        Parameters
+        ----------
+        link : LayerIOLink
+            The link that was added.
+
+        Returns
+        -------
+        None
+        """
+        self._graph_version += 1
+        if self._ancestors is None:
+            return
+        i = self._layers_index.get(link.input_layer)
+        j = self._layers_index.get(link.output_layer)
+        if i is None or j is None or i == j or self._ancestors[i] >> j & 1:
+            # the link comes from outside the network or closes a cycle, let the next query rebuild and report it
+            self._invalidate_reachability()
+            return
+
+        # the output layer and all the layers following it now also follow the input layer and its ancestors
+        reach = self._ancestors[i] | (1 << i)
+        output_bit = 1 << j
+        for k, bits in enumerate(self._ancestors):
+            if k == j or bits & output_bit:
+                self._ancestors[k] = bits | reach
+
+    def on_link_removed(self, link: LayerIOLink):
+        """
+        Invalidates the reachability cache after a link was removed between two layers of the network.
+
+        Parameters
+        ----------
+        link : LayerIOLink
+            The link that was removed.
+
+        Returns
+        -------
+        None
+        """
+        self._graph_version += 1
+        self._invalidate_reachability()
 
     def add_layers_link(self, link: LayerIOLink):
         """
@@ -121,18 +278,68 @@ class Network(Hashable):
         Dict[Layer, int]
             A dictionary mapping each layer to its height in the network.
         """
-        n_layers = len(self.layers)
-        heights = {layer: -1 for layer in self.layers}
+        return dict(self._get_layers_heights())
+
+    def _get_layers_heights(self) -> Dict[Layer, int]:
+        """
+        Returns the cached heights of the layers, recomputing them if the graph changed since the last computation.
+        """
+        if self._heights_version != self._graph_version:
+            self._heights = self._compute_layers_heights()
+            self._layers_orders = None
+            self._heights_version = self._graph_version
+        return self._heights
+
+    def _compute_layers_heights(self) -> Dict[Layer, int]:
+        """
+        Computes the length of the longest path from each layer to the output layer in O(layers + links).
 
-        def set_height(layer: Layer, height):
-            if height > n_layers:
-                raise Exception("Cycle detected in the graph")
-            if height > heights[layer]:
-                heights[layer] = height
-                for input_layer in layer.get_input_layers():
-                    set_height(input_layer, height + 1)
+        The layers upstream of the output layer are visited in reverse topological order (Kahn's algorithm on the
+        reversed links), so that the height of a layer is final once all the layers it feeds have been processed.
+        Layers that do not lead to the output layer keep a height of -1.
 
-        set_height(self.output_layer, 0)
+        Returns
+        -------
+        Dict[Layer, int]
+            A dictionary mapping each layer to its height in the network.
+        """
+        heights = {layer: -1 for layer in self.layers}
+        if self.output_layer not in heights:
+            return heights
+
+        # count the links from each layer upstream of the output to other layers upstream of the output
+        pending = {self.output_layer: 0}
+        stack = [self.output_layer]
+        while stack:
+            layer = stack.pop()
+            for input_layer in layer.get_input_layers():
+                if input_layer not in heights:
+                    continue
+                if input_layer in pending:
+                    pending[input_layer] += 1
+                else:
+                    pending[input_layer] = 1
+                    stack.append(input_layer)
+
+        if pending[self.output_layer] != 0:
+            raise Exception("Cycle detected in the graph")
+
+        heights[self.output_layer] = 0
+        queue = [self.output_layer]
+        n_processed = 0
+        while queue:
+            layer = queue.pop()
+            n_processed += 1
+            for input_layer in layer.get_input_layers():
+                if input_layer not in pending:
+                    continue
+                heights[input_layer] = max(heights[input_layer], heights[layer] + 1)
+                pending[input_layer] -= 1
+                if pending[input_layer] == 0:
+                    queue.append(input_layer)
+
+        if n_processed != len(pending):
+            raise Exception("Cycle detected in the graph")
         return heights
 
     @property
@@ -146,15 +353,16 @@ class Network(Hashable):
             The layers ordered by their height in the network.
         """
         # compute height of layers
-        heights = self.layers_heights
-        max_height = max(heights.values())
+        heights = self._get_layers_heights()
+        if self._layers_orders is not None:
+            return list(self._layers_orders)
 
         # order layers by their height in the graph
-        ordered_layers = []
-        for depth in range(max_height + 1):
-            for layer in self.layers:
-                if heights[layer] == max_height - depth:
-                    ordered_layers.append(layer)
+        buckets: List[List[Layer]] = [[] for _ in range(max(heights.values()) + 1)]
+        for layer in self.layers:
+            if heights[layer] != -1:
+                buckets[heights[layer]].append(layer)
+        ordered_layers = [layer for bucket in reversed(buckets) for layer in bucket]
 
         if ordered_layers[0] != self.input_layer:
             raise Exception(
@@ -166,7 +374,8 @@ class Network(Hashable):
                 f" Bad order of runs, the last layer is not the output layer but {ordered_layers[-1]}"
             )
 
-        return ordered_layers
+        self._layers_orders = ordered_layers
+        return list(ordered_layers)
 
     @property
     def layers_usage(self):
@@ -178,8 +387,8 @@ class Network(Hashable):
         Dict[Layer, bool]
             A dictionary mapping each layer to a boolean indicating whether it is used or not.
         """
-        heights = self.layers_heights
-        return {layer: (height == -1) for layer, height in heights.items()}
+        heights = self._get_layers_heights()
+        return {layer: (height != -1) for layer, height in heights.items()}
 
     @property
     def used_layers(self):
@@ -236,6 +445,14 @@ class Network(Hashable):
         """
         if layer not in self.layers:
             self.layers.append(layer)
+            layer.network = self
+            self._graph_version += 1
+            if self._ancestors is not None:
+                if layer.get_inputs() or layer.get_outputs():
+                    self._invalidate_reachability()
+                else:
+                    self._layers_index[layer] = len(self._ancestors)
+                    self._ancestors.append(0)
         if layer.model not in self.models:
             self.add_model(layer.model)
 
@@ -254,12 +471,15 @@ class Network(Hashable):
         """
 
         # remove all links with the layers to delete from its inputs
-        for variable, (input_layer, input_var) in layer.get_inputs().items():
+        for variable, input_link in layer.get_inputs().items():
+            if input_link is None:
+                continue
+            input_layer, input_var = input_link
             link = LayerIOLink(input_layer, input_var, layer, variable)
             input_layer.remove_io_link(link)
 
         # remove all links with this layer from its outputs
-        for variable, outputs in layer.get_outputs():
+        for variable, outputs in layer.get_outputs().items():
             for output_layer, output_var in outputs:
                 link = LayerIOLink(layer, variable, output_layer, output_var)
                 output_layer.remove_io_link(link)
@@ -267,6 +487,10 @@ class Network(Hashable):
         layer.get_model().detach_layer(layer)
 
         self.layers.remove(layer)
+        layer.network = None
+        self._graph_version += 1
+        # positions in self.layers have shifted
+        self._invalidate_reachability()
 
     def remove_ghost_layers(self):
         """
@@ -3,6 +3,8 @@ from typing import Any, List, Optional
 
 
 class ParameterListener:
+    __slots__ = ()
+
     def __init__(self):
         pass
 
@@ -18,7 +20,7 @@ class Parameter(Hashable):
         :parameter_type: Type of the parameter.
         :parent: Object to which the parameter is attached.
         the object responsible for the parameter.
-        :listeners: List of objects that listen to the parameter.
+        :listeners: List of objects that listen to the parameter, allocated on first access.
 
     Methods:
         attach_parent(model): Attaches the parameter to an Object.
@@ -30,6 +32,8 @@ class Parameter(Hashable):
         parameter.__format__('')
     """
 
+    __slots__ = ("name", "parameter_type", "parent", "_listeners", "cluster")
+
     def __init__(
         self,
         name: str,
@@ -38,14 +42,22 @@ class Parameter(Hashable):
         listeners: list[ParameterListener] = None,
     ):
         super(Parameter, self).__init__()
-        if listeners is None:
-            listeners = []
         self.name = name
         self.parameter_type = parameter_type
         self.parent = parent
-        self.listeners = listeners
+        self._listeners: Optional[List[ParameterListener]] = listeners
         self.cluster: int = self.hash
 
+    @property
+    def listeners(self) -> List[ParameterListener]:
+        if self._listeners is None:
+            self._listeners = []
+        return self._listeners
+
+    @listeners.setter
+    def listeners(self, listeners: List[ParameterListener]):
+        self._listeners = listeners
+
     def attach_parent(self, parent) -> None:
         if self.parent is None or self.parent == parent:
             self.parent = parent
@@ -66,8 +78,21 @@ class Parameter(Hashable):
     def check_compatibility(list_params: List["Parameter"]):
         return True
 
-    def copy(self):
-        return Parameter(self.name, self.parameter_type)
+    def copy(self, parent: Optional[Any] = None) -> "Parameter":
+        """
+        Structured copy of the parameter, that does not go through __init__.
+
+        :param parent: The object the copy is attached to, if any.
+        :return: A new parameter with the same name and type, its own identity and no listeners.
+        """
+        parameter = object.__new__(self.__class__)
+        parameter.hash = Hashable._next_id()
+        parameter.name = self.name
+        parameter.parameter_type = self.parameter_type
+        parameter.parent = parent
+        parameter._listeners = None
+        parameter.cluster = parameter.hash
+        return parameter
 
     def __delete__(self, instance):
         pass
@@ -22,8 +22,12 @@ class VariableInstance(Hashable):
         The source variable. The one from which the instance is created.
     hook : Hashable
         The hook of the instance. The object to which the instance is attached (most likely a layer).
+
+    The instance parameters and the linked instances are allocated on first access.
     """
 
+    __slots__ = ("source", "hooks", "_instance_parameters", "_linked_instances")
+
     def __init__(self, source: "Variable", hooks: List[Hashable]):
         """
         Initializes a new instance of the VariableInstance class.
@@ -38,8 +42,20 @@ class VariableInstance(Hashable):
         super().__init__()
         self.source: "Variable" = source
         self.hooks: List[Hashable] = hooks
-        self.instance_parameters: Dict[Parameter, Parameter] = {}
-        self.linked_instances: Set["VariableInstance"] = set()
+        self._instance_parameters: Optional[Dict[Parameter, Parameter]] = None
+        self._linked_instances: Optional[Set["VariableInstance"]] = None
+
+    @property
+    def instance_parameters(self) -> Dict[Parameter, Parameter]:
+        if self._instance_parameters is None:
+            self._instance_parameters = {}
+        return self._instance_parameters
+
+    @property
+    def linked_instances(self) -> Set["VariableInstance"]:
+        if self._linked_instances is None:
+            self._linked_instances = set()
+        return self._linked_instances
 
     def instantiate_parameters(self, parameters: List[Parameter]) -> None:
         """
@@ -129,8 +145,13 @@ class Variable(Hashable, ParameterListener):
 
     __format__(format_spec)
         Formats the variable as a string.
+
+    The linked variables, the instances and the global parameters (one per dimension) are allocated on first access.
     """
 
+    __slots__ = ("name", "dimension", "variable_io", "data_type", "_linked_variables", "attached_model",
+                 "_global_parameters", "_instances", "instantiable")
+
     def __init__(
         self,
         name: str,
@@ -166,25 +187,49 @@ class Variable(Hashable, ParameterListener):
         self.dimension: int = dimension
         self.variable_io: Literal["in", "out"] = variable_io
         self.data_type = data_type
-        self.linked_variables: set["Variable"] = linked_variables or []
+        self._linked_variables: Optional[set["Variable"]] = None
         self.attached_model: LayerModel = attached_model or None
-        self.global_parameters: List[Parameter] = []
-        self.instances: Dict[Hashable, VariableInstance] = {}
+        self._global_parameters: Optional[List[Parameter]] = None
+        self._instances: Optional[Dict[Hashable, VariableInstance]] = None
         self.instantiable: bool = instantiable
 
-        for dim in range(self.dimension):
-            param_name = "dim_{dim}"
-            parameter = Parameter(name=param_name,
-                                  parameter_type=int,
-                                  parent=self)
-            self.global_parameters.append(parameter)
-
-        if linked_variables is None:
-            self.linked_variables = set()
-        else:
+        if linked_variables is not None:
+            self._linked_variables = set(linked_variables)
             for var in linked_variables:
                 var.add_linked_variables(self)
 
+    @property
+    def linked_variables(self) -> set["Variable"]:
+        if self._linked_variables is None:
+            self._linked_variables = set()
+        return self._linked_variables
+
+    @linked_variables.setter
+    def linked_variables(self, linked_variables: set["Variable"]):
+        self._linked_variables = linked_variables
+
+    @property
+    def global_parameters(self) -> List[Parameter]:
+        if self._global_parameters is None:
+            self._global_parameters = []
+            for dim in range(self.dimension):
+                param_name = "dim_{dim}"
+                parameter = Parameter(name=param_name,
+                                      parameter_type=int,
+                                      parent=self)
+                self._global_parameters.append(parameter)
+        return self._global_parameters
+
+    @global_parameters.setter
+    def global_parameters(self, global_parameters: List[Parameter]):
+        self._global_parameters = global_parameters
+
+    @property
+    def instances(self) -> Dict[Hashable, VariableInstance]:
+        if self._instances is None:
+            self._instances = {}
+        return self._instances
+
     def make_new_instance(self, hook: Hashable) -> "VariableInstance":
         """
         Creates a new instance of the variable and links it to a hook.
@@ -222,7 +267,7 @@ class Variable(Hashable, ParameterListener):
             if hook not in self.instances:
                 raise Exception("No instance to remove!")
             instance = self.instances[hook]
-            for other in instance.linked_instances:
+            for other in instance._linked_instances or ():
                 if instance in other.linked_instances:
                     other.linked_instances.remove(instance)
             del self.instances[hook]
@@ -270,8 +315,37 @@ class Variable(Hashable, ParameterListener):
         else:
             raise Exception("Model already attached!")
 
+    def copy(self, attached_model: Optional["LayerModel"] = None) -> "Variable":
+        """
+        Structured copy of the variable, that does not go through __init__. The copy has its own identity and its own
+        copies of the global parameters (allocated on first access if they are not yet), but no links and no instances.
+
+        Parameters
+        ----------
+        attached_model : LayerModel
+            The model to which the copy is attached.
+
+        Returns
+        -------
+        Variable
+            The copy of the variable.
+        """
+        variable = object.__new__(self.__class__)
+        variable.hash = Hashable._next_id()
+        variable.name = self.name
+        variable.dimension = self.dimension
+        variable.variable_io = self.variable_io
+        variable.data_type = self.data_type
+        variable._linked_variables = None
+        variable.attached_model = attached_model
+        variable._global_parameters = None if self._global_parameters is None else \
+            [parameter.copy(variable) for parameter in self._global_parameters]
+        variable._instances = None
+        variable.instantiable = self.instantiable
+        return variable
+
     def make_instantiable(self, instantiable: bool):
-        if self.instances:
+        if self._instances:
             raise Exception(
                 "Cannot change instantiability of a variable with instances!"
             )
@@ -1,14 +1,208 @@
-import re, os, json, logging
+import io, os, json, logging, hashlib, threading, types, linecache
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, TextIO, Tuple
 from .modelskeleton import ModelSkeleton
-from .modelproperties import ModelPropertiesMapper
+from .modelloader import ModelLoader
+from .modelproperties import ModelParameters
+from .parameterscache import parameters_key
+from .structuralhash import submodel_signature
+
+try:
+    import fcntl
+except ImportError:
+    # no file locks on this platform, the manifests are only safe to share between threads
+    fcntl = None
 
 logging.basicConfig(level=logging.INFO)
 
+MANIFEST_FILE = "models_manifest.json"
+MANIFEST_FORMAT_VERSION = 1
+
+
+def source_digest(source: str) -> str:
+    """
+    :return: The content hash of a generated source.
+    """
+    return hashlib.blake2b(source.encode(), digest_size=20).hexdigest()
+
+
+def write_if_changed(path: str, content: str) -> bool:
+    """
+    Writes the content to the file atomically (temporary file and rename), only if the file does not already hold it.
+    An unchanged file keeps its modification time, so the compiled module cached by Python stays valid.
+
+    :return: True if the file was written.
+    """
+    try:
+        with open(path, "r") as file:
+            if source_digest(file.read()) == source_digest(content):
+                return False
+    except OSError:
+        pass
+    temporary_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temporary_path, "w") as file:
+        file.write(content)
+    os.replace(temporary_path, path)
+    return True
+
+
+def compile_in_memory(module_name: str, source: str, filename: str) -> types.ModuleType:
+    """
+    Compiles a generated source and executes it in a new module, without writing it to disk. The source is registered
+    in linecache under the filename so that the tracebacks show the generated lines, until the module is unregistered
+    from the ModelLoader it is registered with (see ModelLoader.unregister_module).
+
+    :return: The module.
+    """
+    linecache.cache[filename] = (len(source), None, source.splitlines(keepends=True), filename)
+    module = types.ModuleType(module_name)
+    module.__file__ = filename
+    exec(compile(source, filename, "exec"), module.__dict__)
+    return module
+
+
+def tensor_slots(model_skeleton: ModelSkeleton) -> Tuple[Dict[Tuple[int, str], int], List[List[int]], int]:
+    """
+    Liveness analysis of the outputs of the runs, for a forward pass keeping them in reused slots. The runs of the
+    skeleton must be ordered (see ModelSkeleton.reorder_runs).
+
+    The value of an output variable of a run is live from the run to the last run using it, or to the end of the
+    forward pass if it is an output of the model. The slots released by a run are reused for its own outputs, then by
+    the next runs.
+
+    :return: The slot of each (run, variable) used by another run or as output of the model, the slots released after
+    each run and not reused by its outputs, and the number of slots.
+    """
+    runs = model_skeleton.runs
+    n_runs = len(runs)
+    last_use = {}
+    for run_id, run in enumerate(runs):
+        for source, variable in run["inputs"].values():
+            if source != -1:
+                last_use[(source, variable)] = run_id
+    for source, variable in model_skeleton.outputs.values():
+        if source != -1:
+            last_use[(source, variable)] = n_runs
+
+    produced: List[List[str]] = [[] for _ in range(n_runs)]
+    dying: List[List[Tuple[int, str]]] = [[] for _ in range(n_runs)]
+    for (source, variable), run_id in last_use.items():
+        produced[source].append(variable)
+        if run_id < n_runs:
+            dying[run_id].append((source, variable))
+
+    slots = {}
+    released = []
+    free: List[int] = []
+    n_slots = 0
+    for run_id in range(n_runs):
+        freed = sorted(slots[value] for value in dying[run_id])
+        free.extend(reversed(freed))
+        for variable in sorted(produced[run_id]):
+            if free:
+                slots[(run_id, variable)] = free.pop()
+            else:
+                slots[(run_id, variable)] = n_slots
+                n_slots += 1
+        reused = set(freed).difference(free)
+        released.append([slot for slot in freed if slot not in reused])
+    return slots, released, n_slots
+
+
+class ModulesManifest:
+    """
+    Manifest of the modules generated in a directory, stored as a json file next to them.
+
+    The manifest can be shared by the threads and the processes generating models in the same directory: its updates
+    hold a thread lock and, where the platform has file locks (fcntl), an exclusive lock on the directory (see locked).
+    A module is only returned for a skeleton while its file still holds the source recorded for it.
+
+    Attributes:
+        path (str): The path of the manifest file.
+        skeletons (dict): Maps the key of each skeleton (see parameters_key) to the name of the module generated for it.
+        modules (dict): Maps the name of each generated module to the content hash of its source.
+    """
+    _lock = threading.Lock()
+
+    def __init__(self, directory: str):
+        self.path = os.path.join(directory, MANIFEST_FILE)
+        self.skeletons = {}
+        self.modules = {}
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, "r") as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return
+        if data.get("version") == MANIFEST_FORMAT_VERSION:
+            self.skeletons = data["skeletons"]
+            self.modules = data["modules"]
+
+    def get_module(self, skeleton_key: str):
+        """
+        :return: The name of the module generated for the skeleton, None if there is none or if its file is missing or
+        no longer holds the source recorded for it (overwritten by another model).
+        """
+        module_name = self.skeletons.get(skeleton_key)
+        if module_name is None:
+            return None
+        try:
+            with open(os.path.join(os.path.dirname(self.path), module_name + ".py"), "r") as file:
+                content_hash = source_digest(file.read())
+        except OSError:
+            return None
+        return module_name if content_hash == self.modules.get(module_name) else None
+
+    def record(self, skeleton_key: str, module_name: str, content_hash: str):
+        """
+        Records the module generated for the skeleton and saves the manifest. The manifest is reloaded first so that the
+        entries recorded meanwhile by other processes are kept, the other skeletons mapped to the module are dropped as
+        the module now holds another model.
+
+        The caller already holding the lock of the manifest (see locked) records with update instead.
+        """
+        with self.locked():
+            self.load()
+            self.update(skeleton_key, module_name, content_hash)
+
+    def update(self, skeleton_key: str, module_name: str, content_hash: str):
+        """
+        Records the module generated for the skeleton in the loaded manifest and saves it, the lock being held.
+        """
+        if self.skeletons.get(skeleton_key) == module_name and self.modules.get(module_name) == content_hash:
+            return
+        self.skeletons = {key: name for key, name in self.skeletons.items() if name != module_name}
+        self.skeletons[skeleton_key] = module_name
+        self.modules[module_name] = content_hash
+        content = json.dumps({"version": MANIFEST_FORMAT_VERSION, "skeletons": self.skeletons,
+                              "modules": self.modules}, indent="\t", sort_keys=True)
+        write_if_changed(self.path, content)
+
+    @contextmanager
+    def locked(self):
+        """
+        Holds the lock of the manifest, shared by the threads and the processes updating it. It is not reentrant.
+        """
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            # the manifest file itself is replaced by each update, the lock is taken on its directory
+            directory = os.open(os.path.dirname(self.path) or ".", os.O_RDONLY)
+            try:
+                fcntl.flock(directory, fcntl.LOCK_EX)
+                yield
+            finally:
+                os.close(directory)
+
 
 class Author:
 
-    def __init__(self, model_name: str, model_skeleton: ModelSkeleton, model_properties: ModelPropertiesMapper = None,
-                 save_dir: str = "", source_dir="", logger = logging):
+    def __init__(self, model_name: str, model_skeleton: ModelSkeleton, model_properties: ModelParameters = None,
+                 save_dir: str = "", source_dir="", logger = logging, reuse_modules: bool = True, export: bool = True,
+                 forward_slots: bool = False):
         """
         Constructor for the model generator class.
 
@@ -25,6 +219,12 @@ class Author:
         If warnings persist after a maximum number of iterations (N_MAX = 20), it raises an exception. 
         Finally, it merges the parameters and writes the full model into a file in the path_templates directory.
 
+        If export is set, the model is written to the save_dir (see export), and module_name is the name of the module
+        holding it. Otherwise nothing is generated until the model is exported or loaded in memory (see load).
+
+        If forward_slots is set, the forward pass keeps the outputs of the runs in reused local slots, released after
+        their last use (see forward_slots_lines), instead of keeping the outputs of every run until it returns.
+
         Note:
         It's assumed that the function is used within a larger framework where the input arguments are prepared and provided.
         """
@@ -47,23 +247,94 @@ class Author:
         self.model_properties = model_properties
         if self.model_properties is None:
             logging.info("no model properties given, building default!")
-            self.model_properties = ModelPropertiesMapper(model_skeleton)
+            self.model_properties = ModelParameters(model_skeleton)
 
         self.defaults = self.model_properties.get_global_defaults()
-        self.parameters = self.model_properties.get_all_globals()
+        # sorted so that the generated source, and so its content hash, does not depend on the order of a set
+        self.parameters = sorted(self.model_properties.get_all_globals())
         self.props = self.model_properties.get_high_order_props()
-        lines = self.full_model()
 
-        model_file = model_name + '.py'
-        model_path = os.path.join(self.save_dir, model_file)
-        '''
-        if not os.path.exists(model_path) or not os.path.exists(self.model_factory_file):
-            self.add_model_generation_file(model_name=model_name)
-            open(os.path.join(self.save_dir, '__init__.py'), 'a').write(f"\nfrom . import  {model_name}")
-        '''
-        open(model_path, 'w').write(re.sub(r" +", " ", "\n".join(lines)))
+        self.forward_slots = forward_slots
+        self.skeleton_key = parameters_key(self.graph, self.model_properties.sub_props)
+        if forward_slots:
+            # the modules generated with slots are equivalent but not identical to the others
+            self.skeleton_key += "-slots"
+        self.module_name = model_name
+        self.source = None
+        self.content_hash = None
+        self.written = False
+        if export:
+            self.export(reuse_modules=reuse_modules)
+
+    def generate(self) -> str:
+        """
+        Generates the source of the model, once.
 
-    def initialization_lines(self):
+        :return: The source of the module of the model.
+        """
+        if self.source is None:
+            buffer = io.StringIO()
+            self.write(buffer)
+            self.source = buffer.getvalue()
+            self.content_hash = source_digest(self.source)
+        return self.source
+
+    def export(self, reuse_modules: bool = True) -> str:
+        """
+        Writes the module of the model in the save_dir, only if the file does not already hold it. A manifest in the
+        save_dir maps the skeletons to the modules generated for them: if reuse_modules is set and the same skeleton
+        (with the same templates) was already generated under another name, nothing is written.
+
+        The source is generated without the lock of the manifest, then the lookup, the write and the record are done
+        under it, so that another process cannot replace the module in between.
+
+        :return: The name of the module holding the model, which is also the name of its class.
+        """
+        manifest = ModulesManifest(self.save_dir)
+        module_name = manifest.get_module(self.skeleton_key) if reuse_modules else None
+        if module_name is None:
+            source = self.generate()
+            model_file = self.model_name + '.py'
+            model_path = os.path.join(self.save_dir, model_file)
+            '''
+            if not os.path.exists(model_path) or not os.path.exists(self.model_factory_file):
+                self.add_model_generation_file(model_name=model_name)
+                open(os.path.join(self.save_dir, '__init__.py'), 'a').write(f"\nfrom . import  {model_name}")
+            '''
+            with manifest.locked():
+                # another process may have generated the skeleton meanwhile
+                manifest.load()
+                module_name = manifest.get_module(self.skeleton_key) if reuse_modules else None
+                if module_name is None:
+                    self.written = write_if_changed(model_path, source)
+                    manifest.update(self.skeleton_key, self.model_name, self.content_hash)
+                    self.module_name = self.model_name
+                    return self.module_name
+        logging.info(f"Model {self.model_name} is the already generated model {module_name}")
+        self.module_name = module_name
+        return module_name
+
+    def compile_module(self) -> types.ModuleType:
+        """
+        Compiles the source of the model and executes it in a new module, without writing it to disk (see
+        compile_in_memory).
+
+        :return: The module holding the class of the model.
+        """
+        source = self.generate()
+        return compile_in_memory(self.model_name, source, f"<generated {self.model_name} {self.content_hash[:8]}>")
+
+    def load(self, model_loader: ModelLoader, source: str = "generated") -> type:
+        """
+        Compiles the model in memory and registers its module with the loader, under the given source and the name of
+        the model.
+
+        :return: The class of the model.
+        """
+        model_loader.register_module(source, self.model_name, self.compile_module())
+        return model_loader.models_classes[source][self.model_name]
+
+    def initialization_lines(self, indent: str = "") -> Iterator[str]:
         """
         Generates the initialization lines of code for the model, taking into account all the submodels contained within it.
 
@@ -71,44 +342,41 @@ class Author:
         For each model, a line of code is created to initialize it using its template name and parameters.
         It then prefaces these lines with the `super` call to initialize the parent class and indents all lines for proper Python syntax.
         It also generates the method signature of the '__init__' method with default values for all parameters.
-        The final output is a list of all lines of code required for initialization of the model.
 
-        Returns:
-            list: A list of lines of Python code representing the initialization of the model.
-        """
-        parameters = self.model_properties.get_all_globals()
-        # Initialization part
-        lines = [f"self.device = device", f"self.dtype = dtype"]
-        for model_id, model in self.model_properties.model_skeleton.submodels.items():
-            model_template = model["type"]
-            model_source = model["source"]
-            line = f"self.model_{model_id} = {model_source}_{model_template}("
-            model_props = self.model_properties.sub_props[model_id]
-            for k,prop in model_props["parameters"].items():
-                if prop.get("virtual", False):
-                    continue
-                line += f"{k}={self.model_properties.get_global_parameter(model_id,k)}, "
-            line += f"device=device, "
-            line += f"dtype=dtype"
-            line += ")"
-            lines += [
-                f"# Initializing model {model_id}",
-                line
-            ]
-        lines = [f"super({self.model_name}, self).__init__()"] + lines
-        lines = ["\t" + x for x in lines]
-        first_lines = [f"def __init__(self, "]
+        Args:
+            indent (str): The indentation of the method.
 
+        Yields:
+            str: The lines of Python code representing the initialization of the model, indented.
+        """
+        yield f"{indent}def __init__(self, "
         for parameter in self.parameters:
             if not self.props["parameters"][parameter].get("virtual", False):
-                default_value = self.defaults[parameter]
-                first_lines.append(f"\t\t\t {parameter}={default_value},")
-        first_lines += ["\t\t\t device='cpu',", "\t\t\t dtype=torch.float32"]
-        first_lines += ["\t\t\t ):"]
-        lines = first_lines + lines
-        return lines
+                yield f"{indent}\t\t\t {parameter}={self.defaults[parameter]},"
+        yield f"{indent}\t\t\t device='cpu',"
+        yield f"{indent}\t\t\t dtype=torch.float32"
+        yield f"{indent}\t\t\t ):"
+
+        body = indent + "\t"
+        yield f"{body}super({self.model_name}, self).__init__()"
+        yield f"{body}self.device = device"
+        yield f"{body}self.dtype = dtype"
+        for model_id, model in self.model_properties.model_skeleton.submodels.items():
+            model_template, model_source = submodel_signature(model)
+            arguments = [f"{k}={parameter}" for k, parameter in self.submodel_arguments(model_id)]
+            arguments += ["device=device", "dtype=dtype"]
+            yield f"{body}# Initializing model {model_id}"
+            yield f"{body}self.model_{model_id} = {model_source}_{model_template}({', '.join(arguments)})"
+
+    def submodel_arguments(self, model_id: str) -> List[Tuple[str, str]]:
+        """
+        :return: The (local parameter, global parameter) pairs of the arguments given to the submodel.
+        """
+        return [(k, self.model_properties.get_global_parameter(model_id, k))
+                for k, prop in self.model_properties.sub_props[model_id]["parameters"].items()
+                if not prop.get("virtual", False)]
 
-    def forward_lines(self):
+    def forward_lines(self, indent: str = "") -> Iterator[str]:
         """
         Generates the forward pass lines of code for the model.
 
@@ -118,97 +386,116 @@ class Author:
         It then makes a forward pass through the submodel and stores the output in a model-specific output dictionary.
         Finally, it creates lines of code to aggregate the results from all submodels and return the final output.
 
-        Returns:
-            list: A list of lines of Python code representing the forward pass of the model.
+        Args:
+            indent (str): The indentation of the method.
+
+        Yields:
+            str: The lines of Python code representing the forward pass of the model, indented.
         """
-        # let's write the forward part
-        lines = []
+        yield f"{indent}def forward(self, X):"
+        body = indent + "\t"
         for run_id, run in enumerate(self.graph.runs):
-            model_id = run['id']
-            inputs = run['inputs']
-            lines += [
-                f"# Sub-model run {run_id}",
-                "Z = {"
-            ]
-            for k, v in inputs.items():
+            yield f"{body}# Sub-model run {run_id}"
+            yield f"{body}Z = {{"
+            for k, v in run['inputs'].items():
                 if v[0] != -1:
-                    lines.append(f"  \"{k}\" : run_output_{v[0]}[\"{v[1]}\"],")
+                    yield f"{body} \"{k}\" : run_output_{v[0]}[\"{v[1]}\"],"
                 else:
-                    lines.append(f"  \"{k}\" : X[\"{v[1]}\"],")
-            lines += [
-                "}",
-                f"run_output_{run_id} = self.model_{model_id}(Z)",
-            ]
-        lines.append("# Aggregating results")
-        lines.append("RESULT = {}")
-        for output_name, output_source in self.graph.outputs.items():
-            run_id = output_source[0]
-            variable_to_fetch = output_source[1]
-            lines.append(f"RESULT[\"{output_name}\"] = run_output_{run_id}[\"{variable_to_fetch}\"]")
-        lines.append("return RESULT")
-
-        lines = ["def forward(self, X):"] + ['\t' + x for x in lines]
-        return lines
-
-    def imports(self):
-        """
-        Generates a list of Python import statements for the model.
-
-        This method goes through all the submodels in the main model and creates an import line for each unique submodel template.
-        The function also adds an import statement for the `torch` module. 
-        The output is a list of unique import statements.
-
-        Returns:
-            list: A list of unique import statements needed for the model.
+                    yield f"{body} \"{k}\" : X[\"{v[1]}\"],"
+            yield f"{body}}}"
+            yield f"{body}run_output_{run_id} = self.model_{run['id']}(Z)"
+        yield f"{body}# Aggregating results"
+        yield f"{body}RESULT = {{}}"
+        for output_name, (run_id, variable_to_fetch) in self.graph.outputs.items():
+            yield f"{body}RESULT[\"{output_name}\"] = run_output_{run_id}[\"{variable_to_fetch}\"]"
+        yield f"{body}return RESULT"
+
+    def forward_slots_lines(self, indent: str = "") -> Iterator[str]:
         """
-        lines = []
-        for model in self.graph.submodels.values():
-            import_source = model["source"]
-            import_name = model["type"]
-            import_file = import_name + '.py'
-            lines.append(f"from {import_source}.{import_name} import {import_name} as {import_source}_{import_name}")
+        Generates the lines of a forward pass that releases the activations early.
 
-        lines = list(set(lines))
-        lines = ["import torch"] + lines
-        return lines
+        The inputs of each submodel are passed as a dictionary built in the call, and the outputs of its run that are
+        used later are moved from the returned dictionary to local slots. A slot is released after the last run using
+        its value, and reused for the outputs of the next runs (see tensor_slots), so that the intermediate outputs are
+        freed as soon as they are no longer needed.
 
-    def props_lines(self):
-        lines = ["", "\"\"\"", "BEGIN_PROPS"]
-
-        lines += [json.dumps(self.props, indent="\t")]
-
-        lines += ["END_PROPS", "\"\"\""]
-
-        return lines
+        Args:
+            indent (str): The indentation of the method.
 
-    def full_model(self):
+        Yields:
+            str: The lines of Python code representing the forward pass of the model, indented.
         """
-        Generates a list of all the lines that make up the model.
+        slots, released, _ = tensor_slots(self.graph)
+        kept_outputs = [[] for _ in self.graph.runs]
+        for (source, variable), slot in slots.items():
+            kept_outputs[source].append((variable, slot))
 
-        This method combines the import statements, class initializations, and forward function, along with the constraints 
-        for the inputs (IN), outputs (OUT), and warnings. 
+        def value(source):
+            return f"X[\"{source[1]}\"]" if source[0] == -1 else f"s{slots[(source[0], source[1])]}"
 
-        The constraints are stored in JSON format, between "BEGIN_PROPS" and "END_PROPS" tags.
+        yield f"{indent}def forward(self, X):"
+        body = indent + "\t"
+        for run_id, run in enumerate(self.graph.runs):
+            inputs = ", ".join(f"\"{k}\": {value(v)}" for k, v in run['inputs'].items())
+            yield f"{body}# Sub-model run {run_id}"
+            yield f"{body}out = self.model_{run['id']}({{{inputs}}})"
+            if released[run_id]:
+                yield f"{body}del {', '.join(f's{slot}' for slot in released[run_id])}"
+            for variable, slot in kept_outputs[run_id]:
+                yield f"{body}s{slot} = out[\"{variable}\"]"
+        outputs = ", ".join(f"\"{name}\": {value(source)}" for name, source in self.graph.outputs.items())
+        yield f"{body}return {{{outputs}}}"
+
+    def imports(self) -> Iterator[str]:
+        """
+        Generates the Python import statements for the model.
 
-        The method returns all the lines of the model and any warnings that may occur during the generation of 
-        the translated properties.
+        This method goes through all the submodels in the main model and creates an import line for each unique submodel template.
+        The function also adds an import statement for the `torch` module.
 
-        Returns:
-            tuple: A tuple containing a list of lines of code that make up the model and a list of warnings.
+        Yields:
+            str: The unique import statements needed for the model.
         """
+        yield "import torch"
+        templates = {submodel_signature(model) for model in self.graph.submodels.values()}
+        for import_name, import_source in sorted(templates, key=lambda template: (template[1], template[0])):
+            yield f"from {import_source}.{import_name} import {import_name} as {import_source}_{import_name}"
+
+    def props_lines(self) -> Iterator[str]:
+        yield ""
+        yield "\"\"\""
+        yield "BEGIN_PROPS"
+        yield json.dumps(self.props, indent="\t", sort_keys=True)
+        yield "END_PROPS"
+        yield "\"\"\""
+
+    def full_model(self) -> Iterator[str]:
+        """
+        Generates all the lines that make up the model, each line once and already indented.
 
-        import_lines = self.imports()
-
-        class_lines = self.initialization_lines()
-        class_lines.append('')
-        class_lines += self.forward_lines()
-        class_lines = ['\t' + x for x in class_lines]
-        class_lines = [f"class {self.model_name}(torch.nn.Module):"] + class_lines
+        This method combines the import statements, class initializations, and forward function, along with the constraints
+        for the inputs (IN), outputs (OUT), and warnings.
 
-        props_lines = self.props_lines()
+        The constraints are stored in JSON format, between "BEGIN_PROPS" and "END_PROPS" tags.
 
-        lines = import_lines + props_lines + [''] + class_lines
-        return lines
+        Yields:
+            str: The lines of code that make up the model.
+        """
+        yield from self.imports()
+        yield from self.props_lines()
+        yield ""
+        yield f"class {self.model_name}(torch.nn.Module):"
+        yield from self.initialization_lines("\t")
+        yield ""
+        yield from (self.forward_slots_lines if self.forward_slots else self.forward_lines)("\t")
+
+    def write(self, file: TextIO):
+        """
+        Writes the source of the model to a text file or buffer, line by line.
+        """
+        for line in self.full_model():
+            file.write(line)
+            file.write("\n")
 
     def create_model_generation_file(self):
         file = """
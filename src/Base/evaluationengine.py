@@ -0,0 +1,407 @@
+import logging
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from .author import Author
+from .modelloader import ModelLoader
+from .modelproperties import ModelParameters
+from .modelskeleton import ModelSkeleton
+from .parameterscache import ParametersCache
+from .populationstore import PopulationStore
+
+"""
+Parallel evaluation of populations of ModelSkeleton.
+
+Each candidate goes through the pipeline: solving of its parameters (ModelParameters, with a per-worker parameters
+cache), generation of its model in memory (Author), loading with a ModelLoader and instantiation with the default
+parameters, then an optional score function taking the model and the skeleton. The candidates are sent in chunks to a
+pool of worker processes that import everything once when they start, and their results are streamed back as the
+chunks complete.
+
+A candidate that kills its worker (e.g. a crash in native code) or blocks it beyond the timeout (the deadline of the
+workers relies on SIGALRM, which does not interrupt native code) only fails itself: the pool is replaced, and the
+candidates that were evaluated at the same time are evaluated again, one at a time, to find the culprit.
+
+The score function, if any, must be picklable (defined at the top level of a module). The models never leave the
+workers: only the scores are sent back. The candidates of a PopulationStore are not sent either: the workers attach to
+the store and only receive the slots of the candidates.
+"""
+
+SOURCE = "evaluated"
+# the time, in seconds, given to a chunk beyond the timeout of its candidates before its worker is considered stuck
+WALL_CLOCK_GRACE = 2.0
+
+_worker = None
+# the barrier the workers of a new pool meet at, so that the pool is only used once they are all ready
+_ready = None
+# the population stores attached by the worker, by name
+_stores: Dict[str, PopulationStore] = {}
+
+
+class EvaluationResult:
+    """
+    The result of the evaluation of a candidate.
+
+    Attributes:
+        index (int): The index of the candidate in the evaluated population.
+        name (str): The name of the model of the candidate.
+        score (Any): The value returned by the score function, None if there is none or if the evaluation failed.
+        error (str): The error that stopped the evaluation, None if it succeeded.
+        duration (float): The duration of the evaluation, in seconds.
+    """
+    __slots__ = ("index", "name", "score", "error", "duration")
+
+    def __init__(self, index: int, name: str, score: Any = None, error: Optional[str] = None, duration: float = 0.):
+        self.index = index
+        self.name = name
+        self.score = score
+        self.error = error
+        self.duration = duration
+
+    def __reduce__(self):
+        return EvaluationResult, (self.index, self.name, self.score, self.error, self.duration)
+
+    def __repr__(self):
+        outcome = f"error={self.error!r}" if self.error is not None else f"score={self.score!r}"
+        return f"EvaluationResult({self.index}, {self.name!r}, {outcome}, duration={self.duration:.3f})"
+
+
+@contextmanager
+def deadline(seconds: Optional[float]):
+    """
+    Raises a TimeoutError in the block if it lasts more than the given number of seconds. The deadline relies on
+    SIGALRM, it is only enforced in the main thread of a process on the platforms that have it.
+    """
+    if not seconds or not hasattr(signal, "setitimer") or threading.current_thread() is not threading.main_thread():
+        yield
+        return
+
+    def on_alarm(signum, frame):
+        raise TimeoutError(f"evaluation exceeded {seconds} seconds")
+
+    previous = signal.signal(signal.SIGALRM, on_alarm)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+class EvaluationWorker:
+    """
+    Runs the evaluation pipeline of the candidates, in a worker process or in the current one.
+
+    Attributes:
+        score (Callable): The score function, called with the model and the skeleton of each candidate.
+        timeout (float): The maximum duration of the evaluation of a candidate, in seconds.
+        loader (ModelLoader): The loader the generated models are registered with during their evaluation.
+        parameters_cache (ParametersCache): The cache of the parameters solved by the worker.
+    """
+
+    def __init__(self, score: Optional[Callable] = None, timeout: Optional[float] = None, cache_size: int = 1024):
+        self.score = score
+        self.timeout = timeout
+        self.loader = ModelLoader()
+        self.parameters_cache = ParametersCache(cache_size)
+
+    def evaluate(self, index: int, name: str, skeleton: ModelSkeleton) -> EvaluationResult:
+        start = time.perf_counter()
+        score = None
+        error = None
+        try:
+            with deadline(self.timeout):
+                parameters = ModelParameters(skeleton, cache=self.parameters_cache)
+                author = Author(name, skeleton, parameters, export=False)
+                model = author.load(self.loader, SOURCE)()
+                if self.score is not None:
+                    score = self.score(model, skeleton)
+        except Exception as exception:
+            error = f"{type(exception).__name__}: {exception}"
+        finally:
+            self.loader.unregister_module(SOURCE, name)
+        return EvaluationResult(index, name, score, error, time.perf_counter() - start)
+
+    def evaluate_stored(self, index: int, name: str, store: PopulationStore, slot: int, individual: int
+                        ) -> EvaluationResult:
+        """
+        Evaluates a copy of the skeleton of the individual in a slot of the store.
+        """
+        try:
+            if store.individual(slot) != individual:
+                raise ValueError(f"The individual {individual} of the slot {slot} was retired")
+            skeleton = store.get(slot).to_skeleton()
+        except Exception as exception:
+            return EvaluationResult(index, name, error=f"{type(exception).__name__}: {exception}")
+        return self.evaluate(index, name, skeleton)
+
+
+def _initialize_worker(score, timeout, sys_paths, torch_threads, cache_size, ready):
+    global _worker, _ready
+    for path in reversed(sys_paths):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+    logging.getLogger().setLevel(logging.WARNING)
+    import torch
+    torch.set_num_threads(torch_threads)
+    _worker = EvaluationWorker(score, timeout, cache_size)
+    _ready = ready
+
+
+def _warm_up() -> int:
+    # each warm up waits for the other ones, so that every worker runs one
+    _ready.wait()
+    return os.getpid()
+
+
+def _evaluate_chunk(tasks: List[Tuple[int, str, ModelSkeleton]]) -> List[EvaluationResult]:
+    return [_worker.evaluate(index, name, skeleton) for index, name, skeleton in tasks]
+
+
+def _evaluate_stored_chunk(store_name: str, tasks: List[Tuple[int, str, int, int]]) -> List[EvaluationResult]:
+    store = _stores.get(store_name)
+    if store is None:
+        store = _stores[store_name] = PopulationStore.attach(store_name)
+    return [_worker.evaluate_stored(index, name, store, slot, individual) for index, name, slot, individual in tasks]
+
+
+class _ChunksRun:
+    """
+    The chunks of candidates of a population submitted to the pool of an engine, at most one per worker at a time so
+    that a broken pool only loses the chunks that were running.
+
+    Attributes:
+        queue (deque): The chunks waiting to be submitted.
+        isolated (deque): The candidates to evaluate alone, as they were running when a worker died or got stuck.
+        in_flight (dict): Maps the future of each submitted chunk to the chunk, its wall-clock deadline (None without
+            timeout) and whether the chunk is an isolated candidate.
+    """
+
+    def __init__(self, engine: "EvaluationEngine", chunks: List[list], evaluate_chunk: Callable, arguments: tuple):
+        self.engine = engine
+        self.evaluate_chunk = evaluate_chunk
+        self.arguments = arguments
+        self.queue = deque(chunks)
+        self.isolated = deque()
+        self.in_flight: Dict[Future, Tuple[list, Optional[float], bool]] = {}
+        self.fill()
+
+    def submit(self, chunk: list, alone: bool):
+        timeout = self.engine.timeout
+        deadline = time.monotonic() + len(chunk) * timeout + WALL_CLOCK_GRACE if timeout else None
+        future = self.engine._executor.submit(self.evaluate_chunk, *self.arguments, chunk)
+        self.in_flight[future] = (chunk, deadline, alone)
+
+    def fill(self):
+        if self.isolated:
+            if not self.in_flight:
+                self.submit([self.isolated.popleft()], True)
+            return
+        while self.queue and len(self.in_flight) < self.engine.max_workers:
+            self.submit(self.queue.popleft(), False)
+
+    def __iter__(self) -> Iterator[EvaluationResult]:
+        while self.in_flight:
+            deadlines = [deadline for chunk, deadline, alone in self.in_flight.values() if deadline is not None]
+            timeout = max(0., min(deadlines) - time.monotonic()) if deadlines else None
+            done, _ = wait(self.in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+            now = time.monotonic()
+            expired = {future for future, (chunk, deadline, alone) in self.in_flight.items()
+                       if future not in done and deadline is not None and deadline <= now}
+            if expired or any(isinstance(future.exception(), BrokenProcessPool) for future in done):
+                yield from self.recover(expired)
+            else:
+                for future in done:
+                    yield from self.engine._chunk_results(future, self.in_flight.pop(future)[0])
+            self.fill()
+
+    def recover(self, expired) -> Iterator[EvaluationResult]:
+        """
+        Sorts out the chunks in flight when the pool is broken, by a dead worker or by the engine killing its stuck
+        workers, then replaces the pool.
+        """
+        if expired:
+            self.engine._kill_workers()
+        wait(self.in_flight)
+        for future, (chunk, deadline, alone) in self.in_flight.items():
+            exception = future.exception()
+            if not isinstance(exception, BrokenProcessPool):
+                yield from self.engine._chunk_results(future, chunk)
+            elif alone and future in expired:
+                error = f"TimeoutError: evaluation exceeded {self.engine.timeout} seconds and its worker was killed"
+                yield EvaluationResult(chunk[0][0], chunk[0][1], error=error)
+            elif alone:
+                # the candidate was evaluated alone: it killed its worker
+                yield from self.engine._chunk_results(future, chunk)
+            elif expired and future not in expired:
+                # lost with the workers killed for another chunk
+                self.queue.appendleft(chunk)
+            else:
+                self.isolated.extend(chunk)
+        self.in_flight.clear()
+        self.engine._recycle()
+
+
+class EvaluationEngine:
+    """
+    Evaluates populations of skeletons on a pool of worker processes.
+
+    The pool is started on first use (or by start, or when entering the engine as a context manager) and kept for the
+    next populations until shutdown. With max_workers set to 0, the candidates are evaluated in the current process.
+    The pool is replaced when a worker dies, and when a chunk lasts more than its timeout plus WALL_CLOCK_GRACE (its
+    workers are then killed): the candidate responsible fails with an error, the others are evaluated again.
+
+    Attributes:
+        max_workers (int): The number of worker processes, the number of CPUs by default.
+        score (Callable): The score function, called with the model and the skeleton of each candidate.
+        chunk_size (int): The number of candidates sent to a worker at once.
+        timeout (float): The maximum duration of the evaluation of a candidate, in seconds.
+        sys_paths (Sequence[str]): The paths added to the import path of the workers, where the templates are found.
+        torch_threads (int): The number of threads used by torch in each worker.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, score: Optional[Callable] = None, chunk_size: int = 4,
+                 timeout: Optional[float] = None, sys_paths: Sequence[str] = (), torch_threads: int = 1,
+                 cache_size: int = 1024, mp_context=None):
+        if chunk_size <= 0:
+            raise ValueError(f"chunk_size must be positive, got {chunk_size}")
+        self.max_workers = (os.cpu_count() or 1) if max_workers is None else max_workers
+        self.score = score
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+        self.sys_paths = list(sys_paths)
+        self.torch_threads = torch_threads
+        self.cache_size = cache_size
+        self.mp_context = mp_context
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._local_worker: Optional[EvaluationWorker] = None
+
+    def start(self) -> "EvaluationEngine":
+        """
+        Starts the workers and waits until they are all ready.
+        """
+        if self.max_workers == 0:
+            if self._local_worker is None:
+                self._local_worker = EvaluationWorker(self.score, self.timeout, self.cache_size)
+        elif self._executor is None or getattr(self._executor, "_broken", False):
+            if self._executor is not None:
+                self._executor.shutdown(cancel_futures=True)
+            context = self.mp_context or multiprocessing.get_context()
+            if context.get_start_method() == "fork":
+                # the forked workers, and the ones that replace them, inherit torch instead of importing it each
+                import torch
+            # the deadlines of the chunks must not run while workers are still importing
+            ready = context.Barrier(self.max_workers)
+            self._executor = ProcessPoolExecutor(
+                self.max_workers, mp_context=context, initializer=_initialize_worker,
+                initargs=(self.score, self.timeout, self.sys_paths, self.torch_threads, self.cache_size, ready))
+            for future in [self._executor.submit(_warm_up) for _ in range(self.max_workers)]:
+                future.result()
+        return self
+
+    def _kill_workers(self):
+        # the workers stuck in native code ignore the deadline: killing them breaks the pool
+        kill_workers = getattr(self._executor, "kill_workers", None)
+        if kill_workers is not None:
+            kill_workers()
+            return
+        for process in list(getattr(self._executor, "_processes", {}).values()):
+            process.kill()
+
+    def _recycle(self):
+        """
+        Replaces a broken pool by a new one.
+        """
+        self._executor.shutdown(cancel_futures=True)
+        self._executor = None
+        self.start()
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+        self._local_worker = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
+
+    def submit(self, skeletons: Iterable[ModelSkeleton], names: Optional[Iterable[str]] = None
+               ) -> Iterator[EvaluationResult]:
+        """
+        Evaluates the skeletons, by default named 'candidate_<index>'.
+
+        :return: An iterator over the results, in the order the evaluations complete.
+        """
+        skeletons = list(skeletons)
+        names = [f"candidate_{index}" for index in range(len(skeletons))] if names is None else list(names)
+        if len(names) != len(skeletons):
+            raise ValueError("Expected as many names as skeletons")
+        tasks = list(zip(range(len(skeletons)), names, skeletons))
+        self.start()
+        if self._executor is None:
+            return (self._local_worker.evaluate(*task) for task in tasks)
+        return self._submit_chunks(tasks, _evaluate_chunk)
+
+    def submit_store(self, store: PopulationStore, slots: Optional[Iterable[int]] = None,
+                     names: Optional[Iterable[str]] = None) -> Iterator[EvaluationResult]:
+        """
+        Evaluates the individuals of a population store, those of the given slots or all of them, by default named
+        'candidate_<index>'. The workers read the skeletons from the store: the individuals must not be retired
+        before their evaluation completes.
+
+        :return: An iterator over the results, indexed by position in the slots, in the order the evaluations
+        complete.
+        """
+        slots = store.slots() if slots is None else list(slots)
+        names = [f"candidate_{index}" for index in range(len(slots))] if names is None else list(names)
+        if len(names) != len(slots):
+            raise ValueError("Expected as many names as slots")
+        tasks = [(index, name, slot, store.individual(slot)) for index, (name, slot) in enumerate(zip(names, slots))]
+        self.start()
+        if self._executor is None:
+            return (self._local_worker.evaluate_stored(index, name, store, slot, individual)
+                    for index, name, slot, individual in tasks)
+        return self._submit_chunks(tasks, _evaluate_stored_chunk, store.name)
+
+    def _submit_chunks(self, tasks: list, evaluate_chunk: Callable, *arguments) -> Iterator[EvaluationResult]:
+        chunks = [tasks[position:position + self.chunk_size] for position in range(0, len(tasks), self.chunk_size)]
+        return iter(_ChunksRun(self, chunks, evaluate_chunk, arguments))
+
+    @staticmethod
+    def _chunk_results(future: Future, chunk: List[tuple]) -> List[EvaluationResult]:
+        exception = future.exception()
+        if exception is None:
+            return future.result()
+        # the worker could not send the results back (e.g. it died), every candidate of the chunk failed
+        error = f"{type(exception).__name__}: {exception}"
+        return [EvaluationResult(task[0], task[1], error=error) for task in chunk]
+
+    def evaluate(self, skeletons: Iterable[ModelSkeleton], names: Optional[Iterable[str]] = None
+                 ) -> List[EvaluationResult]:
+        """
+        Evaluates the skeletons, by default named 'candidate_<index>'.
+
+        :return: The results, in the order of the skeletons.
+        """
+        return sorted(self.submit(skeletons, names), key=lambda result: result.index)
+
+    def evaluate_store(self, store: PopulationStore, slots: Optional[Iterable[int]] = None,
+                       names: Optional[Iterable[str]] = None) -> List[EvaluationResult]:
+        """
+        Evaluates the individuals of a population store, those of the given slots or all of them.
+
+        :return: The results, in the order of the slots.
+        """
+        return sorted(self.submit_store(store, slots, names), key=lambda result: result.index)
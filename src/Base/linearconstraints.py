@@ -0,0 +1,268 @@
+import re
+from fractions import Fraction
+from typing import Dict, Iterable, List, Optional, Tuple
+
+"""
+A solver for the symbolic constraints that are linear in the parameters of a model (e.g. "out = in * 4" or
+"a = b + c"). Such systems are solved by Gauss-Jordan elimination over the rationals on sparse rows, without
+going through sympy. Formulas that are not linear in the parameters are reported as such so that the caller can fall
+back to sympy.
+"""
+
+
+class NonLinearFormula(Exception):
+    pass
+
+
+class InconsistentSystem(Exception):
+    pass
+
+
+class LinearExpression:
+    """
+    An affine expression of parameters with rational coefficients: sum(coefficients[param] * param) + constant.
+
+    Attributes:
+        coefficients (Dict[str, Fraction]): The coefficient of each parameter, zero coefficients are not stored.
+        constant (Fraction): The constant term of the expression.
+    """
+
+    def __init__(self, coefficients: Optional[Dict[str, Fraction]] = None, constant=0):
+        self.coefficients: Dict[str, Fraction] = {}
+        for param, coefficient in (coefficients or {}).items():
+            if coefficient != 0:
+                self.coefficients[param] = Fraction(coefficient)
+        self.constant = Fraction(constant)
+
+    def is_constant(self) -> bool:
+        return not self.coefficients
+
+    def __add__(self, other: "LinearExpression") -> "LinearExpression":
+        coefficients = dict(self.coefficients)
+        for param, coefficient in other.coefficients.items():
+            coefficients[param] = coefficients.get(param, 0) + coefficient
+        return LinearExpression(coefficients, self.constant + other.constant)
+
+    def __neg__(self) -> "LinearExpression":
+        return self.scale(-1)
+
+    def __sub__(self, other: "LinearExpression") -> "LinearExpression":
+        return self + (-other)
+
+    def scale(self, factor) -> "LinearExpression":
+        return LinearExpression({param: coefficient * factor for param, coefficient in self.coefficients.items()},
+                                self.constant * factor)
+
+    def __mul__(self, other: "LinearExpression") -> "LinearExpression":
+        if other.is_constant():
+            return self.scale(other.constant)
+        if self.is_constant():
+            return other.scale(self.constant)
+        raise NonLinearFormula("product of parameters")
+
+    def __truediv__(self, other: "LinearExpression") -> "LinearExpression":
+        if not other.is_constant():
+            raise NonLinearFormula("division by a parameter")
+        if other.constant == 0:
+            raise ZeroDivisionError("division by zero in a constraint")
+        return self.scale(1 / other.constant)
+
+    def substitute(self, values: Dict[str, "LinearExpression"]) -> "LinearExpression":
+        """
+        :param values: A dictionary mapping parameters to the expression replacing them.
+        :return: The expression with the given parameters replaced.
+        """
+        result = LinearExpression(constant=self.constant)
+        for param, coefficient in self.coefficients.items():
+            if param in values:
+                result = result + values[param].scale(coefficient)
+            else:
+                result = result + LinearExpression({param: coefficient})
+        return result
+
+    def evaluate(self, values: Dict[str, Fraction]) -> Fraction:
+        return sum((coefficient * values[param] for param, coefficient in self.coefficients.items()), self.constant)
+
+    def to_sympy(self):
+        from sympy import Rational, Symbol
+
+        return sum((Rational(c.numerator, c.denominator) * Symbol(p) for p, c in self.coefficients.items()),
+                   Rational(self.constant.numerator, self.constant.denominator))
+
+    def __eq__(self, other):
+        if not isinstance(other, LinearExpression):
+            return NotImplemented
+        return self.coefficients == other.coefficients and self.constant == other.constant
+
+    def __hash__(self):
+        return hash((frozenset(self.coefficients.items()), self.constant))
+
+    def __str__(self):
+        terms = []
+        for param, coefficient in sorted(self.coefficients.items()):
+            if coefficient == 1:
+                terms.append(param)
+            elif coefficient == -1:
+                terms.append(f"-{param}")
+            else:
+                terms.append(f"{coefficient}*{param}")
+        if self.constant != 0 or not terms:
+            terms.append(str(self.constant))
+        return " + ".join(terms).replace("+ -", "- ")
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self})"
+
+
+_TOKEN = re.compile(r"\s*(?:(\d+(?:\.\d*)?|\.\d+)|([A-Za-z_]\w*)|(\*\*|[-+*/()]))")
+
+
+def _tokenize(text: str) -> List[Tuple[str, str]]:
+    tokens = []
+    position = 0
+    text = text.rstrip()
+    while position < len(text):
+        match = _TOKEN.match(text, position)
+        if match is None:
+            raise NonLinearFormula(f"unsupported syntax in {text!r}")
+        number, name, operator = match.groups()
+        if number is not None:
+            tokens.append(("number", number))
+        elif name is not None:
+            tokens.append(("name", name))
+        else:
+            tokens.append(("operator", operator))
+        position = match.end()
+    return tokens
+
+
+class _Parser:
+    """
+    Recursive descent parser of arithmetic expressions into LinearExpression:
+        expression := term (('+' | '-') term)*
+        term := factor (('*' | '/') factor)*
+        factor := ('+' | '-') factor | power
+        power := atom ('**' factor)?
+        atom := number | name | '(' expression ')'
+    """
+
+    def __init__(self, text: str):
+        self.tokens = _tokenize(text)
+        self.position = 0
+
+    def peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else (None, None)
+
+    def take(self):
+        token = self.peek()
+        self.position += 1
+        return token
+
+    def parse(self) -> LinearExpression:
+        expression = self.expression()
+        if self.position != len(self.tokens):
+            raise NonLinearFormula(f"unexpected token {self.peek()[1]!r}")
+        return expression
+
+    def expression(self) -> LinearExpression:
+        result = self.term()
+        while self.peek() in (("operator", "+"), ("operator", "-")):
+            operator = self.take()[1]
+            result = result + self.term() if operator == "+" else result - self.term()
+        return result
+
+    def term(self) -> LinearExpression:
+        result = self.factor()
+        while self.peek() in (("operator", "*"), ("operator", "/")):
+            operator = self.take()[1]
+            result = result * self.factor() if operator == "*" else result / self.factor()
+        return result
+
+    def factor(self) -> LinearExpression:
+        if self.peek() in (("operator", "+"), ("operator", "-")):
+            operator = self.take()[1]
+            return self.factor() if operator == "+" else -self.factor()
+        return self.power()
+
+    def power(self) -> LinearExpression:
+        base = self.atom()
+        if self.peek() == ("operator", "**"):
+            self.take()
+            exponent = self.factor()
+            if exponent.is_constant() and exponent.constant == 1:
+                return base
+            if not (base.is_constant() and exponent.is_constant() and exponent.constant.denominator == 1):
+                raise NonLinearFormula("power of a parameter")
+            return LinearExpression(constant=base.constant ** exponent.constant.numerator)
+        return base
+
+    def atom(self) -> LinearExpression:
+        kind, value = self.take()
+        if kind == "number":
+            return LinearExpression(constant=Fraction(value))
+        if kind == "name":
+            if self.peek() == ("operator", "("):
+                raise NonLinearFormula(f"function call {value}")
+            return LinearExpression({value: 1})
+        if (kind, value) == ("operator", "("):
+            result = self.expression()
+            if self.take() != ("operator", ")"):
+                raise NonLinearFormula("unbalanced parenthesis")
+            return result
+        raise NonLinearFormula(f"unexpected token {value!r}")
+
+
+def parse_linear_equation(formula: str) -> Optional[LinearExpression]:
+    """
+    :param formula: An equation "lhs = rhs" written in terms of parameters.
+    :return: The expression lhs - rhs, that the equation constrains to 0, or None if the formula is not an equation.
+    Raises NonLinearFormula if the formula is not linear in the parameters.
+    """
+    if ' = ' not in formula:
+        return None
+    lhs, rhs = formula.split(' = ')
+    return _Parser(lhs).parse() - _Parser(rhs).parse()
+
+
+def solve_linear_constraints(formulas: Iterable[str], constrained_params: Iterable[str] = ()) \
+        -> Optional[Dict[str, LinearExpression]]:
+    """
+    Solves a system of linear equations by Gauss-Jordan elimination over the rationals.
+
+    Each equation is used to solve for one parameter (its pivot): the constrained parameters are chosen first, then
+    the first parameter appearing in the equation, so that "out = in * 2" solves for out. The solved parameters are
+    expressed in terms of the parameters left free.
+
+    :param formulas: The formulas of the system, in terms of parameters. Formulas that are not equations
+    (inequalities) are ignored.
+    :param constrained_params: The parameters that must be expressed from the others when possible.
+    :return: A dictionary mapping the solved parameters to their expression, or None if one of the formulas is not
+    linear in the parameters.
+    Raises InconsistentSystem if the equations contradict each other.
+    """
+    try:
+        rows = [row for row in (parse_linear_equation(formula) for formula in formulas) if row is not None]
+    except NonLinearFormula:
+        return None
+
+    constrained_params = set(constrained_params)
+    # pivot parameter -> expression of the pivot in terms of the non pivot parameters
+    pivots: Dict[str, LinearExpression] = {}
+    for row in rows:
+        # express the row in terms of non pivot parameters only
+        row = row.substitute({param: pivots[param] for param in row.coefficients if param in pivots})
+        if row.is_constant():
+            if row.constant != 0:
+                raise InconsistentSystem(f"{row.constant} = 0")
+            continue
+        params = list(row.coefficients)
+        pivot = next((param for param in params if param in constrained_params), params[0])
+        coefficient = row.coefficients[pivot]
+        del row.coefficients[pivot]
+        expression = row.scale(-1 / coefficient)
+        # keep the other pivots expressed in terms of non pivot parameters
+        for param, pivot_expression in pivots.items():
+            if pivot in pivot_expression.coefficients:
+                pivots[param] = pivot_expression.substitute({pivot: expression})
+        pivots[pivot] = expression
+    return pivots
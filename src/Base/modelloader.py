@@ -1,6 +1,7 @@
 import os
 import sys
 import importlib
+import linecache
 
 
 class ModelLoader:
@@ -8,6 +9,8 @@ class ModelLoader:
         self.models_modules = {}
         self.models_classes = {}
         self.base_path = base_path or os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+        # number of registrations of each module built in memory, by file name, to release its lines in linecache
+        self._memory_modules = {}
         sys.path.append(self.base_path)
 
     def load_model_class(self, source, model_type, reload=False):
@@ -22,10 +25,45 @@ class ModelLoader:
         self.models_modules.setdefault(source, {})[model_type] = model_module
         self.models_classes.setdefault(source, {})[model_type] = getattr(model_module, model_type)
 
+    def register_module(self, source, model_type, model_module):
+        """
+        Registers a module built in memory (see Author.load), which holds a class named after the model type.
+        """
+        filename = getattr(model_module, "__file__", None)
+        if filename is not None:
+            self._memory_modules[filename] = self._memory_modules.get(filename, 0) + 1
+        previous_module = self.models_modules.setdefault(source, {}).get(model_type)
+        self.models_modules[source][model_type] = model_module
+        self.models_classes.setdefault(source, {})[model_type] = getattr(model_module, model_type)
+        if previous_module is not None:
+            self._release(previous_module)
+
+    def unregister_module(self, source, model_type):
+        """
+        Forgets a model module, so that a module built in memory can be freed once its models are no longer used. The
+        generated lines of a module built in memory are dropped from linecache with its last registration.
+        """
+        model_module = self.models_modules.get(source, {}).pop(model_type, None)
+        self.models_classes.get(source, {}).pop(model_type, None)
+        if model_module is not None:
+            self._release(model_module)
+
+    def _release(self, model_module):
+        filename = getattr(model_module, "__file__", None)
+        count = self._memory_modules.get(filename)
+        if count is None:
+            return
+        if count > 1:
+            self._memory_modules[filename] = count - 1
+        else:
+            del self._memory_modules[filename]
+            linecache.cache.pop(filename, None)
+
     def new(self, source, model_type, model_parameters, reload=False):
         if source not in self.models_classes or model_type not in self.models_classes[source]:
             self.load_model_class(source, model_type)
-        elif reload:
+        # modules registered from memory have no spec and nothing to reload from
+        elif reload and self.models_modules[source][model_type].__spec__ is not None:
             self.load_model_class(source, model_type, reload=True)
 
         return self.models_classes[source][model_type](**model_parameters)
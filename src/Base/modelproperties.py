@@ -2,67 +2,156 @@ import json
 import os
 from .modelskeleton import ModelSkeleton
 from .modeltemplate import ModelTemplate
-from typing import Iterable, Dict, Any
-from sympy import symbols, Eq, solve, sympify
+from .linearconstraints import InconsistentSystem, solve_linear_constraints
+from .parameterscache import ParametersCache, parameters_key
+from typing import Iterable, Dict, Any, List, Optional
 import copy
 
-from torch.nn import Linear
-
 
 # utility class to manage families of parameters generated by constraints
 class Subsets:
+    """
+    Equivalence classes of elements, stored as a disjoint-set forest.
+
+    Elements are indexed by integers, each index pointing to a parent index (itself for the representative of a
+    class). Lookups compress the paths they walk and merges attach the shallower tree under the deeper one, so that
+    merging and finding representatives run in quasi-constant amortized time. The equivalence classes themselves are
+    only materialized when asked for, and cached until the next modification.
+
+    Attributes:
+        reduced_list (set): The representatives of the equivalence classes.
+    """
     def __init__(self, elements: Iterable):
-        self.data = {el: {el} for el in elements}
-        self.reduced_list = {el for el in elements}
-        self.inverse_reduced_list = {id(self.data[el]): el for el in self.reduced_list}
+        self.elements: List[Any] = []
+        self.index: Dict[Any, int] = {}
+        self.parent: List[int] = []
+        self.rank: List[int] = []
+        self.reduced_list = set()
+        self._classes: Optional[Dict[int, set]] = None
+        self.check_extend(elements)
+
+    def _find(self, i: int) -> int:
+        parent = self.parent
+        while parent[i] != i:
+            # path halving: every other node on the path now points to its grandparent
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def _get_classes(self) -> Dict[int, set]:
+        if self._classes is None:
+            classes = {}
+            for el, i in self.index.items():
+                root = self._find(i)
+                if root in classes:
+                    classes[root].add(el)
+                else:
+                    classes[root] = {el}
+            self._classes = classes
+        return self._classes
 
     def __getitem__(self, item):
-        if item in self.data:
-            return self.inverse_reduced_list[id(self.data[item])]
+        if item in self.index:
+            return self.elements[self._find(self.index[item])]
         else:
             raise KeyError(f'No key {item} found')
 
+    def __contains__(self, item):
+        return item in self.index
+
+    def __iter__(self):
+        return iter(self.index)
+
     def get_equivalence_class(self,item):
-        if item in self.data:
-            return self.data[item]
+        if item in self.index:
+            return self._get_classes()[self._find(self.index[item])]
         else:
             raise KeyError(f'No key {item} found')
 
     def merge(self, el1, el2):
-        if el1 in self.data and el2 in self.data:
-            ref_1, ref_2 = self[el1], self[el2]
-
-            union = self.data[ref_1].union(self.data[ref_2])
-            id_class_ref1 = id(self.data[ref_1])
-            id_class_ref2 = id(self.data[ref_2])
-            for el in union:
-                self.data[el] = union
-            if ref_1 != ref_2:
-                del self.inverse_reduced_list[id_class_ref2]
-                self.reduced_list.discard(ref_2)
-            self.inverse_reduced_list[id(union)] = ref_1
-            if id(union) != id_class_ref1:
-                del self.inverse_reduced_list[id_class_ref1]
+        if el1 in self.index and el2 in self.index:
+            root_1, root_2 = self._find(self.index[el1]), self._find(self.index[el2])
+            if root_1 == root_2:
+                return
+            if self.rank[root_1] < self.rank[root_2]:
+                root_1, root_2 = root_2, root_1
+            self.parent[root_2] = root_1
+            if self.rank[root_1] == self.rank[root_2]:
+                self.rank[root_1] += 1
+            self.reduced_list.discard(self.elements[root_2])
+            self._classes = None
         else:
             raise ValueError(f'One or both elements are not found: {el1} , {el2}')
 
+    def copy(self) -> "Subsets":
+        """
+        :return: An independent copy of the subsets, keeping the same representatives
+        """
+        subsets = Subsets([])
+        subsets.elements = self.elements.copy()
+        subsets.index = self.index.copy()
+        subsets.parent = self.parent.copy()
+        subsets.rank = self.rank.copy()
+        subsets.reduced_list = self.reduced_list.copy()
+        return subsets
+
+    def split(self, elements: Iterable):
+        """
+        Splits the equivalence classes of the given elements, every member of those classes becoming its own class.
+        """
+        classes = self._get_classes()
+        for el in elements:
+            if el not in self.index:
+                raise KeyError(f'No key {el} found')
+            root = self._find(self.index[el])
+            equivalence_class = classes.pop(root, None)
+            if equivalence_class is None or len(equivalence_class) == 1:
+                continue
+            for member in equivalence_class:
+                i = self.index[member]
+                self.parent[i] = i
+                self.rank[i] = 0
+                self.reduced_list.add(member)
+        self._classes = None
+
+    def discard(self, el):
+        """
+        Removes an element, the other members of its equivalence class becoming their own classes.
+        """
+        if el in self.index:
+            self.split([el])
+            # the slot of the element is left unused
+            del self.index[el]
+            self.reduced_list.discard(el)
+            self._classes = None
+
     def check_add(self, el: object):
-        if el not in self.data:
-            self.data[el] = {el}
+        if el not in self.index:
+            i = len(self.elements)
+            self.elements.append(el)
+            self.index[el] = i
+            self.parent.append(i)
+            self.rank.append(0)
             self.reduced_list.add(el)
+            if self._classes is not None:
+                self._classes[i] = {el}
 
     def check_extend(self, elements: Iterable):
         for el in elements:
             self.check_add(el)
 
 
-
 class ModelParameters:
     """
     Initialize ModelPropertiesMapper with the given parameters.
 
     :param model_skeleton: An instance of ModelSkeleton class.
-    :param detailed_props: A boolean indicating whether to generate detailed properties.
+    :param parent: An optional ModelParameters already solved for a skeleton this one derives from (e.g. the parent
+    of a mutated skeleton). Only the constraints that differ from the parent's are generated, and only the
+    equivalence classes and symbolic constraints they affect are solved again.
+    :param cache: An optional ParametersCache. If the same skeleton, with the same submodels properties, was solved
+    before, the constraints and the solution are taken from the cache instead of being generated and solved (the cached
+    state is shared and must be treated as read-only).
 
     !! This class reads the properties of the submodels, inputs and outputs properties of the model_skeleton so make
     sure those are sufficiently completed before.!!
@@ -72,55 +161,128 @@ class ModelParameters:
         - "name": the name of the model
 
     """
-    def __init__(self, model_skeleton: ModelSkeleton):
+    def __init__(self, model_skeleton: ModelSkeleton, parent: "ModelParameters" = None,
+                 cache: Optional[ParametersCache] = None):
 
         self.param_subset: Subsets = None
         self.model_skeleton = model_skeleton
         self.props: dict = None
         self.constraints: dict = {"equality": [], "symbolic": [], "parameter": {}}
         self.sympy_data: dict = {}
+        self.sub_props: dict = None
         self.variables_props = None
 
+        # origin of the constraints ('submodel', model_id), ('link', link) or ('inputs',) -> generated constraints,
+        # kept so that derived ModelParameters only generate the constraints of new origins
+        self._constraints_origins: Dict[tuple, Any] = {}
+        # symbolic constraints component -> solution, reused by derived ModelParameters
+        self._symbolic_solutions: Dict[tuple, dict] = {}
+
         self.model_skeleton.build_templates()
 
         self._find_all_parameters()
-        self.generate_constraints()
-        self.generate_global_parameters()
+        cache_key = parameters_key(self.model_skeleton, self.sub_props) if cache is not None else None
+        if cache_key is not None:
+            state = cache.get(cache_key)
+            if state is not None:
+                self._restore_state(state)
+                return
+
+        if parent is None:
+            self.generate_constraints()
+            self.generate_global_parameters()
+        else:
+            self._derive_from_parent(parent)
         self.solve_symbolic_constraints()
+        if cache_key is not None:
+            cache.put(cache_key, self._get_state())
+
+    def _get_state(self) -> dict:
+        """
+        :return: The solved state of the parameters, as stored by ParametersCache.
+        """
+        return {
+            "param_subset": self.param_subset,
+            "constraints": self.constraints,
+            "sympy_data": self.sympy_data,
+            "constraints_origins": self._constraints_origins,
+            "symbolic_solutions": self._symbolic_solutions,
+        }
+
+    def _restore_state(self, state: dict):
+        self.param_subset = state["param_subset"].copy()
+        self.constraints = state["constraints"]
+        self.sympy_data = state["sympy_data"]
+        self._constraints_origins = state["constraints_origins"]
+        self._symbolic_solutions = state["symbolic_solutions"]
 
     # Solves the constraints on the model and generate the local and global dictionaries of parameters
     def _find_all_parameters(self):
 
-        parameter_list = []
-        for name, template in self.model_skeleton.submodels.items():
-            template_parameters = template.parameters
-            parameter_list.extend([(name, parameter_name) for parameter_name in template_parameters.keys()])
+        self.sub_props = {name: template.properties for name, template in self.model_skeleton.submodels.items()}
+        self.check_and_generate_variables_parameters()
+        self.variables_props = self._find_variables_props()
 
+        parameter_list = [self.get_extended_parameter_name(model_id, parameter_id)
+                          for model_id, model in self.sub_props.items() for parameter_id in model['parameters'].keys()]
         self.param_subset = Subsets(parameter_list)
 
+    def _find_variables_props(self):
+        """
+        :return: A dictionary mapping the input and output variables of the model to their properties ('dim' and 'io')
 
-
-    def generate_constraints(self):
-
+        The dimensions are read from the variables of the submodels the model variables are connected to.
+        """
         runs = self.model_skeleton.runs
-        for submodel_id, submodel in self.sub_props.items():
-            for index, run in enumerate(runs):
-                for var_name, data in run['inputs'].items():
-                    input_run, input_var = data
-                    if input_run > -1:
-                        self.convert_run_linking_to_equality_constraint(((input_run,input_var),(index,var_name)))
-            for constraint in submodel['constraints']:
-                if constraint[0] == 'equality':
-                    global_constraint = [self.get_extended_parameter_name(submodel_id, param) for param in constraint[1]]
-                    self.add_an_equality_constraint(global_constraint)
-                if constraint[0] == 'symbolic':
-                    global_constraint = copy.copy(constraint[1])
-                    global_constraint[0] = [self.get_extended_parameter_name(submodel_id, param) for param in global_constraint[0]]
-                    self.add_a_symbolic_constraint(global_constraint)
-                if constraint[0] == 'parameter':
-                    global_constraint = (self.get_extended_parameter_name(submodel_id, constraint[1][0]), constraint[1][1])
-                    self.add_a_parameter_constraint(global_constraint)
-        # add inputs equality constraints
+        variables_props = {}
+        for input_var in self.model_skeleton.inputs:
+            run_id, model_var = self.model_skeleton.find_models_variables_connected_to_input(input_var)[0]
+            model_id = runs[run_id]['id']
+            variables_props[input_var] = {'dim': self.sub_props[model_id]['variables'][model_var]['dim'], 'io': 'in'}
+        for output_var, (run_id, model_var) in self.model_skeleton.outputs.items():
+            model_id = runs[run_id]['id']
+            variables_props[output_var] = {'dim': self.sub_props[model_id]['variables'][model_var]['dim'], 'io': 'out'}
+        return variables_props
+
+    def _find_links(self) -> Dict[tuple, int]:
+        """
+        :return: A dictionary mapping each link (input_model, input_variable, output_model, output_variable) used
+        between the runs of the skeleton to the number of runs using it.
+        """
+        runs = self.model_skeleton.runs
+        links = {}
+        for run in runs:
+            for var_name, (input_run, input_var) in run['inputs'].items():
+                if input_run > -1:
+                    link = (runs[input_run]['id'], input_var, run['id'], var_name)
+                    links[link] = links.get(link, 0) + 1
+        return links
+
+    def _generate_submodel_constraints(self, submodel_id):
+        """
+        :param submodel_id: The id of the submodel in the skeleton
+        :return: A dictionary with the 'equality', 'symbolic' and 'parameter' constraints of the submodel, in terms of
+        extended parameter names
+        """
+        constraints = {'equality': [], 'symbolic': [], 'parameter': []}
+        for constraint in self.sub_props[submodel_id].get('constraints', []):
+            if constraint[0] == 'equality':
+                global_constraint = [self.get_extended_parameter_name(submodel_id, param) for param in constraint[1]]
+                constraints['equality'].append(global_constraint)
+            if constraint[0] == 'symbolic':
+                global_constraint = copy.copy(constraint[1])
+                global_constraint[0] = [self.get_extended_parameter_name(submodel_id, param) for param in global_constraint[0]]
+                constraints['symbolic'].append(global_constraint)
+            if constraint[0] == 'parameter':
+                global_constraint = (self.get_extended_parameter_name(submodel_id, constraint[1][0]), constraint[1][1])
+                constraints['parameter'].append(global_constraint)
+        return constraints
+
+    def _generate_inputs_constraints(self):
+        """
+        :return: The equality constraints between the dimensions of all the submodels variables fed by the same input
+        """
+        constraints = []
         inputs = self.model_skeleton.inputs
         for input_var in inputs:
             related_variables = self.model_skeleton.find_models_variables_connected_to_input(input_var)
@@ -133,94 +295,206 @@ class ModelParameters:
                     if main_parameter is None:
                         main_parameter = var_parameter
                     else:
-                        global_constraint = [main_parameter, var_parameter]
-                        self.add_an_equality_constraint(global_constraint)
-        
+                        constraints.append([main_parameter, var_parameter])
+        return constraints
+
+    def _assemble_constraints(self):
+        """
+        Fills self.constraints from the constraints generated for each origin.
+        """
+        self.constraints = {"equality": [], "symbolic": [], "parameter": {}}
+        for origin, constraints in self._constraints_origins.items():
+            if origin[0] == 'submodel':
+                for constraint in constraints['equality']:
+                    self.add_an_equality_constraint(constraint)
+                for constraint in constraints['symbolic']:
+                    self.add_a_symbolic_constraint(constraint)
+                for constraint in constraints['parameter']:
+                    self.add_a_parameter_constraint(constraint)
+            else:
+                for constraint in constraints:
+                    self.add_an_equality_constraint(constraint)
+
+    def generate_constraints(self):
+
+        self._constraints_origins = {}
+        for submodel_id in self.sub_props:
+            self._constraints_origins[('submodel', submodel_id)] = self._generate_submodel_constraints(submodel_id)
+        for link in self._find_links():
+            self._constraints_origins[('link', link)] = self.convert_run_linking_to_equality_constraint(link)
+        # add inputs equality constraints
+        self._constraints_origins[('inputs',)] = self._generate_inputs_constraints()
+        self._assemble_constraints()
 
     def generate_global_parameters(self):
 
         # generates list of global names for all parameters
-        all_params = [self.get_extended_parameter_name(model_id, parameter_id) for model_id, model in self.sub_props.items() for
-                      parameter_id in model['parameters'].keys()]
-        self.param_subset = Subsets(all_params)
         for constraint in self.constraints['equality']:
             param_0 = constraint[0]
             for param in constraint[1:]:
                 self.param_subset.merge(param_0, param)
 
+        self._reduce_parameter_constraints()
 
-        # rewrite symbolic constraints in terms of global variables only
-        for constraint in self.constraints['symbolic']:
-            for parameter in constraint[0]:
-                parameter = self.param_subset[parameter]
-        for param in self.constraints['parameter']:
+    def _reduce_parameter_constraints(self):
+        # rewrite parameter constraints in terms of global variables only
+        for param in list(self.constraints['parameter']):
             reference = self.param_subset[param]
-            if reference is not param:
-                self.constraints['parameter'][reference].extend(self.constraints['parameter'][param])
+            if reference != param:
+                self.constraints['parameter'].setdefault(reference, []).extend(self.constraints['parameter'][param])
                 del self.constraints['parameter'][param]
 
+    def _derive_from_parent(self, parent: "ModelParameters"):
+        """
+        Generates the constraints and the global parameters from the solved state of a parent ModelParameters.
+
+        The constraints of the origins (submodels, run links, inputs) shared with the parent are reused as is. The
+        equivalence classes of the parent are kept, except for the ones touched by a constraint that disappeared,
+        which are split and merged again from the remaining constraints. New constraints are then merged on top.
+
+        :param parent: The solved ModelParameters to derive from.
+        :return: None
+        """
+        parent_origins = parent._constraints_origins
+        self._symbolic_solutions = parent._symbolic_solutions
+
+        self._constraints_origins = {}
+        for submodel_id in self.sub_props:
+            origin = ('submodel', submodel_id)
+            if origin in parent_origins and parent.sub_props.get(submodel_id) is self.sub_props[submodel_id]:
+                self._constraints_origins[origin] = parent_origins[origin]
+            else:
+                self._constraints_origins[origin] = self._generate_submodel_constraints(submodel_id)
+        for link in self._find_links():
+            origin = ('link', link)
+            if origin in parent_origins and link[0] in parent.sub_props and link[2] in parent.sub_props \
+                    and parent.sub_props[link[0]] is self.sub_props[link[0]] \
+                    and parent.sub_props[link[2]] is self.sub_props[link[2]]:
+                self._constraints_origins[origin] = parent_origins[origin]
+            else:
+                self._constraints_origins[origin] = self.convert_run_linking_to_equality_constraint(link)
+        inputs_constraints = self._generate_inputs_constraints()
+        if inputs_constraints == parent_origins.get(('inputs',)):
+            inputs_constraints = parent_origins[('inputs',)]
+        self._constraints_origins[('inputs',)] = inputs_constraints
+        self._assemble_constraints()
+
+        def equality_constraints(origins, origin):
+            constraints = origins[origin]
+            return constraints['equality'] if origin[0] == 'submodel' else constraints
+
+        added_constraints = [constraint for origin in self._constraints_origins
+                             if self._constraints_origins[origin] is not parent_origins.get(origin)
+                             for constraint in equality_constraints(self._constraints_origins, origin)]
+        removed_constraints = [constraint for origin in parent_origins
+                               if parent_origins[origin] is not self._constraints_origins.get(origin)
+                               for constraint in equality_constraints(parent_origins, origin)]
+
+        parameters = self.param_subset
+        self.param_subset = parent.param_subset.copy()
+
+        # split the classes touched by a removed constraint or holding parameters of submodels not used anymore
+        removed_parameters = [param for param in parent.param_subset if param not in parameters]
+        seeds = {param for constraint in removed_constraints for param in constraint if param in parent.param_subset}
+        seeds.update(removed_parameters)
+        affected = set()
+        for param in seeds:
+            if param not in affected:
+                affected.update(parent.param_subset.get_equivalence_class(param))
+        self.param_subset.split(affected)
+        for param in removed_parameters:
+            self.param_subset.discard(param)
+        self.param_subset.check_extend(parameters)
+
+        # merge again the classes that were split, and the new constraints
+        affected_constraints = [constraint for constraint in self.constraints['equality']
+                                if any(param in affected for param in constraint)] if affected else []
+        for constraint in affected_constraints + added_constraints:
+            param_0 = constraint[0]
+            for param in constraint[1:]:
+                self.param_subset.merge(param_0, param)
+
+        self._reduce_parameter_constraints()
+
     def solve_symbolic_constraints(self):
-        if len(self.constraints['symbolic']) > 0:
-            global_parameters = self.param_subset.reduced_list
-            sympy_variables = {param: symbols(param) for param in global_parameters}
-            ineq = []
-            eq = []
-
-            # generate the formulae
-            for constraint in self.constraints['symbolic']:
-                params, formula = constraint
-                for param_id, param in enumerate(params):
-                    to_replace = f"${param_id} "
-                    replacing = f"{param} "
-                    new_formula = formula.replace(to_replace, replacing)
-                    if ' = ' in new_formula:
-                        e1, e2 = new_formula.split("=")
-                        eq.append(Eq(sympify(e1), sympify(e2)))
-                    if '<' in new_formula or '>' in new_formula:
-                        ineq.append(sympify(new_formula))
-
-            # find the constrained variables and their formulation
-            constrained_params = set()
-            for model_id, model in self.sub_props.items():
-                for param, param_data in model['parameters'].items():
-                    if 'constrained' in param_data and param_data['constrained'] is True:
-                        constrained_params.add(self.param_subset[self.get_extended_parameter_name(model_id, param)])
-            constrained_params_temp = {sympy_variables[param] for param in constrained_params}
-
-            # replace the constrained variables by their formulation
-            constrained_params_formulas: dict = {}
-            while len(constrained_params_temp) > 0:
-                variable_to_remove = None
-                removing_expression = None
-                for equation in eq:
-                    if equation.lhs in constrained_params_temp:
-                        variable_to_remove = equation.lhs
-                        removing_expression = equation.rhs
-                        break
-                    if equation.rhs in constrained_params_temp:
-                        variable_to_remove = equation.rhs
-                        removing_expression = equation.lhs
-                        break
-                constrained_params_formulas[variable_to_remove] = removing_expression
-                for i, equation in enumerate(eq):
-                    eq[i] = equation.subs(variable_to_remove, removing_expression)
-
-                for i, inequality in enumerate(ineq):
-                    eq[i] = inequality.subs(variable_to_remove, removing_expression)
-
-                constrained_params_temp.discard(variable_to_remove)
-
-            # solve for the other unknowns
-            solved_eq_dict = solve(eq)
-
-            # find free variables
-            free_vars = [var_name for var_name, var in sympy_variables.items() if var not in solved_eq_dict]
-            self.sympy_data['free'] = free_vars
-            # store constrained variables formula in sympy_data
-            self.sympy_data['constrained'] = solved_eq_dict
-            for param in constrained_params:
-                self.sympy_data['constrained'][param] = constrained_params_formulas[sympy_variables[param]].subs(
-                    solved_eq_dict)
+        """
+        Solves the symbolic constraints and stores the result in sympy_data:
+            - 'constrained': a dictionary mapping the solved global parameters to their expression
+            - 'free': the list of the global parameters left free
+            - 'paths': the number of components solved by the linear solver ('linear') and by sympy ('sympy')
+
+        The symbolic constraints are split in independent components (sharing no global parameter) that are solved
+        separately. Components whose equations are all linear in the parameters are solved by the linear solver
+        (the expressions are then LinearExpression), the others by sympy. The solution of a component already solved
+        by the parent ModelParameters is reused as is.
+        """
+        constrained_params = set()
+        for model_id, model in self.sub_props.items():
+            for param, param_data in model['parameters'].items():
+                if 'constrained' in param_data and param_data['constrained'] is True:
+                    constrained_params.add(self.get_global_parameter(model_id, param))
+
+        previous_solutions = self._symbolic_solutions
+        self._symbolic_solutions = {}
+        self.sympy_data = {'free': [], 'constrained': {}, 'paths': {'linear': 0, 'sympy': 0}}
+        for component in self._split_symbolic_constraints():
+            component_params = {param for params, formula in component for param in params}
+            key = (tuple(formula for params, formula in component),
+                   tuple(sorted(component_params & constrained_params)))
+            solved = previous_solutions.get(key)
+            if solved is None:
+                solved = self._solve_symbolic_component(key[0], key[1])
+            self._symbolic_solutions[key] = solved
+            path, solution = solved
+            self.sympy_data['paths'][path] += 1
+            self.sympy_data['constrained'].update(solution)
+
+        # find free variables
+        self.sympy_data['free'] = [param for param in self.param_subset.reduced_list
+                                   if param not in self.sympy_data['constrained']]
+
+    def _split_symbolic_constraints(self):
+        """
+        :return: The symbolic constraints rewritten in terms of global parameters, as a list of independent
+        components. Each component is a list of (global parameters, formula) pairs.
+        """
+        rewritten = []
+        for params, formula in self.constraints['symbolic']:
+            global_params = [self.param_subset[param] for param in params]
+            for param_id, param in enumerate(global_params):
+                formula = formula.replace(f"${param_id} ", f"{param} ")
+            rewritten.append((global_params, formula))
+
+        groups = Subsets({param for params, formula in rewritten for param in params})
+        for params, formula in rewritten:
+            for param in params[1:]:
+                groups.merge(params[0], param)
+
+        components = {}
+        for params, formula in rewritten:
+            group = groups[params[0]] if params else formula
+            components.setdefault(group, []).append((params, formula))
+        return list(components.values())
+
+    @staticmethod
+    def _solve_symbolic_component(formulas, constrained_params):
+        """
+        :param formulas: The formulas of the component, in terms of global parameters
+        :param constrained_params: The global parameters of the component that must be expressed from the others
+        :return: A pair (path, solution) where path is 'linear' or 'sympy' depending on the solver used and solution
+        is a dictionary mapping the solved global parameters to their expression
+
+        Raises InconsistentSystem if the formulas contradict each other, so that the candidate gets rejected.
+        """
+        try:
+            solution = solve_linear_constraints(formulas, constrained_params)
+        except InconsistentSystem as error:
+            raise InconsistentSystem(f"inconsistent symbolic constraints {list(formulas)}: {error}") from error
+        if solution is not None:
+            return 'linear', solution
+        # sympy is slow to import, only load it when a constraint needs it
+        from .symbolicconstraints import solve_symbolic_constraints_with_sympy
+        return 'sympy', solve_symbolic_constraints_with_sympy(formulas, constrained_params)
 
     def add_a_symbolic_constraint(self, constraint):
         """
@@ -234,7 +508,7 @@ class ModelParameters:
         This method adds a constraint linking two parameters in the graph of constraint
         """
         constraints = self.constraints.setdefault('symbolic', [])
-        constraint.add(constraint)
+        constraints.append(constraint)
 
     def add_an_equality_constraint(self, parameters_list: list):
         """
@@ -260,7 +534,7 @@ class ModelParameters:
 
         Note that this method does not return anything. It modifies the `model_properties` dictionary directly.
         """
-        (parameter, constraint_properties) = self.sub_props[constraint[0]], constraint[1], constraint[2]
+        (parameter, constraint_properties) = constraint
 
         constraints = self.constraints
         constraints = constraints.setdefault('parameter', {})
@@ -309,34 +583,25 @@ class ModelParameters:
                         # Generate the parameter corresponding to the dimension index of the variable
                         submodel['parameters'][param_name] = {'type': 'int', 'virtual': True}
 
-    def convert_run_linking_to_equality_constraint(self, constraint):
+    def convert_run_linking_to_equality_constraint(self, link):
         """
-        :param constraint: A tuple representing the constraint to be converted. The tuple should have two elements: the input constraint location and the output constraint location.
-        :return: None
-
-        This method is used to convert a constraint linking two variables to a constraint on the parameters of the variables. It takes in a constraint tuple, extract the necessary information from it, and performs the conversion. The converted constraint is then added as a linking constraint.
+        :param link: A tuple (input_model_id, input_variable, output_model_id, output_variable) representing a
+        variable of a submodel fed by the output variable of another submodel.
+        :return: The list of equality constraints between the dimension parameters of the two variables.
 
-        The constraint tuple should be of the following format:
-            - The input constraint location should be a tuple consisting of two elements: the submodel key and the variable key of the input constraint.
-            - The output constraint location should be a tuple consisting of two elements: the submodel key and the variable key of the output constraint.
+        This method is used to convert a constraint linking two variables to constraints on the parameters of the variables.
 
-        The method first accesses the properties of the submodels stored in the `sub_props` attribute of the `ModelPropertiesMapper` instance. It retrieves the input and output variables based on the provided constraint locations.
+        The method first accesses the properties of the submodels stored in the `sub_props` attribute of the `ModelParameters` instance. It retrieves the input and output variables based on the provided link.
 
         Next, the method checks the compatibility of the dimensions of the input and output variables. If they are not compatible, an `AssertionError` is raised with a descriptive error message.
 
-        Finally, the method adds a parameter constraint for each dimension of the input variable. The parameter constraint is created using the submodel keys, the modified constraint locations with dimension indexes appended, and a boolean indicating that it is a parameter constraint. The created parameter constraint is then added as a linking constraint using the `add_a_linking_constraint` method.
+        Finally, the method builds an equality constraint for each dimension of the input variable, between the dimension parameters of both variables.
 
         Example usage:
-            mapper = ModelPropertiesMapper()
-            constraint = (("submodel_key_1", "variable_key_1"), ("submodel_key_2", "variable_key_2"))
-            mapper.convert_variable_to_parameter_constraint(constraint)
+            link = ("submodel_key_1", "variable_key_1", "submodel_key_2", "variable_key_2")
+            constraints = parameters.convert_run_linking_to_equality_constraint(link)
         """
-        i_constraint_loc, o_constraint_loc = constraint
-        input_run_id, variable_key_inp = i_constraint_loc
-        output_run_id, variable_key_out = o_constraint_loc
-
-        input_model_id = self.model_skeleton.runs[input_run_id]['id']
-        output_model_id = self.model_skeleton.runs[output_run_id]['id']
+        input_model_id, variable_key_inp, output_model_id, variable_key_out = link
 
         # Accessing properties of submodels
         subs = self.sub_props
@@ -345,18 +610,19 @@ class ModelParameters:
         output_var = subs[output_model_id]['variables'][variable_key_out]
 
         # Checking compatibility of variables
-        if input_var['dim'] is not output_var['dim']:
+        if input_var['dim'] != output_var['dim']:
             raise AssertionError(
-                f" Dimension of variables not matching for variable {i_constraint_loc}"
+                f" Dimension of variables not matching for variable {(input_model_id, variable_key_inp)}"
                 f" (dim : {input_var['dim']}) and "
-                f"variable {o_constraint_loc} (dim : {output_var['dim']})")
+                f"variable {(output_model_id, variable_key_out)} (dim : {output_var['dim']})")
 
         # Adding parameter constraints
+        constraints = []
         for dim_index in range(input_var['dim']):
             input_param = self.get_variable_parameter_name(input_model_id, variable_key_inp, dim_index)
             output_param = self.get_variable_parameter_name(output_model_id, variable_key_out, dim_index)
-            param_constraint = [input_param, output_param]
-            self.add_an_equality_constraint(param_constraint)
+            constraints.append([input_param, output_param])
+        return constraints
 
     def resolve_a_parameter_linking_constraint_set(self, base_parameter):
         params_set = self.param_subset[base_parameter]
@@ -399,8 +665,9 @@ class ModelParameters:
             virtual = True
             for equ in self.param_subset.get_equivalence_class(param):
                 model_id, local_param = self.get_local_parameter(equ)
-                default_value = self.sub_props[model_id]['parameters'][local_param].setdefault('default', None)
-                virtual_value = self.sub_props[model_id]['parameters'][local_param].setdefault('virtul', False)
+                # read only: the submodels properties are part of the key of the parameters cache
+                default_value = self.sub_props[model_id]['parameters'][local_param].get('default', None)
+                virtual_value = self.sub_props[model_id]['parameters'][local_param].get('virtul', False)
                 virtual = virtual and virtual_value
                 if default_value is not None:
                     defaults_front[param] = default_value
@@ -1,5 +1,8 @@
+from __future__ import annotations
+
 import copy
 import warnings
+from bisect import bisect_left
 
 from .Network.Layer import Layer
 from .Network.Parameter import ParameterListener, Parameter
@@ -297,6 +300,11 @@ class ModelSkeleton:
         {'id' : model_id, 'inputs': dict_of_inputs} where dict_of_inputs's keys correspond to input variables of the model
         used in the run and the values correspond to a pair [id, name] (in list format). 'id' is the run whose output to use and
         'name' is the relevant output variable (use -1 for input variable ids).
+
+        The skeleton maintains adjacency indexes over the runs (the parents and children of each run) and the
+        transitive closure of the runs graph (the ancestors of each run as a bitset: bit 0 stands for the input, bit
+        i + 1 for the run i). They are built lazily, kept up to date by add_run and invalidated by the other methods
+        mutating the runs. Code editing the inputs of the runs in place must call invalidate_indexes.
         """
         self.submodels = submodels
         self.runs = runs
@@ -305,6 +313,78 @@ class ModelSkeleton:
         if self.inputs is None:
             self.inputs = self.find_inputs()
 
+    @property
+    def runs(self) -> List[dict]:
+        return self._runs
+
+    @runs.setter
+    def runs(self, runs: List[dict]):
+        self._runs = runs
+        self.invalidate_indexes()
+
+    def invalidate_indexes(self):
+        """
+        Drops the adjacency indexes and the transitive closure of the runs graph, they are rebuilt on the next query.
+        """
+        # run -> sorted distinct runs whose outputs are inputs of the run (-1 for the input)
+        self._parents: List[List[int]] | None = None
+        # run -> distinct runs using the outputs of the run, in increasing order
+        self._children: List[List[int]] | None = None
+        self._input_children: List[int] | None = None
+        # run -> bitset of the ancestors of the run
+        self._ancestors: List[int] | None = None
+        # heights and order of the runs, with the output runs they were computed for
+        self._heights: List[int] | None = None
+        self._runs_order: List[int] | None = None
+        self._heights_outputs: tuple | None = None
+
+    def _index_run(self, run_id: int):
+        run_parents = sorted({source for source, _ in self._runs[run_id]["inputs"].values()})
+        self._parents.append(run_parents)
+        for parent in run_parents:
+            if parent == -1:
+                self._input_children.append(run_id)
+            elif 0 <= parent < len(self._children):
+                self._children[parent].append(run_id)
+            else:
+                raise Exception(f"run {run_id} uses the outputs of the missing run {parent}")
+
+    def _get_adjacency(self):
+        if self._parents is None:
+            self._parents = []
+            self._children = [[] for _ in self._runs]
+            self._input_children = []
+            try:
+                for run_id in range(len(self._runs)):
+                    self._index_run(run_id)
+            except Exception:
+                self.invalidate_indexes()
+                raise
+        return self._parents, self._children
+
+    def _get_ancestors(self) -> List[int]:
+        """
+        Computes the transitive closure of the runs graph in topological order (Kahn's algorithm).
+        """
+        if self._ancestors is None:
+            parents, children = self._get_adjacency()
+            ancestors = [0] * len(parents)
+            remaining_parents = [len(run_parents) - (-1 in run_parents) for run_parents in parents]
+            queue = [run_id for run_id, remaining in enumerate(remaining_parents) if remaining == 0]
+            for run_id in queue:
+                bits = 0
+                for parent in parents[run_id]:
+                    bits |= 1 if parent == -1 else ancestors[parent] | (1 << (parent + 1))
+                ancestors[run_id] = bits
+                for child in children[run_id]:
+                    remaining_parents[child] -= 1
+                    if remaining_parents[child] == 0:
+                        queue.append(child)
+            if len(queue) != len(parents):
+                raise Exception("Cycle detected in the graph")
+            self._ancestors = ancestors
+        return self._ancestors
+
     def find_inputs(self):
         """
         returns the input variables of the model
@@ -321,7 +401,7 @@ class ModelSkeleton:
         variables = []
         for run_id, run in enumerate(self.runs):
             for input in run["inputs"]:
-                if run["inputs"][input][0] == -1:
+                if run["inputs"][input][0] == -1 and run["inputs"][input][1] == input_id:
                     variables.append([run_id, input])
         return variables
 
@@ -345,123 +425,147 @@ class ModelSkeleton:
     def is_parent(self, parent_id, child_id):
         if child_id == -1:
             return parent_id == -1
-
-        direct_parents = self.get_direct_parents(child_id)
-        # check direct connection:
-        if parent_id in direct_parents:
-            return True
-
-        # no direct connection, search in parents of child
-        for i in direct_parents:
-            if self.is_parent(parent_id, i):
-                return True
-
-        return False
+        return bool(self._get_ancestors()[child_id] >> (parent_id + 1) & 1)
 
     # returns the runs whose outputs are input of the given run
     def get_direct_parents(self, run_id):
         if run_id == -1:
             return []
-        parents = []
-        for input_var in self.runs[run_id]["inputs"]:
-            parents.append(self.runs[run_id]["inputs"][input_var][0])
-        return list(set(parents))
+        return list(self._get_adjacency()[0][run_id])
 
     def get_parents(self, run_id):
         if run_id == -1:
             return []
-        parents = []
-        direct_parents = self.get_direct_parents(run_id)
-        parents.extend(direct_parents)
-        for parent in direct_parents:
-            parents.extend(self.get_parents(parent))
-        return parents
+        ancestors = self._get_ancestors()[run_id]
+        return [index - 1 for index in range(ancestors.bit_length()) if ancestors >> index & 1]
 
     def get_direct_children(self, run_id):
-        child_runs = []
-        for index, run in enumerate(self.runs):
-            for input_var in run["inputs"]:
-                if run["inputs"][input_var][0] == run_id:
-                    child_runs.append(index)
-        return child_runs
+        children = self._get_adjacency()[1]
+        return list(self._input_children if run_id == -1 else children[run_id])
 
     def get_children(self, run):
-        children = []
-        direct_children = self.get_direct_children(run)
-        children.extend(direct_children)
-        for child in direct_children:
-            children.extend(self.get_children(child))
-        return list(set(children))
+        bit = 1 << (run + 1)
+        return [run_id for run_id, ancestors in enumerate(self._get_ancestors()) if ancestors & bit]
 
     def is_connected_to_output(self, run):
-        outputting_runs = []
+        ancestors = self._get_ancestors()
+        bit = 1 << (run + 1)
         for key in self.outputs:
-            outputting_runs.append(self.outputs[key][0])
-        outputting_runs = set(outputting_runs)
-        for run_ in outputting_runs:
-            if run_ == run or self.is_parent(run, run_):
+            output_run = self.outputs[key][0]
+            if output_run == run or ancestors[output_run] & bit:
                 return True
         return False
 
     def is_connected_to_input(self, run):
         return self.is_parent(-1, run)
 
-    def get_runs_heights(self):
-        runs_size = len(self.runs)
-        heights = [-1 for i in range(runs_size)]
-
-        def set_height(run_id, height):
-            if run_id == -1:
-                return
-            if height > runs_size:
-                raise Exception("Cycle detected in the graph")
-            if height > heights[run_id]:
-                heights[run_id] = height
-
-                for input_var in self.runs[run_id]["inputs"]:
-                    set_height(self.runs[run_id]["inputs"][input_var][0], height + 1)
+    def _get_heights(self) -> List[int]:
+        """
+        Computes the height of every run: the length of the longest path from the run to an output run, or -1 if the
+        outputs of the run are not used by the outputs of the model. The runs used by the outputs are processed in
+        reverse topological order (a run after all its children), in O(runs + links).
 
-        for output in self.outputs:
-            set_height(self.outputs[output][0], 0)
+        The heights are cached until the runs are mutated or the output runs change.
+        """
+        outputs = tuple(output[0] for output in self.outputs.values())
+        if self._heights is not None and self._heights_outputs == outputs:
+            return self._heights
+        parents, children = self._get_adjacency()
+        runs_size = len(self.runs)
+        heights = [-1] * runs_size
+
+        # runs whose outputs are used by the outputs of the model
+        used = [False] * runs_size
+        stack = [run_id for run_id in outputs if run_id != -1]
+        for run_id in stack:
+            used[run_id] = True
+        while stack:
+            run_id = stack.pop()
+            for parent in parents[run_id]:
+                if parent != -1 and not used[parent]:
+                    used[parent] = True
+                    stack.append(parent)
+
+        remaining_children = [sum(used[child] for child in children[run_id]) if used[run_id] else 0
+                              for run_id in range(runs_size)]
+        for run_id in outputs:
+            if run_id != -1:
+                heights[run_id] = 0
+        queue = [run_id for run_id in range(runs_size) if used[run_id] and remaining_children[run_id] == 0]
+        for run_id in queue:
+            for parent in parents[run_id]:
+                if parent == -1:
+                    continue
+                if heights[run_id] + 1 > heights[parent]:
+                    heights[parent] = heights[run_id] + 1
+                remaining_children[parent] -= 1
+                if remaining_children[parent] == 0:
+                    queue.append(parent)
+        if len(queue) != sum(used):
+            raise Exception("Cycle detected in the graph")
+
+        self._heights = heights
+        self._heights_outputs = outputs
+        self._runs_order = None
         return heights
 
-    def get_unused_runs(self):
-        unused_runs = []
-        heights = self.get_runs_heights()
-        for i, h in enumerate(heights):
-            if h == -1:
-                unused_runs.append(i)
+    def get_runs_heights(self):
+        return list(self._get_heights())
 
-        return unused_runs
+    def get_unused_runs(self):
+        return [i for i, h in enumerate(self._get_heights()) if h == -1]
+
+    def _get_runs_order(self) -> List[int]:
+        heights = self._get_heights()
+        if self._runs_order is None:
+            # bucket the used runs by height, highest first, by index within a height
+            buckets = [[] for _ in range(max(heights, default=-1) + 1)]
+            for run_id, height in enumerate(heights):
+                if height != -1:
+                    buckets[height].append(run_id)
+            self._runs_order = [run_id for bucket in reversed(buckets) for run_id in bucket]
+        return self._runs_order
 
     def find_runs_order(self):
-        heights = self.get_runs_heights()
-
-        runs_size = len(self.runs)
-        max_height = max(heights)
-        ordered_items = []
-        for i in range(max_height + 1):
-            for j in range(runs_size):
-                if heights[j] == max_height - i:
-                    ordered_items.append(j)
-
-        return ordered_items
+        return list(self._get_runs_order())
 
     def reorder_runs(self, new_order=None):
+        heights = None
         if new_order is None:
-            new_order = self.find_runs_order()
-        inverter = [-1 for i in range(len(self.runs))]
+            new_order = self._get_runs_order()
+            heights = self._heights
+            if new_order == list(range(len(self.runs))):
+                # already in order
+                return
+        inverter = [-1] * len(self.runs)
         for index, value in enumerate(new_order):
             inverter[value] = index
-        # print('obtained new runs order: ', new_order)
-        # print('inverter: ', inverter)
+        # the references are rewritten in the current order of the runs, the order they are laid out in memory, before
+        # the runs are moved: much faster than in the new order on large skeletons. The runs dropped by a partial order
+        # are left as they are.
+        for run_id, run in enumerate(self.runs):
+            if inverter[run_id] != -1:
+                for source in run["inputs"].values():
+                    if source[0] != -1:
+                        source[0] = inverter[source[0]]
         self.runs = [self.runs[i] for i in new_order]
-        for run in self.runs:
-            for input_var in run["inputs"]:
-                if run["inputs"][input_var][0] != -1:
-                    run["inputs"][input_var][0] = inverter[run["inputs"][input_var][0]]
-        for output in self.outputs:
-            self.outputs[output][0] = inverter[self.outputs[output][0]]
+        for output in self.outputs.values():
+            output[0] = inverter[output[0]]
+        self.invalidate_indexes()
+        if heights is not None:
+            # the runs are now sorted by height, their heights are known
+            self._heights = [heights[i] for i in new_order]
+            self._heights_outputs = tuple(output[0] for output in self.outputs.values())
+            self._runs_order = list(range(len(self.runs)))
+
+    def get_runs_by_model(self) -> Dict[str, List[int]]:
+        """
+        :return: A dictionary mapping the submodels used by runs to the indices of their runs, built in a single pass.
+        """
+        runs_by_model: Dict[str, List[int]] = {}
+        for i, run in enumerate(self.runs):
+            runs_by_model.setdefault(run["id"], []).append(i)
+        return runs_by_model
 
     def get_runs_of_model(self, model_id):
         node_runs = []
@@ -484,10 +588,58 @@ class ModelSkeleton:
         for output in self.outputs:
             if self.outputs[output][0] > index:
                 self.outputs[output][0] -= 1
-        run_model = self.runs[index]["id"]
         del self.runs[index]
+        self.invalidate_indexes()
         self.remove_unused_submodels()
 
+    def del_runs(self, indices):
+        """
+        Deletes several runs at once: the references of the remaining runs and of the outputs are rewritten in a
+        single pass, then the submodels without runs are removed. The result is the same as deleting the runs one by
+        one with del_run, from the last one to the first one.
+
+        :param indices: The indices of the runs to delete.
+        """
+        deleted = sorted(set(indices))
+        runs_size = len(self.runs)
+        if not deleted:
+            return
+        if deleted[0] < 0 or deleted[-1] >= runs_size:
+            raise IndexError("run index out of range")
+        # new index of each reference: the reference minus the number of deleted runs before it
+        remap = []
+        shift = 0
+        for index in range(runs_size):
+            if shift < len(deleted) and deleted[shift] < index:
+                shift += 1
+            remap.append(index - shift)
+
+        def new_reference(reference):
+            if 0 <= reference < runs_size:
+                return remap[reference]
+            return reference - bisect_left(deleted, reference) if reference > 0 else reference
+
+        deleted_set = set(deleted)
+        self.runs[:] = [run for i, run in enumerate(self.runs) if i not in deleted_set]
+        for run in self.runs:
+            for source in run["inputs"].values():
+                source[0] = new_reference(source[0])
+        for output in self.outputs.values():
+            output[0] = new_reference(output[0])
+        self.invalidate_indexes()
+        self.remove_unused_submodels()
+
+    def prune_unused(self) -> List[int]:
+        """
+        Deletes the runs whose outputs are not used to compute the outputs of the model, and the submodels left
+        without runs.
+
+        :return: The indices of the deleted runs, before deletion.
+        """
+        unused_runs = self.get_unused_runs()
+        self.del_runs(unused_runs)
+        return unused_runs
+
     def add_model(self, model_parameters):
         model_name = model_parameters["name"]
         model_parameters = copy.copy(model_parameters)
@@ -496,14 +648,32 @@ class ModelSkeleton:
         return True
 
     def add_run(self, run_to_insert):
-        self.runs.append(run_to_insert)
-        return len(self.runs) - 1
+        self._runs.append(run_to_insert)
+        run_id = len(self._runs) - 1
+        if self._heights is not None:
+            # the new run has no children: it is unused until an output refers to it
+            self._heights.append(-1)
+        if self._parents is not None:
+            self._children.append([])
+            try:
+                self._index_run(run_id)
+            except Exception:
+                # the run refers to a missing run, reported by the next query
+                self.invalidate_indexes()
+                return run_id
+            if run_id in self._parents[run_id]:
+                # a run using its own outputs, the cycle is reported by the next closure query
+                self._ancestors = None
+            elif self._ancestors is not None:
+                bits = 0
+                for parent in self._parents[run_id]:
+                    bits |= 1 if parent == -1 else self._ancestors[parent] | (1 << (parent + 1))
+                self._ancestors.append(bits)
+        return run_id
 
     def remove_unused_submodels(self):
-        models_to_remove = []
-        for model in self.submodels:
-            if len(self.get_runs_of_model(model)) == 0:
-                models_to_remove.append(model)
+        runs_by_model = self.get_runs_by_model()
+        models_to_remove = [model for model in self.submodels if model not in runs_by_model]
         for model in models_to_remove:
             del self.submodels[model]
 
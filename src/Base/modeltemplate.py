@@ -1,6 +1,7 @@
-import json
 from typing import Any
 
+from .templatecache import template_registry
+
 
 class ModelTemplate:
     def __init__(self, template_type, source, template_source=""):
@@ -20,10 +21,8 @@ class ModelTemplate:
         self._props = props
 
     def load_template(self, source_file: str):
-        text = open(source_file).read()
-        text2 = text.split("BEGIN_PROPS")[1]
-        text2 = text2.split("END_PROPS")[0]
-        self._props = json.loads(text2)
+        # ModelParameters completes the properties in place, so each template gets its own copy
+        self._props = template_registry.get_mutable(source_file)
 
     def build_complete_template(self):
         pass
@@ -0,0 +1,130 @@
+import hashlib
+import json
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from .modelskeleton import ModelSkeleton
+
+"""
+A content-addressed cache of solved parameter systems.
+
+The constraints, the global parameters classes and the solution of the symbolic constraints computed by ModelParameters
+only depend on the structure of the skeleton and on the properties of its submodels templates. The cache maps a digest
+of both to the solved state, so that a skeleton already seen skips the generation of the constraints and the solving.
+
+Entries are kept in memory in least recently used order, up to a maximum number of entries, and can be backed by a
+directory of pickle files shared between processes (written atomically, one file per entry).
+"""
+
+
+def parameters_key(model_skeleton: ModelSkeleton, sub_props: Dict[str, dict]) -> str:
+    """
+    :param model_skeleton: The skeleton of the model.
+    :param sub_props: The properties of the submodels templates, completed with their variables parameters.
+    :return: A digest of the canonical serialization of the skeleton and of the templates properties.
+    """
+    content = {
+        "submodels": sub_props,
+        "runs": model_skeleton.runs,
+        "outputs": model_skeleton.outputs,
+        "inputs": model_skeleton.inputs,
+    }
+    serialized = json.dumps(content, sort_keys=True, default=str)
+    return hashlib.blake2b(serialized.encode(), digest_size=20).hexdigest()
+
+
+class ParametersCache:
+    """
+    LRU cache of solved parameter systems, optionally backed by a directory.
+
+    Attributes:
+        max_size (int): The maximum number of entries kept in memory.
+        directory (str): The directory of the on-disk store, None to keep the entries in memory only.
+        hits (int): The number of lookups served from memory or from disk.
+        disk_hits (int): The number of lookups served from disk.
+        misses (int): The number of lookups that found no entry.
+        evictions (int): The number of entries evicted from memory.
+    """
+
+    def __init__(self, max_size: int = 1024, directory: Optional[str] = None):
+        if max_size <= 0:
+            raise ValueError(f"max_size must be positive, got {max_size}")
+        self.max_size = max_size
+        self.directory = directory
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.pickle")
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        :return: The state stored for the key, None if there is none.
+        """
+        with self._lock:
+            state = self._entries.get(key)
+            if state is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return state
+        if self.directory is not None:
+            try:
+                with open(self._path(key), "rb") as file:
+                    state = pickle.load(file)
+            except (OSError, EOFError, pickle.UnpicklingError):
+                state = None
+            if state is not None:
+                with self._lock:
+                    self.hits += 1
+                    self.disk_hits += 1
+                    self._store(key, state)
+                return state
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, state: Any):
+        """
+        Stores the state for the key, in memory and on disk if the cache is backed by a directory.
+        """
+        with self._lock:
+            self._store(key, state)
+        if self.directory is not None:
+            path = self._path(key)
+            temporary_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temporary_path, "wb") as file:
+                pickle.dump(state, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary_path, path)
+
+    def _store(self, key: str, state: Any):
+        self._entries[key] = state
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        """
+        Empties the memory of the cache, the on-disk store is left untouched.
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": len(self._entries), "hits": self.hits, "disk_hits": self.disk_hits, "misses": self.misses,
+                "evictions": self.evictions}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
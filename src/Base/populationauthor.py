@@ -0,0 +1,250 @@
+import io, os, json, logging, types
+from typing import Dict, Iterator, List, Optional, TextIO, Tuple
+
+from .author import Author, compile_in_memory, source_digest, write_if_changed
+from .modelloader import ModelLoader
+from .modelproperties import ModelParameters
+from .modelskeleton import ModelSkeleton
+from .structuralhash import submodel_signature, template_digest
+
+"""
+Generation of a single module for a whole population of models.
+
+The module holds the class of every candidate, as Author generates it, after a single block of imports. It also holds
+a population class, named after the module, whose forward pass runs all the candidates at once. The runs of the
+candidates are merged into a prefix tree: candidates whose first runs are identical (same templates, same arguments,
+same submodels reuse and same inputs) share the nodes of these runs, which are computed once, and fork at their first
+differing run. The nodes of a prefix share their submodels, so the population class is a weight-sharing model whose
+candidates are initialized with the default values of their parameters. The candidate classes keep their own weights.
+"""
+
+
+class PrefixNode:
+    """
+    A run of the population forward pass, shared by the candidates whose runs start with the same prefix.
+
+    Attributes:
+        index (int): The index of the node, nodes are indexed in an order where a node follows its inputs.
+        submodel (str): The attribute of the population module holding the submodel of the run.
+        author (Author): The author of the first candidate running the node.
+        run_id (int): The index of the run in the skeleton of this candidate.
+        inputs (Dict[str, Tuple[int, str]]): The input variables of the run, mapped to the (node or -1, variable) giving
+            their value.
+        children (dict): The next nodes, by key of their run.
+    """
+    __slots__ = ("index", "submodel", "author", "run_id", "inputs", "children")
+
+    def __init__(self, index: int, submodel: str, author: Author, run_id: int, inputs: Dict[str, Tuple[int, str]]):
+        self.index = index
+        self.submodel = submodel
+        self.author = author
+        self.run_id = run_id
+        self.inputs = inputs
+        self.children = {}
+
+
+class PopulationAuthor:
+
+    def __init__(self, module_name: str, model_skeletons: List[ModelSkeleton], model_names: List[str] = None,
+                 models_properties: List[Optional[ModelParameters]] = None, save_dir: str = "", source_dir="",
+                 export: bool = True, forward_slots: bool = False):
+        """
+        Generates one module for a population of models.
+
+        Args:
+            module_name (str): The name of the module, which is also the name of the population class.
+            model_skeletons (List[ModelSkeleton]): The skeletons of the candidates.
+            model_names (List[str]): The names of the classes of the candidates, '<module_name>_<index>' by default.
+            models_properties (List[ModelParameters]): The parameters of the candidates, built by default.
+            save_dir (str): The directory where the module is exported.
+            source_dir (str): The directory the save_dir is relative to.
+            export (bool): Whether to write the module in the save_dir, otherwise it can be loaded in memory.
+            forward_slots (bool): Whether the classes of the candidates release their activations early.
+        """
+        logging.info(f"Building a population {module_name} of {len(model_skeletons)} models!")
+        if model_names is None:
+            model_names = [f"{module_name}_{i}" for i in range(len(model_skeletons))]
+        if models_properties is None:
+            models_properties = [None] * len(model_skeletons)
+        if not len(model_names) == len(models_properties) == len(model_skeletons):
+            raise ValueError("Expected as many names and properties as skeletons")
+        if module_name in model_names or len(set(model_names)) != len(model_names):
+            raise ValueError("The names of the models must be unique and differ from the name of the module")
+
+        self.module_name = module_name
+        self.authors = [Author(name, skeleton, properties, save_dir=save_dir, source_dir=source_dir, export=False,
+                               forward_slots=forward_slots)
+                        for name, skeleton, properties in zip(model_names, model_skeletons, models_properties)]
+        self.save_dir = self.authors[0].save_dir if self.authors else save_dir
+        self.nodes: List[PrefixNode] = []
+        self.paths: List[List[int]] = []
+        self.build_prefix_tree()
+        self.source = None
+        self.content_hash = None
+        self.written = False
+        if export:
+            self.export()
+
+    def run_key(self, author: Author, run: dict, first_use: Dict[str, int], digests: Dict[str, str]) -> tuple:
+        """
+        :param digests: The digest of the template of each submodel of the candidate (template_digest).
+        :return: The key of a run of a candidate, equal for runs computing the same thing after the same prefix.
+        """
+        model_id = run["id"]
+        arguments = tuple((k, author.defaults[parameter]) for k, parameter in author.submodel_arguments(model_id))
+        inputs = tuple(sorted((k, v[0], v[1]) for k, v in run["inputs"].items()))
+        signature = submodel_signature(author.graph.submodels[model_id]), digests[model_id]
+        return signature, arguments, first_use.get(model_id), inputs
+
+    def build_prefix_tree(self):
+        """
+        Merges the runs of the candidates into a prefix tree, and sets the path of nodes of every candidate.
+        """
+        root = {}
+        for author in self.authors:
+            children = root
+            path = []
+            first_use = {}
+            digests = {model_id: template_digest(model) for model_id, model in author.graph.submodels.items()}
+            for run_id, run in enumerate(author.graph.runs):
+                key = self.run_key(author, run, first_use, digests)
+                node = children.get(key)
+                if node is None:
+                    model_id = run["id"]
+                    if model_id in first_use:
+                        submodel = self.nodes[path[first_use[model_id]]].submodel
+                    else:
+                        submodel = f"node_{len(self.nodes)}"
+                    inputs = {k: (-1 if v[0] == -1 else path[v[0]], v[1]) for k, v in run["inputs"].items()}
+                    node = PrefixNode(len(self.nodes), submodel, author, run_id, inputs)
+                    self.nodes.append(node)
+                    children[key] = node
+                path.append(node.index)
+                first_use.setdefault(run["id"], run_id)
+                children = node.children
+            self.paths.append(path)
+
+    def submodels_attributes(self, candidate: int) -> Dict[str, str]:
+        """
+        :return: The attribute of the population module holding each submodel used by the runs of the candidate.
+        """
+        author = self.authors[candidate]
+        path = self.paths[candidate]
+        return {run["id"]: self.nodes[path[run_id]].submodel for run_id, run in enumerate(author.graph.runs)}
+
+    def imports(self) -> Iterator[str]:
+        yield "import torch"
+        templates = {submodel_signature(model) for author in self.authors for model in author.graph.submodels.values()}
+        for import_name, import_source in sorted(templates, key=lambda template: (template[1], template[0])):
+            yield f"from {import_source}.{import_name} import {import_name} as {import_source}_{import_name}"
+
+    def props_lines(self) -> Iterator[str]:
+        yield ""
+        yield "\"\"\""
+        yield "BEGIN_PROPS"
+        yield json.dumps({author.model_name: author.props for author in self.authors}, indent="\t", sort_keys=True)
+        yield "END_PROPS"
+        yield "\"\"\""
+
+    def population_lines(self, indent: str = "") -> Iterator[str]:
+        """
+        Generates the population class, whose forward pass runs every node of the prefix tree once.
+
+        Yields:
+            str: The lines of the class, indented.
+        """
+        body = indent + "\t"
+        yield f"{indent}class {self.module_name}(torch.nn.Module):"
+        yield f"{body}def __init__(self, device='cpu', dtype=torch.float32):"
+        yield f"{body}\tsuper({self.module_name}, self).__init__()"
+        yield f"{body}\tself.device = device"
+        yield f"{body}\tself.dtype = dtype"
+        for node in self.nodes:
+            if node.submodel != f"node_{node.index}":
+                continue
+            author = node.author
+            model_id = author.graph.runs[node.run_id]["id"]
+            model_template, model_source = submodel_signature(author.graph.submodels[model_id])
+            arguments = [f"{k}={author.defaults[parameter]}" for k, parameter in author.submodel_arguments(model_id)]
+            arguments += ["device=device", "dtype=dtype"]
+            yield f"{body}\tself.{node.submodel} = {model_source}_{model_template}({', '.join(arguments)})"
+        yield ""
+
+        def value(source):
+            return f"X[\"{source[1]}\"]" if source[0] == -1 else f"node_output_{source[0]}[\"{source[1]}\"]"
+
+        yield f"{body}def forward(self, X):"
+        for node in self.nodes:
+            inputs = ", ".join(f"\"{k}\": {value(v)}" for k, v in node.inputs.items())
+            yield f"{body}\tnode_output_{node.index} = self.{node.submodel}({{{inputs}}})"
+        yield f"{body}\t# Aggregating the results of every candidate"
+        yield f"{body}\tRESULTS = []"
+        for author, path in zip(self.authors, self.paths):
+            outputs = ", ".join(f"\"{name}\": {value((-1 if run_id == -1 else path[run_id], variable))}"
+                                for name, (run_id, variable) in author.graph.outputs.items())
+            yield f"{body}\tRESULTS.append({{{outputs}}})"
+        yield f"{body}\treturn RESULTS"
+
+    def full_model(self) -> Iterator[str]:
+        """
+        Generates all the lines of the module: the imports, the properties of the candidates by name, the class of
+        every candidate and the population class.
+
+        Yields:
+            str: The lines of code that make up the module.
+        """
+        yield from self.imports()
+        yield from self.props_lines()
+        for author in self.authors:
+            yield ""
+            yield f"class {author.model_name}(torch.nn.Module):"
+            yield from author.initialization_lines("\t")
+            yield ""
+            yield from (author.forward_slots_lines if author.forward_slots else author.forward_lines)("\t")
+        yield ""
+        yield from self.population_lines()
+
+    def write(self, file: TextIO):
+        for line in self.full_model():
+            file.write(line)
+            file.write("\n")
+
+    def generate(self) -> str:
+        """
+        :return: The source of the module, generated once.
+        """
+        if self.source is None:
+            buffer = io.StringIO()
+            self.write(buffer)
+            self.source = buffer.getvalue()
+            self.content_hash = source_digest(self.source)
+        return self.source
+
+    def export(self) -> str:
+        """
+        Writes the module in the save_dir, only if the file does not already hold it.
+
+        :return: The name of the module.
+        """
+        self.written = write_if_changed(os.path.join(self.save_dir, self.module_name + ".py"), self.generate())
+        return self.module_name
+
+    def compile_module(self) -> types.ModuleType:
+        """
+        Compiles the module in memory, without writing it to disk (see compile_in_memory).
+        """
+        source = self.generate()
+        return compile_in_memory(self.module_name, source, f"<generated {self.module_name} {self.content_hash[:8]}>")
+
+    def load(self, model_loader: ModelLoader, source: str = "generated") -> type:
+        """
+        Compiles the module in memory and registers the class of every candidate and the population class with the
+        loader, under the given source.
+
+        :return: The population class.
+        """
+        module = self.compile_module()
+        for author in self.authors:
+            model_loader.register_module(source, author.model_name, module)
+        model_loader.register_module(source, self.module_name, module)
+        return model_loader.models_classes[source][self.module_name]
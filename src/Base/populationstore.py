@@ -0,0 +1,267 @@
+from array import array
+from collections.abc import Mapping
+from multiprocessing import shared_memory
+from typing import Dict, Iterator, List, Optional
+
+from .modelskeleton import ModelSkeleton
+from .serialization import RunsView, SkeletonRecord, encode_skeleton
+
+"""
+A population of ModelSkeleton shared between processes.
+
+The skeletons are stored as records of Base.serialization in a block of shared memory divided in fixed-width slots.
+A coordinator creates the store, appends the children of every generation and retires the individuals that leave the
+population, their slots being reused by the next children. Workers attach to the store by name and read the skeletons
+in place, without any copy or pickling: get returns a SkeletonView, a read-only ModelSkeleton decoding the runs, the
+inputs of the runs and the submodels when they are accessed.
+
+The block starts with a header (the format magic padded to 8 bytes, the capacity, the slot size and the next
+individual id), followed by a table of the slots (the id of the individual in the slot, -1 for a free slot, and the
+size of its record), then by the slots. Only the coordinator writes to the block: it must not retire an individual,
+or reuse its slot, while workers are reading it. Views of the skeletons keep references to the block, they must be
+released before the store is closed.
+"""
+
+STORE_MAGIC = b"POP\x01"
+HEADER_SIZE = 3
+SLOT_ENTRY_SIZE = 2
+FREE_SLOT = -1
+
+
+class SubmodelsView(Mapping):
+    """
+    The submodels of a record, decoded on first access.
+    """
+
+    def __init__(self, record: SkeletonRecord):
+        self._record = record
+        self._index: Optional[Dict[str, int]] = None
+        self._submodels: Dict[str, object] = {}
+
+    def _get_index(self) -> Dict[str, int]:
+        if self._index is None:
+            self._index = {name: i for i, name in enumerate(self._record.submodels_names)}
+        return self._index
+
+    def __getitem__(self, name: str):
+        if name not in self._submodels:
+            self._submodels[name] = self._record.get_submodel(self._get_index()[name])
+        return self._submodels[name]
+
+    def __contains__(self, name) -> bool:
+        return name in self._get_index()
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._get_index())
+
+    def __len__(self):
+        return self._record.n_submodels
+
+
+def _read_only(name: str):
+    def method(self, *args, **kwargs):
+        raise TypeError(f"{type(self).__name__} is read-only, {name} is not available: use to_skeleton for a copy")
+    method.__name__ = name
+    return method
+
+
+class SkeletonView(ModelSkeleton):
+    """
+    A read-only ModelSkeleton reading a record in place. The queries of ModelSkeleton on the runs graph (parents,
+    children, heights, order) work on the view, the methods mutating the skeleton raise a TypeError.
+
+    Attributes:
+        record (SkeletonRecord): The record read by the view.
+        individual (int): The id of the individual in the population store, None for a view of a plain record.
+    """
+
+    def __init__(self, record: SkeletonRecord, individual: Optional[int] = None):
+        self.record = record
+        self.individual = individual
+        self._runs = RunsView(record)
+        self.invalidate_indexes()
+        self.submodels = SubmodelsView(record)
+        self.outputs = record.outputs
+        self.inputs = record.inputs
+
+    @property
+    def runs(self) -> RunsView:
+        return self._runs
+
+    def to_skeleton(self) -> ModelSkeleton:
+        """
+        :return: A new ModelSkeleton, with its own runs, outputs and submodels.
+        """
+        return self.record.to_skeleton()
+
+    add_model = _read_only("add_model")
+    add_run = _read_only("add_run")
+    del_run = _read_only("del_run")
+    del_runs = _read_only("del_runs")
+    prune_unused = _read_only("prune_unused")
+    remove_unused_submodels = _read_only("remove_unused_submodels")
+    reorder_runs = _read_only("reorder_runs")
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    # only the coordinator owns the block. The processes started by multiprocessing share the resource tracker of the
+    # coordinator, which tracks the block once. Other processes should not track it, or their tracker would unlink it
+    # when they exit, which can only be avoided since python 3.13.
+    try:
+        return shared_memory.SharedMemory(name, track=False)
+    except TypeError:
+        return shared_memory.SharedMemory(name)
+
+
+class PopulationStore:
+    """
+    Skeletons stored in shared memory, in fixed-width slots.
+
+    Attributes:
+        capacity (int): The number of slots.
+        slot_size (int): The maximum size of the record of a skeleton, in bytes.
+        read_only (bool): True for the stores attached by workers.
+    """
+
+    def __init__(self, capacity: int, slot_size: int, name: Optional[str] = None):
+        """
+        Creates a store, in a new block of shared memory.
+
+        :param name: The name of the block, chosen by the system by default.
+        """
+        if capacity <= 0 or slot_size <= 0:
+            raise ValueError(f"capacity and slot_size must be positive, got {capacity} and {slot_size}")
+        slot_size += -slot_size % 8
+        size = 8 * (1 + HEADER_SIZE + SLOT_ENTRY_SIZE * capacity) + capacity * slot_size
+        self._block = shared_memory.SharedMemory(name, create=True, size=size)
+        # the block never leaves the machine: the integers of the store are native
+        header = array("q", [capacity, slot_size, 0])
+        self._block.buf[:8 * (1 + HEADER_SIZE)] = STORE_MAGIC + bytes(4) + header.tobytes()
+        self._map(read_only=False)
+        for slot in range(capacity):
+            self._slots_table[slot * SLOT_ENTRY_SIZE] = FREE_SLOT
+
+    @classmethod
+    def attach(cls, name: str) -> "PopulationStore":
+        """
+        :return: A read-only store on the block of an existing store, e.g. in a worker process.
+        """
+        store = cls.__new__(cls)
+        store._block = _attach(name)
+        if bytes(store._block.buf[:len(STORE_MAGIC)]) != STORE_MAGIC:
+            store._block.close()
+            raise ValueError(f"The shared memory {name} is not a population store")
+        store._map(read_only=True)
+        return store
+
+    def _map(self, read_only: bool):
+        self.read_only = read_only
+        buffer = self._block.buf[8:]
+        if read_only:
+            buffer = buffer.toreadonly()
+        self._header = buffer[:8 * HEADER_SIZE].cast("q")
+        self.capacity, self.slot_size = self._header[:2]
+        table_end = 8 * (HEADER_SIZE + SLOT_ENTRY_SIZE * self.capacity)
+        self._slots_table = buffer[8 * HEADER_SIZE:table_end].cast("q")
+        self._data = buffer[table_end:table_end + self.capacity * self.slot_size]
+
+    @property
+    def name(self) -> str:
+        return self._block.name
+
+    def __len__(self):
+        return self.capacity - list(self._slots_table[::SLOT_ENTRY_SIZE]).count(FREE_SLOT)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        if not self.read_only:
+            self.unlink()
+
+    def slots(self) -> List[int]:
+        """
+        :return: The slots of the individuals of the population, in increasing order.
+        """
+        return [slot for slot, individual in enumerate(self._slots_table[::SLOT_ENTRY_SIZE])
+                if individual != FREE_SLOT]
+
+    def individual(self, slot: int) -> int:
+        """
+        :return: The id of the individual in the slot, -1 if the slot is free. The ids are given in order of append,
+        they tell the individuals apart when their slots are reused.
+        """
+        self._check_slot(slot)
+        return self._slots_table[slot * SLOT_ENTRY_SIZE]
+
+    def _check_slot(self, slot: int):
+        if not 0 <= slot < self.capacity:
+            raise IndexError(f"slot {slot} out of range for a store of {self.capacity} slots")
+
+    def _check_writable(self):
+        if self.read_only:
+            raise PermissionError("The store is attached read-only, only its coordinator can modify it")
+
+    def append(self, skeleton: ModelSkeleton) -> int:
+        """
+        Stores a skeleton in the first free slot.
+
+        :return: The slot of the skeleton.
+        """
+        self._check_writable()
+        record = encode_skeleton(skeleton)
+        if len(record) > self.slot_size:
+            raise ValueError(f"The record of the skeleton takes {len(record)} bytes, the slots {self.slot_size}")
+        table = self._slots_table
+        try:
+            slot = list(table[::SLOT_ENTRY_SIZE]).index(FREE_SLOT)
+        except ValueError:
+            raise ValueError(f"The store is full ({self.capacity} individuals)") from None
+        start = slot * self.slot_size
+        self._data[start:start + len(record)] = record
+        table[slot * SLOT_ENTRY_SIZE + 1] = len(record)
+        # the slot is only marked as used once the record is written
+        table[slot * SLOT_ENTRY_SIZE] = self._header[2]
+        self._header[2] += 1
+        return slot
+
+    def retire(self, slot: int):
+        """
+        Frees the slot of an individual, for the next children.
+        """
+        self._check_writable()
+        if self.individual(slot) == FREE_SLOT:
+            raise ValueError(f"The slot {slot} is already free")
+        self._slots_table[slot * SLOT_ENTRY_SIZE] = FREE_SLOT
+
+    def record(self, slot: int) -> memoryview:
+        """
+        :return: The record of the individual in the slot, in place.
+        """
+        if self.individual(slot) == FREE_SLOT:
+            raise ValueError(f"The slot {slot} is free")
+        start = slot * self.slot_size
+        record = self._data[start:start + self._slots_table[slot * SLOT_ENTRY_SIZE + 1]]
+        return record if self.read_only else record.toreadonly()
+
+    def get(self, slot: int) -> SkeletonView:
+        """
+        :return: A read-only view of the skeleton of the individual in the slot.
+        """
+        return SkeletonView(SkeletonRecord(self.record(slot)), self.individual(slot))
+
+    def close(self):
+        """
+        Detaches the store from the shared memory: the views of its skeletons must be released first.
+        """
+        for view in (self._header, self._slots_table, self._data):
+            view.release()
+        self._block.close()
+
+    def unlink(self):
+        """
+        Destroys the shared memory, once every process has closed the store.
+        """
+        self._check_writable()
+        self._block.unlink()
@@ -0,0 +1,359 @@
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from .modelskeleton import ModelSkeleton
+from .serialization import EDGE_SIZE, RunsView
+
+"""
+Columnar representation of the runs of a ModelSkeleton, for the graph operations on large skeletons.
+
+The submodel of each run and the variables of the edges are integer codes into a table of interned strings, and the
+edges between the runs are stored in NumPy arrays: for every input of every run, the source run (-1 for an input of
+the model) and its output variable, and the destination run and its input variable. The edges are grouped by
+destination run, in the order of the inputs of each run, so the inputs of a run are a contiguous range of the edges.
+
+The lookups of the children and parents of the runs, the reindexing of the references when runs are deleted and the
+reordering of the runs are vectorized over the edges. The runs can be read as in ModelSkeleton, through read-only views
+of dicts, so the code reading skeletons (e.g. the generation of the forward pass by Author) works on a RunTable.
+
+This module imports NumPy: it is not imported by Base.modelskeleton.
+"""
+
+INDEX_TYPE = np.int64
+
+
+class RunTable:
+    """
+    The runs of a skeleton, in columns.
+
+    Attributes:
+        submodels (dict): The submodels, by id.
+        strings (List[str]): The interned submodels ids and variables names.
+        run_models (np.ndarray): The code of the submodel of each run.
+        src_run (np.ndarray): The source run of each edge, -1 for an input of the model.
+        src_var (np.ndarray): The code of the source variable of each edge.
+        dst_run (np.ndarray): The destination run of each edge, in increasing order.
+        dst_var (np.ndarray): The code of the input variable of the destination run of each edge.
+        outputs (Dict[str, list]): The outputs of the model, as in ModelSkeleton.
+        inputs (List[str]): The inputs of the model.
+    """
+
+    def __init__(self, submodels: dict, strings: List[str], run_models: np.ndarray, src_run: np.ndarray,
+                 src_var: np.ndarray, dst_run: np.ndarray, dst_var: np.ndarray, outputs: Dict[str, list],
+                 inputs: List[str]):
+        self.submodels = submodels
+        self.strings = strings
+        self._codes = {string: code for code, string in enumerate(strings)}
+        self.run_models = run_models
+        self.src_run = src_run
+        self.src_var = src_var
+        self.dst_run = dst_run
+        self.dst_var = dst_var
+        self.outputs = outputs
+        self.inputs = inputs
+        self._offsets: Optional[np.ndarray] = None
+
+    @classmethod
+    def from_skeleton(cls, skeleton: ModelSkeleton) -> "RunTable":
+        """
+        :return: The table of the runs of the skeleton, with copies of its submodels, outputs and inputs.
+        """
+        strings = []
+        codes = {}
+
+        def intern(string: str) -> int:
+            code = codes.get(string)
+            if code is None:
+                code = codes[string] = len(strings)
+                strings.append(string)
+            return code
+
+        runs = skeleton.runs
+        run_models = np.fromiter((intern(run["id"]) for run in runs), INDEX_TYPE, len(runs))
+        counts = [len(run["inputs"]) for run in runs]
+        n_edges = sum(counts)
+        src_run = np.fromiter((source for run in runs for source, _ in run["inputs"].values()), INDEX_TYPE, n_edges)
+        src_var = np.fromiter((intern(variable) for run in runs for _, variable in run["inputs"].values()),
+                              INDEX_TYPE, n_edges)
+        dst_var = np.fromiter((intern(variable) for run in runs for variable in run["inputs"]), INDEX_TYPE, n_edges)
+        dst_run = np.repeat(np.arange(len(runs), dtype=INDEX_TYPE), counts)
+        return cls(dict(skeleton.submodels), strings, run_models, src_run, src_var, dst_run, dst_var,
+                   {name: list(output) for name, output in skeleton.outputs.items()}, list(skeleton.inputs))
+
+    def to_skeleton(self) -> ModelSkeleton:
+        """
+        :return: A new ModelSkeleton with the runs of the table.
+        """
+        return ModelSkeleton(dict(self.submodels), [dict(run, inputs=dict(run["inputs"].items())) for run in self.runs],
+                             {name: list(output) for name, output in self.outputs.items()}, inputs=list(self.inputs))
+
+    def intern(self, string: str) -> int:
+        """
+        :return: The code of the string, added to the table if needed.
+        """
+        code = self._codes.get(string)
+        if code is None:
+            code = self._codes[string] = len(self.strings)
+            self.strings.append(string)
+        return code
+
+    @property
+    def n_runs(self) -> int:
+        return len(self.run_models)
+
+    @property
+    def n_edges(self) -> int:
+        return len(self.src_run)
+
+    def _get_offsets(self) -> np.ndarray:
+        """
+        :return: The bounds of the edges of each run: the inputs of the run i are the edges offsets[i]:offsets[i + 1].
+        """
+        if self._offsets is None:
+            self._offsets = np.searchsorted(self.dst_run, np.arange(self.n_runs + 1))
+        return self._offsets
+
+    # the interface of SkeletonRecord read by the views of the runs
+
+    def get_run_model(self, run_id: int) -> str:
+        return self.strings[self.run_models[run_id]]
+
+    def get_run_edges(self, run_id: int) -> List[int]:
+        """
+        :return: The (input variable, source run, source variable) triplets of the inputs of the run, flattened, with
+        the variables as codes in the string table.
+        """
+        start, end = self._get_offsets()[run_id:run_id + 2]
+        edges = np.empty((end - start, EDGE_SIZE), INDEX_TYPE)
+        edges[:, 0] = self.dst_var[start:end]
+        edges[:, 1] = self.src_run[start:end]
+        edges[:, 2] = self.src_var[start:end]
+        return edges.ravel().tolist()
+
+    @property
+    def runs(self) -> RunsView:
+        """
+        :return: Read-only views of the runs, in the format of ModelSkeleton.runs.
+        """
+        return RunsView(self)
+
+    # graph queries
+
+    def find_inputs(self) -> List[str]:
+        return [self.strings[code] for code in self.src_var[self.src_run == -1].tolist()]
+
+    def find_models_variables_connected_to_input(self, input_id: str) -> List[list]:
+        code = self._codes.get(input_id)
+        if code is None:
+            return []
+        edges = np.flatnonzero((self.src_run == -1) & (self.src_var == code))
+        return [[run_id, self.strings[variable]]
+                for run_id, variable in zip(self.dst_run[edges].tolist(), self.dst_var[edges].tolist())]
+
+    def get_direct_parents(self, run_id: int) -> List[int]:
+        if run_id == -1:
+            return []
+        start, end = self._get_offsets()[run_id:run_id + 2]
+        return np.unique(self.src_run[start:end]).tolist()
+
+    def get_direct_children(self, run_id: int) -> List[int]:
+        return np.unique(self.dst_run[self.src_run == run_id]).tolist()
+
+    def get_runs_by_model(self) -> Dict[str, List[int]]:
+        """
+        :return: A dictionary mapping the submodels used by runs to the indices of their runs, in order of first run.
+        """
+        order = np.argsort(self.run_models, kind="stable")
+        models, first_runs, counts = np.unique(self.run_models, return_index=True, return_counts=True)
+        groups = np.split(order, np.cumsum(counts)[:-1])
+        return {self.strings[models[i]]: groups[i].tolist() for i in np.argsort(first_runs).tolist()}
+
+    def get_runs_heights(self) -> List[int]:
+        """
+        :return: The height of every run, as ModelSkeleton.get_runs_heights: the length of the longest path from the
+        run to an output run, -1 for the runs not used by the outputs.
+        """
+        n_runs = self.n_runs
+        internal = self.src_run >= 0
+        # the distinct links between runs, as parent * n_runs + child
+        links = np.unique(self.src_run[internal] * n_runs + self.dst_run[internal])
+        parents, children = np.divmod(links, n_runs)
+
+        # runs used by the outputs: the ancestors of the output runs, level by level
+        used = np.zeros(n_runs, dtype=bool)
+        frontier = np.unique([run_id for run_id, _ in self.outputs.values() if run_id != -1]).astype(INDEX_TYPE)
+        used[frontier] = True
+        by_child = np.argsort(children, kind="stable")
+        child_offsets = np.searchsorted(children[by_child], np.arange(n_runs + 1))
+        while frontier.size:
+            frontier_parents = parents[by_child[_ranges(child_offsets[frontier], child_offsets[frontier + 1])]]
+            frontier = np.unique(frontier_parents[~used[frontier_parents]])
+            used[frontier] = True
+
+        # heights, peeling the used runs without remaining used children
+        heights = np.full(n_runs, -1, dtype=INDEX_TYPE)
+        used_links = used[children]
+        parents, children = parents[used_links], children[used_links]
+        remaining = np.bincount(parents, minlength=n_runs)
+        by_child = np.argsort(children, kind="stable")
+        child_offsets = np.searchsorted(children[by_child], np.arange(n_runs + 1))
+        frontier = np.flatnonzero(used & (remaining == 0))
+        height = 0
+        processed = 0
+        while frontier.size:
+            heights[frontier] = height
+            processed += frontier.size
+            frontier_parents = parents[by_child[_ranges(child_offsets[frontier], child_offsets[frontier + 1])]]
+            np.subtract.at(remaining, frontier_parents, 1)
+            frontier_parents = np.unique(frontier_parents)
+            frontier = frontier_parents[remaining[frontier_parents] == 0]
+            height += 1
+        if processed != used.sum():
+            raise Exception("Cycle detected in the graph")
+        return heights.tolist()
+
+    def get_unused_runs(self) -> List[int]:
+        return [run_id for run_id, height in enumerate(self.get_runs_heights()) if height == -1]
+
+    def find_runs_order(self) -> List[int]:
+        """
+        :return: The used runs, as ModelSkeleton.find_runs_order: by decreasing height, then by index.
+        """
+        heights = np.asarray(self.get_runs_heights(), dtype=INDEX_TYPE)
+        used = np.flatnonzero(heights != -1)
+        return used[np.argsort(-heights[used], kind="stable")].tolist()
+
+    # mutations
+
+    def _select_runs(self, selected: np.ndarray, new_references: np.ndarray):
+        """
+        Keeps the selected runs, in the given order, and rewrites the references to the runs with new_references (the
+        new index of each run).
+        """
+        offsets = self._get_offsets()
+        starts = offsets[selected]
+        counts = offsets[selected + 1] - starts
+        edges = _ranges(starts, starts + counts)
+        self.run_models = self.run_models[selected]
+        self.src_run = self.src_run[edges]
+        internal = self.src_run >= 0
+        self.src_run[internal] = new_references[self.src_run[internal]]
+        self.src_var = self.src_var[edges]
+        self.dst_var = self.dst_var[edges]
+        self.dst_run = np.repeat(np.arange(len(selected), dtype=INDEX_TYPE), counts)
+        self._offsets = None
+        for output in self.outputs.values():
+            if output[0] >= 0:
+                output[0] = int(new_references[output[0]])
+
+    def reorder_runs(self, new_order: Optional[Iterable[int]] = None):
+        """
+        Reorders the runs as ModelSkeleton.reorder_runs: by default, the used runs by decreasing height.
+        """
+        if new_order is None:
+            new_order = self.find_runs_order()
+        new_order = np.asarray(new_order, dtype=INDEX_TYPE)
+        inverter = np.full(self.n_runs, -1, dtype=INDEX_TYPE)
+        inverter[new_order] = np.arange(len(new_order), dtype=INDEX_TYPE)
+        self._select_runs(new_order, inverter)
+
+    def del_runs(self, indices: Iterable[int]):
+        """
+        Deletes runs as ModelSkeleton.del_runs: the references to the runs after a deleted run are shifted, then the
+        submodels without runs are removed.
+        """
+        deleted = np.unique(np.asarray(list(indices), dtype=INDEX_TYPE))
+        if not deleted.size:
+            return
+        if deleted[0] < 0 or deleted[-1] >= self.n_runs:
+            raise IndexError("run index out of range")
+        runs = np.arange(self.n_runs, dtype=INDEX_TYPE)
+        kept = np.ones(self.n_runs, dtype=bool)
+        kept[deleted] = False
+        self._select_runs(runs[kept], runs - np.searchsorted(deleted, runs))
+        self.remove_unused_submodels()
+
+    def del_run(self, index: int):
+        self.del_runs([index])
+
+    def prune_unused(self) -> List[int]:
+        unused_runs = self.get_unused_runs()
+        self.del_runs(unused_runs)
+        return unused_runs
+
+    def remove_unused_submodels(self):
+        used = {self.strings[code] for code in np.unique(self.run_models).tolist()}
+        for model in [model for model in self.submodels if model not in used]:
+            del self.submodels[model]
+
+
+def reorder_tables(tables: Sequence[RunTable], new_orders: Optional[Sequence[Iterable[int]]] = None):
+    """
+    Reorders the runs of several tables at once, as RunTable.reorder_runs on each of them: the edges of the tables are
+    concatenated, with the runs of each table shifted after those of the previous ones, and reordered with a single
+    gather of their ranges and a single permutation of their references (inverter[src]).
+
+    :param new_orders: The new order of the runs of each table, by default the used runs by decreasing height.
+    """
+    if new_orders is None:
+        new_orders = [table.find_runs_order() for table in tables]
+    new_orders = [np.asarray(new_order, dtype=INDEX_TYPE) for new_order in new_orders]
+    if len(new_orders) != len(tables):
+        raise ValueError("Expected as many orders as tables")
+    if not tables:
+        return
+    n_runs = np.array([table.n_runs for table in tables], dtype=INDEX_TYPE)
+    n_selected = np.array([len(new_order) for new_order in new_orders], dtype=INDEX_TYPE)
+    runs_bases = np.cumsum(n_runs) - n_runs
+    selected_bases = np.cumsum(n_selected) - n_selected
+    edges_tables = np.repeat(np.arange(len(tables)), [table.n_edges for table in tables])
+
+    src_run = np.concatenate([table.src_run for table in tables])
+    internal = src_run >= 0
+    if np.any(src_run[internal] >= n_runs[edges_tables[internal]]):
+        raise IndexError("run index out of range")
+    src_run[internal] += runs_bases[edges_tables[internal]]
+    batch = RunTable({}, [], np.concatenate([table.run_models for table in tables]), src_run,
+                     np.concatenate([table.src_var for table in tables]),
+                     np.concatenate([table.dst_run for table in tables]) + runs_bases[edges_tables],
+                     np.concatenate([table.dst_var for table in tables]), {}, [])
+    selected = np.concatenate([new_order + base for new_order, base in zip(new_orders, runs_bases.tolist())])
+    inverter = np.full(len(batch.run_models), -1, dtype=INDEX_TYPE)
+    inverter[selected] = np.arange(len(selected), dtype=INDEX_TYPE)
+    batch._select_runs(selected, inverter)
+
+    # back to the indices of the runs in each table
+    runs_bounds = np.append(selected_bases, len(selected))
+    edges_bounds = np.searchsorted(batch.dst_run, runs_bounds).tolist()
+    edges_tables = np.repeat(np.arange(len(tables)), np.diff(edges_bounds))
+    internal = batch.src_run >= 0
+    batch.src_run[internal] -= selected_bases[edges_tables[internal]]
+    batch.dst_run -= selected_bases[edges_tables]
+    outputs = [output for table in tables for output in table.outputs.values()]
+    outputs_tables = np.repeat(np.arange(len(tables)), [len(table.outputs) for table in tables])
+    references = np.array([output[0] for output in outputs], dtype=INDEX_TYPE)
+    mapped = references >= 0
+    references[mapped] = inverter[references[mapped] + runs_bases[outputs_tables[mapped]]]
+    mapped &= references >= 0
+    references[mapped] -= selected_bases[outputs_tables[mapped]]
+    for output, reference in zip(outputs, references.tolist()):
+        output[0] = reference
+    runs_bounds = runs_bounds.tolist()
+    for i, table in enumerate(tables):
+        start, end = edges_bounds[i:i + 2]
+        table.run_models = batch.run_models[runs_bounds[i]:runs_bounds[i + 1]]
+        table.src_run = batch.src_run[start:end]
+        table.src_var = batch.src_var[start:end]
+        table.dst_run = batch.dst_run[start:end]
+        table.dst_var = batch.dst_var[start:end]
+        table._offsets = None
+
+
+def _ranges(starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """
+    :return: The concatenation of the ranges [starts[i], ends[i]).
+    """
+    counts = ends - starts
+    bounds = np.cumsum(counts)
+    return np.repeat(starts - bounds + counts, counts) + np.arange(bounds[-1] if len(bounds) else 0)
@@ -0,0 +1,549 @@
+import json
+import sys
+from array import array
+from collections.abc import Mapping, Sequence
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+from .modelskeleton import ModelSkeleton
+from .modeltemplate import InputTemplate, ModelTemplate, OutputTemplate
+from .Network.Layer import Layer, LayerIOLink
+from .Network.LayerModel import InputModel, LayerModel, OutputModel, TemplatedModel
+from .Network.Network import Network
+from .Network.Parameter import Parameter
+from .Network.Variable import Variable
+
+"""
+Compact binary serialization of ModelSkeleton and Network, to send them to other processes.
+
+A record is a 4 bytes magic, followed by flat arrays of little-endian integers and by a table of the distinct
+strings (names, types, template sources, templates properties in json) referenced by index from the integers. The
+header holds the format version, the size of the integers of the sections (16 bits when all the values fit, 32 bits
+otherwise), the size of the string table, the sizes of the sections of the record and a few values specific to the
+kind of record. It is followed by the sections one after the other, then by the offsets of the strings in the utf-8
+blob that ends the record.
+
+SkeletonRecord and NetworkRecord read a record in place from bytes, bytearray, memoryview or any buffer (e.g. shared
+memory): the integers are a cast of the buffer and the strings are only decoded when accessed. The objects are only
+built by to_skeleton and to_network. The Hashable objects of a network are rebuilt with new ids, so a decoded network
+never shares ids with the network it was encoded from.
+
+A TemplatedModel is stored as its template source, and rebuilt from it: the template must be readable by the process
+decoding the network.
+"""
+
+FORMAT_VERSION = 1
+SKELETON_MAGIC = b"MSK\x01"
+NETWORK_MAGIC = b"NET\x01"
+NO_STRING = -1
+
+# kinds of the submodels of a skeleton
+SUBMODEL_NONE, SUBMODEL_DICT, SUBMODEL_TEMPLATE, SUBMODEL_INPUT, SUBMODEL_OUTPUT = range(5)
+TEMPLATE_KINDS = {ModelTemplate: SUBMODEL_TEMPLATE, InputTemplate: SUBMODEL_INPUT, OutputTemplate: SUBMODEL_OUTPUT}
+# kinds of the models of a network
+MODEL_KINDS = {LayerModel: 0, InputModel: 1, OutputModel: 2, TemplatedModel: 3}
+MODEL_CLASSES = {kind: model_class for model_class, kind in MODEL_KINDS.items()}
+# the python types used as data types, stored by name between angle brackets to tell them from strings
+TYPES = {"<float>": float, "<int>": int, "<str>": str, "<bool>": bool}
+TYPES_NAMES = {value: name for name, value in TYPES.items()}
+
+SUBMODEL_SIZE = 6
+RUN_SIZE = 2
+EDGE_SIZE = 3
+OUTPUT_SIZE = 3
+MODEL_SIZE = 5
+VARIABLE_SIZE = 5
+PARAMETER_SIZE = 2
+LAYER_SIZE = 2
+LINK_SIZE = 4
+
+
+class StringTable:
+    """
+    The distinct strings of a record being encoded, indexed in order of first use.
+    """
+
+    def __init__(self):
+        self.indices: Dict[str, int] = {}
+
+    def add(self, string: Optional[str]) -> int:
+        if string is None:
+            return NO_STRING
+        return self.indices.setdefault(string, len(self.indices))
+
+
+class StringsView:
+    """
+    The string table of a record, decoded on access.
+    """
+
+    def __init__(self, offsets: memoryview, blob: memoryview):
+        self.offsets = offsets
+        self.blob = blob
+        self._strings: List[Optional[str]] = [None] * (len(offsets) - 1)
+
+    def __getitem__(self, index: int) -> Optional[str]:
+        if index == NO_STRING:
+            return None
+        string = self._strings[index]
+        if string is None:
+            string = self._strings[index] = str(self.blob[self.offsets[index]:self.offsets[index + 1]], "utf-8")
+        return string
+
+    def __len__(self):
+        return len(self._strings)
+
+
+def _pack(magic: bytes, sizes: List[int], extras: List[int], ints: array, strings: StringTable) -> bytes:
+    encoded = [string.encode() for string in strings.indices]
+    offsets = array("i", [0])
+    position = 0
+    for string in encoded:
+        position += len(string)
+        offsets.append(position)
+    if not ints or -2 ** 15 <= min(ints) and max(ints) < 2 ** 15:
+        ints = array("h", ints)
+    header = array("i", [FORMAT_VERSION, ints.itemsize, len(encoded)] + sizes + extras)
+    # the offsets start on a multiple of 4 bytes
+    padding = b"\0" * (-len(ints) * ints.itemsize % 4)
+    if sys.byteorder == "big":
+        for part in (header, ints, offsets):
+            part.byteswap()
+    return b"".join((magic, header.tobytes(), ints.tobytes(), padding, offsets.tobytes(), b"".join(encoded)))
+
+
+def _unpack(buffer, magic: bytes, n_sizes: int, n_extras: int = 0
+            ) -> Tuple[List[int], List[int], memoryview, StringsView]:
+    """
+    :return: The sizes of the sections, the extra values of the header, the integers of the sections and the string
+    table of a record.
+    """
+    view = memoryview(buffer).cast("B")
+    if bytes(view[:4]) != magic:
+        raise ValueError(f"Not a record of the expected kind, magic {bytes(view[:4])!r} instead of {magic!r}")
+    header_end = 4 + 4 * (3 + n_sizes + n_extras)
+    header = _ints(view[4:header_end], "i")
+    if header[0] != FORMAT_VERSION:
+        raise ValueError(f"Unsupported format version {header[0]}, expected {FORMAT_VERSION}")
+    itemsize, n_strings = header[1:3]
+    sizes = list(header[3:3 + n_sizes])
+    ints_end = header_end + itemsize * sum(sizes)
+    offsets_start = ints_end + (-ints_end % 4)
+    offsets_end = offsets_start + 4 * (n_strings + 1)
+    if len(view) < offsets_end:
+        raise ValueError("Truncated record")
+    ints = _ints(view[header_end:ints_end], "h" if itemsize == 2 else "i")
+    offsets = _ints(view[offsets_start:offsets_end], "i")
+    if len(view) < offsets_end + offsets[-1]:
+        raise ValueError("Truncated record")
+    return sizes, list(header[3 + n_sizes:]), ints, StringsView(offsets, view[offsets_end:offsets_end + offsets[-1]])
+
+
+def _ints(view: memoryview, typecode: str) -> memoryview:
+    if sys.byteorder == "big":
+        # the records are little-endian: big-endian platforms decode a copy
+        ints = array(typecode, view.tobytes())
+        ints.byteswap()
+        return memoryview(ints)
+    return view.cast(typecode)
+
+
+def _type_name(data_type) -> str:
+    if isinstance(data_type, type):
+        name = TYPES_NAMES.get(data_type)
+        if name is None:
+            raise ValueError(f"Cannot encode the data type {data_type}")
+        return name
+    return str(data_type)
+
+
+def _sections(sizes: List[int], ints: memoryview) -> List[memoryview]:
+    sections = []
+    position = 0
+    for size in sizes:
+        sections.append(ints[position:position + size])
+        position += size
+    return sections
+
+
+def encode_skeleton(skeleton: ModelSkeleton) -> bytes:
+    """
+    :return: The record of the skeleton: its submodels, runs, outputs and inputs.
+    """
+    strings = StringTable()
+    submodels = array("i")
+    for name, submodel in skeleton.submodels.items():
+        if submodel is None:
+            submodels.extend((strings.add(name), SUBMODEL_NONE, NO_STRING, NO_STRING, NO_STRING, NO_STRING))
+        elif isinstance(submodel, dict):
+            submodels.extend((strings.add(name), SUBMODEL_DICT, NO_STRING, NO_STRING, NO_STRING,
+                              strings.add(json.dumps(submodel, sort_keys=True))))
+        else:
+            kind = TEMPLATE_KINDS.get(type(submodel))
+            if kind is None:
+                raise ValueError(f"Cannot encode the submodel {name} of type {type(submodel).__name__}")
+            props = submodel._props
+            submodels.extend((strings.add(name), kind, strings.add(submodel.template_type),
+                              strings.add(submodel.source), strings.add(submodel.template_source),
+                              strings.add(json.dumps(props, sort_keys=True)) if props else NO_STRING))
+
+    runs = array("i")
+    edges = array("i")
+    for run in skeleton.runs:
+        for variable, (source, source_variable) in run["inputs"].items():
+            edges.extend((strings.add(variable), source, strings.add(source_variable)))
+        runs.extend((strings.add(run["id"]), len(edges) // EDGE_SIZE))
+    outputs = array("i")
+    for name, (source, variable) in skeleton.outputs.items():
+        outputs.extend((strings.add(name), source, strings.add(variable)))
+    inputs = array("i", [strings.add(str(variable)) for variable in skeleton.inputs])
+
+    sections = (submodels, runs, edges, outputs, inputs)
+    return _pack(SKELETON_MAGIC, [len(section) for section in sections], [],
+                 submodels + runs + edges + outputs + inputs, strings)
+
+
+class SkeletonRecord:
+    """
+    A ModelSkeleton encoded by encode_skeleton, read in place.
+
+    Attributes:
+        n_submodels (int): The number of submodels.
+        n_runs (int): The number of runs.
+        strings (StringsView): The string table of the record.
+    """
+
+    def __init__(self, buffer):
+        sizes, _, ints, self.strings = _unpack(buffer, SKELETON_MAGIC, 5)
+        self._submodels, self._runs, self._edges, self._outputs, self._inputs = _sections(sizes, ints)
+        self.n_submodels = len(self._submodels) // SUBMODEL_SIZE
+        self.n_runs = len(self._runs) // RUN_SIZE
+
+    def get_run_model(self, run_id: int) -> str:
+        """
+        :return: The name of the submodel of the run.
+        """
+        return self.strings[self._runs[run_id * RUN_SIZE]]
+
+    def get_run_edges(self, run_id: int) -> memoryview:
+        """
+        :return: The (input variable, source run, source variable) triplets of the inputs of the run, flattened, with
+        the variables as indices in the string table.
+        """
+        start = self._runs[run_id * RUN_SIZE - 1] if run_id else 0
+        return self._edges[start * EDGE_SIZE:self._runs[run_id * RUN_SIZE + 1] * EDGE_SIZE]
+
+    def get_run(self, run_id: int) -> dict:
+        """
+        :return: The run, in the format of ModelSkeleton.runs.
+        """
+        edges = self.get_run_edges(run_id)
+        strings = self.strings
+        return {"id": self.get_run_model(run_id),
+                "inputs": {strings[edges[i]]: [edges[i + 1], strings[edges[i + 2]]]
+                           for i in range(0, len(edges), EDGE_SIZE)}}
+
+    @property
+    def runs(self) -> List[dict]:
+        return [self.get_run(run_id) for run_id in range(self.n_runs)]
+
+    @property
+    def outputs(self) -> Dict[str, list]:
+        outputs = self._outputs
+        strings = self.strings
+        return {strings[outputs[i]]: [outputs[i + 1], strings[outputs[i + 2]]]
+                for i in range(0, len(outputs), OUTPUT_SIZE)}
+
+    @property
+    def inputs(self) -> List[str]:
+        return [self.strings[index] for index in self._inputs]
+
+    @property
+    def submodels_names(self) -> List[str]:
+        return [self.strings[self._submodels[i]] for i in range(0, len(self._submodels), SUBMODEL_SIZE)]
+
+    def get_submodel(self, submodel_id: int):
+        """
+        :return: A new object for the submodel at the given position: a ModelTemplate (or Input/OutputTemplate) with
+        its properties, a dict or None.
+        """
+        strings = self.strings
+        _, kind, template_type, source, template_source, props = \
+            self._submodels[submodel_id * SUBMODEL_SIZE:(submodel_id + 1) * SUBMODEL_SIZE]
+        if kind == SUBMODEL_NONE:
+            return None
+        if kind == SUBMODEL_DICT:
+            return json.loads(strings[props])
+        if kind == SUBMODEL_TEMPLATE:
+            submodel = ModelTemplate(strings[template_type], strings[source], strings[template_source])
+        else:
+            submodel = InputTemplate() if kind == SUBMODEL_INPUT else OutputTemplate()
+        if props != NO_STRING:
+            submodel.properties = json.loads(strings[props])
+        return submodel
+
+    @property
+    def submodels(self) -> dict:
+        return {name: self.get_submodel(submodel_id) for submodel_id, name in enumerate(self.submodels_names)}
+
+    def to_skeleton(self) -> ModelSkeleton:
+        return ModelSkeleton(self.submodels, self.runs, self.outputs, inputs=self.inputs)
+
+
+class RunInputsView(Mapping):
+    """
+    The inputs of a run of a record: the input variables mapped to [source run, source variable] pairs.
+
+    The views of the runs work on any object with the n_runs, strings, get_run_model and get_run_edges of
+    SkeletonRecord.
+    """
+    __slots__ = ("_edges", "_strings")
+
+    def __init__(self, edges: Sequence[int], strings):
+        self._edges = edges
+        self._strings = strings
+
+    def _find(self, variable: str) -> int:
+        edges = self._edges
+        strings = self._strings
+        for i in range(0, len(edges), EDGE_SIZE):
+            if strings[edges[i]] == variable:
+                return i
+        return -1
+
+    def __getitem__(self, variable: str) -> list:
+        i = self._find(variable)
+        if i == -1:
+            raise KeyError(variable)
+        return [self._edges[i + 1], self._strings[self._edges[i + 2]]]
+
+    def __contains__(self, variable) -> bool:
+        return self._find(variable) != -1
+
+    def __iter__(self) -> Iterator[str]:
+        edges = self._edges
+        strings = self._strings
+        return (strings[edges[i]] for i in range(0, len(edges), EDGE_SIZE))
+
+    def __len__(self):
+        return len(self._edges) // EDGE_SIZE
+
+    def values(self):
+        edges = self._edges
+        strings = self._strings
+        return [[edges[i + 1], strings[edges[i + 2]]] for i in range(0, len(edges), EDGE_SIZE)]
+
+    def items(self):
+        edges = self._edges
+        strings = self._strings
+        return [(strings[edges[i]], [edges[i + 1], strings[edges[i + 2]]]) for i in range(0, len(edges), EDGE_SIZE)]
+
+
+class RunView(Mapping):
+    """
+    A run of a record, with the keys of the runs of ModelSkeleton: 'id' and 'inputs'.
+    """
+    __slots__ = ("_record", "_run_id")
+
+    def __init__(self, record: SkeletonRecord, run_id: int):
+        self._record = record
+        self._run_id = run_id
+
+    def __getitem__(self, key: str):
+        if key == "id":
+            return self._record.get_run_model(self._run_id)
+        if key == "inputs":
+            return RunInputsView(self._record.get_run_edges(self._run_id), self._record.strings)
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(("id", "inputs"))
+
+    def __len__(self):
+        return 2
+
+
+class RunsView(Sequence):
+    """
+    The runs of a record.
+    """
+    __slots__ = ("_record",)
+
+    def __init__(self, record: SkeletonRecord):
+        self._record = record
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [RunView(self._record, run_id) for run_id in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("run index out of range")
+        return RunView(self._record, index)
+
+    def __len__(self):
+        return self._record.n_runs
+
+
+def decode_skeleton(buffer) -> ModelSkeleton:
+    return SkeletonRecord(buffer).to_skeleton()
+
+
+def _unique(items: list) -> list:
+    seen = set()
+    return [item for item in items if not (id(item) in seen or seen.add(id(item)))]
+
+
+def encode_network(network: Network) -> bytes:
+    """
+    :return: The record of the network: its models, layers and links, and its input and output layers.
+    """
+    strings = StringTable()
+    models_index = {}
+    models = array("i")
+    variables = array("i")
+    parameters = array("i")
+    for model in network.models:
+        kind = MODEL_KINDS.get(type(model))
+        if kind is None:
+            raise ValueError(f"Cannot encode the model {model.name} of type {type(model).__name__}")
+        models_index[id(model)] = len(models_index)
+        if kind != MODEL_KINDS[TemplatedModel]:
+            for io, model_variables in ((0, model.input_variables), (1, model.output_variables)):
+                for variable in _unique(model_variables):
+                    variables.extend((strings.add(variable.name), variable.dimension, io,
+                                      strings.add(_type_name(variable.data_type)), int(variable.instantiable)))
+            for parameter in model.parameters:
+                parameters.extend((strings.add(parameter.name), strings.add(_type_name(parameter.parameter_type))))
+        models.extend((kind, strings.add(model.name), strings.add(getattr(model, "template_source", None)),
+                       len(variables) // VARIABLE_SIZE, len(parameters) // PARAMETER_SIZE))
+
+    layers_index = {layer: i for i, layer in enumerate(network.layers)}
+    layers = array("i")
+    links = array("i")
+    for layer in network.layers:
+        model = models_index.get(id(layer.model))
+        if model is None:
+            raise ValueError(f"The model of the layer {layer.name} is not a model of the network")
+        layers.extend((model, strings.add(layer.name)))
+        for variable, link in layer.inputs.items():
+            if link is None:
+                continue
+            input_layer = layers_index.get(link[0])
+            if input_layer is None:
+                raise ValueError(f"The layer {layer.name} takes an input from a layer out of the network")
+            links.extend((input_layer, strings.add(link[1].name), layers_index[layer], strings.add(variable.name)))
+
+    sections = (models, variables, parameters, layers, links)
+    io_layers = [layers_index[network.input_layer], layers_index[network.output_layer]]
+    return _pack(NETWORK_MAGIC, [len(section) for section in sections], io_layers,
+                 models + variables + parameters + layers + links, strings)
+
+
+class NetworkRecord:
+    """
+    A Network encoded by encode_network, read in place.
+
+    Attributes:
+        n_models (int): The number of models.
+        n_layers (int): The number of layers.
+        input_layer (int): The index of the input layer.
+        output_layer (int): The index of the output layer.
+        strings (StringsView): The string table of the record.
+    """
+
+    def __init__(self, buffer):
+        sizes, extras, ints, self.strings = _unpack(buffer, NETWORK_MAGIC, 5, 2)
+        self.input_layer, self.output_layer = extras
+        self._models, self._variables, self._parameters, self._layers, self._links = _sections(sizes, ints)
+        self.n_models = len(self._models) // MODEL_SIZE
+        self.n_layers = len(self._layers) // LAYER_SIZE
+
+    @property
+    def layers_names(self) -> List[str]:
+        return [self.strings[self._layers[i + 1]] for i in range(0, len(self._layers), LAYER_SIZE)]
+
+    @property
+    def layers_models(self) -> memoryview:
+        """
+        :return: The index of the model of every layer.
+        """
+        return self._layers[::LAYER_SIZE]
+
+    @property
+    def links(self) -> List[Tuple[int, str, int, str]]:
+        """
+        :return: The (input layer, input variable, output layer, output variable) links between the layers.
+        """
+        links = self._links
+        strings = self.strings
+        return [(links[i], strings[links[i + 1]], links[i + 2], strings[links[i + 3]])
+                for i in range(0, len(links), LINK_SIZE)]
+
+    def _build_model(self, model_id: int, variables_start: int, parameters_start: int) -> LayerModel:
+        kind, name, template_source, variables_end, parameters_end = \
+            self._models[model_id * MODEL_SIZE:(model_id + 1) * MODEL_SIZE]
+        strings = self.strings
+        model_class = MODEL_CLASSES[kind]
+        if model_class is TemplatedModel:
+            return TemplatedModel(strings[name], strings[template_source])
+
+        variables = {0: [], 1: []}
+        data = self._variables
+        for i in range(variables_start * VARIABLE_SIZE, variables_end * VARIABLE_SIZE, VARIABLE_SIZE):
+            variable_name, dimension, io, data_type, instantiable = data[i:i + VARIABLE_SIZE]
+            data_type = strings[data_type]
+            variable = Variable(strings[variable_name], dimension, "out" if io else "in",
+                                TYPES.get(data_type, data_type), instantiable=bool(instantiable))
+            variables[io].append(variable)
+        if model_class is InputModel:
+            return InputModel(strings[name], variables[1])
+        if model_class is OutputModel:
+            return OutputModel(strings[name], variables[0])
+        parameters = []
+        data = self._parameters
+        for i in range(parameters_start * PARAMETER_SIZE, parameters_end * PARAMETER_SIZE, PARAMETER_SIZE):
+            parameter_type = strings[data[i + 1]]
+            parameters.append(Parameter(strings[data[i]], TYPES.get(parameter_type, parameter_type)))
+        return LayerModel(strings[name], variables[0], variables[1], parameters)
+
+    def to_network(self) -> Network:
+        """
+        :return: A new network, with new models, layers and links.
+        """
+        models = []
+        variables_start = parameters_start = 0
+        for model_id in range(self.n_models):
+            models.append(self._build_model(model_id, variables_start, parameters_start))
+            variables_start = self._models[model_id * MODEL_SIZE + 3]
+            parameters_start = self._models[model_id * MODEL_SIZE + 4]
+        layers = [Layer(models[model], name) for model, name in zip(self.layers_models, self.layers_names)]
+        for input_layer, input_variable, output_layer, output_variable in self.links:
+            LayerIOLink(layers[input_layer], input_variable, layers[output_layer], output_variable).make_link()
+        return Network(models, layers, layers[self.input_layer], layers[self.output_layer])
+
+
+def decode_network(buffer) -> Network:
+    return NetworkRecord(buffer).to_network()
+
+
+def encode(item: Union[ModelSkeleton, Network]) -> bytes:
+    """
+    :return: The record of a skeleton or of a network.
+    """
+    if isinstance(item, ModelSkeleton):
+        return encode_skeleton(item)
+    if isinstance(item, Network):
+        return encode_network(item)
+    raise TypeError(f"Cannot encode an object of type {type(item).__name__}")
+
+
+def decode(buffer) -> Union[ModelSkeleton, Network]:
+    """
+    :return: The skeleton or the network of a record.
+    """
+    magic = bytes(memoryview(buffer).cast("B")[:4])
+    if magic == SKELETON_MAGIC:
+        return decode_skeleton(buffer)
+    if magic == NETWORK_MAGIC:
+        return decode_network(buffer)
+    raise ValueError(f"Unknown record magic {magic!r}")
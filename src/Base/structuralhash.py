@@ -0,0 +1,172 @@
+import hashlib
+import json
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .modelskeleton import ModelSkeleton
+
+"""
+Structural hashing of ModelSkeleton, to detect skeletons describing the same model before solving their parameters or
+generating their code.
+
+The hash only depends on the structure of the skeleton: the types and sources of the submodels used by the runs and
+the properties of their templates (variables, parameters with their defaults, constraints), which runs share a
+submodel, the links between the runs and the inputs and outputs of the model. It does not depend on the order of the
+runs nor on the names of the submodels. Runs are labeled by Weisfeiler-Lehman refinement: each run starts with a label
+built from its submodel. Since the runs graph is acyclic, each round of refinement combines the label of
+every run with the labels of its parents in one upward pass in topological order, then with the labels of its
+children in one downward pass, and finally with one digest per submodel of the labels of the runs sharing it. Rounds
+are repeated until the partition of the runs by label stops refining, which only takes more than two rounds when the
+sharing of submodels distinguishes runs that the links alone do not. The hash of the skeleton is the hash of the sorted
+final labels, with the outputs.
+
+As with any Weisfeiler-Lehman test, two skeletons with the same hash are isomorphic for all practical purposes, but
+highly symmetric non-isomorphic run graphs could in theory collide.
+"""
+
+
+def _digest(*parts) -> str:
+    return hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+
+
+def submodel_signature(submodel) -> Tuple[str, str]:
+    """
+    :param submodel: A submodel of a skeleton, either a ModelTemplate or a dictionary with 'type' and 'source' keys.
+    :return: The (type, source) pair identifying the template of the submodel.
+    """
+    if isinstance(submodel, dict):
+        return str(submodel.get("type")), str(submodel.get("source"))
+    return str(getattr(submodel, "template_type", None)), str(getattr(submodel, "source", None))
+
+
+def template_digest(submodel) -> str:
+    """
+    :param submodel: A submodel of a skeleton, either a ModelTemplate or a dictionary with 'type' and 'source' keys, and
+    optionally 'properties'.
+    :return: A digest of the canonical JSON of the properties of the template of the submodel. The dimension parameters
+    that ModelParameters adds to the properties when it solves them are left out, so that the digest does not change
+    once the template is solved.
+    """
+    if isinstance(submodel, dict):
+        properties = submodel.get("properties")
+    else:
+        properties = getattr(submodel, "properties", None)
+    if isinstance(properties, dict) and isinstance(properties.get("parameters"), dict):
+        generated = {f"_{variable}_{index}" for variable, variable_props in properties.get("variables", {}).items()
+                     for index in range(variable_props.get("dim", 0))}
+        parameters = {name: parameter_props for name, parameter_props in properties["parameters"].items()
+                      if name not in generated or parameter_props != {"type": "int", "virtual": True}}
+        properties = dict(properties, parameters=parameters)
+    serialized = json.dumps(properties, sort_keys=True, default=str)
+    return hashlib.blake2b(serialized.encode(), digest_size=16).hexdigest()
+
+
+def runs_labels(skeleton: ModelSkeleton) -> List[str]:
+    """
+    :return: The Weisfeiler-Lehman label of every run of the skeleton, invariant to the order of the runs and the names
+    of the submodels.
+    Raises ValueError if the runs form a cycle.
+    """
+    runs = skeleton.runs
+    runs_by_model = skeleton.get_runs_by_model()
+    # (input variable, source run or -1, source variable) for each run
+    in_links = [sorted(((variable, source[0], source[1]) for variable, source in run["inputs"].items()),
+                       key=lambda link: link[0]) for run in runs]
+    out_links: List[List[Tuple[str, int, str]]] = [[] for _ in runs]
+    for run_id, links in enumerate(in_links):
+        for variable, source, source_variable in links:
+            if source != -1:
+                out_links[source].append((source_variable, run_id, variable))
+
+    # topological order of the runs, parents first
+    n_parents = [sum(1 for link in links if link[1] != -1) for links in in_links]
+    order = [run_id for run_id, count in enumerate(n_parents) if count == 0]
+    for run_id in order:
+        for source_variable, child, variable in out_links[run_id]:
+            n_parents[child] -= 1
+            if n_parents[child] == 0:
+                order.append(child)
+    if len(order) != len(runs):
+        raise ValueError("the runs of the skeleton form a cycle")
+
+    submodels = {model: skeleton.submodels.get(model) for model in runs_by_model}
+    templates = {model: (submodel_signature(submodel), template_digest(submodel))
+                 for model, submodel in submodels.items()}
+    labels = [_digest("run", templates[run["id"]], len(runs_by_model[run["id"]])) for run in runs]
+    n_classes = len(set(labels))
+    while True:
+        # the labels of the parents are final when a run is reached, and those of the children on the way back
+        for run_id in order:
+            parents = [(variable, "input" if source == -1 else labels[source], source_variable)
+                       for variable, source, source_variable in in_links[run_id]]
+            labels[run_id] = _digest(labels[run_id], parents)
+        for run_id in reversed(order):
+            children = sorted((variable, labels[child], child_variable)
+                              for variable, child, child_variable in out_links[run_id])
+            labels[run_id] = _digest(labels[run_id], children)
+        shared = {model: _digest(sorted(labels[run_id] for run_id in run_ids))
+                  for model, run_ids in runs_by_model.items()}
+        labels = [_digest(label, shared[run["id"]]) for label, run in zip(labels, runs)]
+        new_n_classes = len(set(labels))
+        if new_n_classes == n_classes:
+            break
+        n_classes = new_n_classes
+    return labels
+
+
+def structural_hash(skeleton: ModelSkeleton) -> str:
+    """
+    :return: A hash of the structure of the skeleton, equal for skeletons that only differ by the order of their runs
+    or the names of their submodels.
+    """
+    labels = runs_labels(skeleton)
+    outputs = sorted((name, labels[output[0]] if output[0] != -1 else "input", output[1])
+                     for name, output in skeleton.outputs.items())
+    inputs = sorted(str(variable) for variable in skeleton.inputs)
+    return _digest(sorted(labels), outputs, inputs)
+
+
+class SkeletonDeduplicator:
+    """
+    Index of the skeletons of a population by structural hash, to skip the skeletons equivalent to one already seen.
+
+    Attributes:
+        representatives (Dict[str, ModelSkeleton]): Maps each structural hash to the first skeleton seen with it.
+        duplicates (int): The number of duplicates detected.
+    """
+
+    def __init__(self, skeletons: Optional[Iterable[ModelSkeleton]] = None):
+        self.representatives: Dict[str, ModelSkeleton] = {}
+        self.duplicates = 0
+        for skeleton in skeletons or []:
+            self.check_add(skeleton)
+
+    def check_add(self, skeleton: ModelSkeleton) -> bool:
+        """
+        Adds the skeleton to the index if no equivalent skeleton was seen before.
+
+        :return: True if the skeleton was added, False if it is a duplicate.
+        """
+        key = structural_hash(skeleton)
+        if key in self.representatives:
+            self.duplicates += 1
+            return False
+        self.representatives[key] = skeleton
+        return True
+
+    def get_representative(self, skeleton: ModelSkeleton) -> Optional[ModelSkeleton]:
+        """
+        :return: The first skeleton seen that is equivalent to the given one, None if there is none.
+        """
+        return self.representatives.get(structural_hash(skeleton))
+
+    def filter(self, skeletons: Iterable[ModelSkeleton]) -> List[ModelSkeleton]:
+        """
+        :return: The skeletons not equivalent to any skeleton seen before (nor to each other), in their order.
+        """
+        return [skeleton for skeleton in skeletons if self.check_add(skeleton)]
+
+    def __contains__(self, skeleton: ModelSkeleton) -> bool:
+        return structural_hash(skeleton) in self.representatives
+
+    def __len__(self):
+        return len(self.representatives)
@@ -0,0 +1,64 @@
+from sympy import symbols, Eq, solve, sympify, true
+
+"""
+The sympy based solver of the symbolic constraints, used for the constraints that are not linear in the parameters.
+It is kept apart so that sympy, which is slow to import, is only loaded when such a constraint has to be solved.
+"""
+
+
+def solve_symbolic_constraints_with_sympy(formulas, constrained_params):
+    """
+    :param formulas: The formulas of the component, in terms of global parameters
+    :param constrained_params: The global parameters of the component that must be expressed from the others
+    :return: A dictionary mapping the solved global parameters to their sympy expression
+    """
+    ineq = []
+    eq = []
+
+    # generate the formulae
+    for formula in formulas:
+        if ' = ' in formula:
+            e1, e2 = formula.split(" = ")
+            eq.append(Eq(sympify(e1), sympify(e2)))
+        if '<' in formula or '>' in formula:
+            ineq.append(sympify(formula))
+
+    # replace the constrained variables by their formulation
+    constrained_params_temp = {symbols(param) for param in constrained_params}
+    constrained_params_formulas: dict = {}
+    while len(constrained_params_temp) > 0:
+        variable_to_remove = None
+        removing_expression = None
+        for equation in eq:
+            if not isinstance(equation, Eq):
+                # equation already reduced to true or false by the substitutions
+                continue
+            if equation.lhs in constrained_params_temp:
+                variable_to_remove = equation.lhs
+                removing_expression = equation.rhs
+                break
+            if equation.rhs in constrained_params_temp:
+                variable_to_remove = equation.rhs
+                removing_expression = equation.lhs
+                break
+        if variable_to_remove is None:
+            # no formulation for the remaining constrained variables, they are solved as the others
+            break
+        constrained_params_formulas[variable_to_remove] = removing_expression
+        for i, equation in enumerate(eq):
+            eq[i] = equation.subs(variable_to_remove, removing_expression)
+
+        for i, inequality in enumerate(ineq):
+            ineq[i] = inequality.subs(variable_to_remove, removing_expression)
+
+        constrained_params_temp.discard(variable_to_remove)
+
+    # solve for the other unknowns
+    eq = [equation for equation in eq if equation is not true]
+    solutions = solve(eq, dict=True) if eq else []
+    solved_eq_dict = solutions[0] if solutions else {}
+
+    solution = {str(var): expression for var, expression in solved_eq_dict.items()}
+    for var, formula in constrained_params_formulas.items():
+        solution[str(var)] = formula.subs(solved_eq_dict)
+    return solution
@@ -0,0 +1,192 @@
+import copyreg
+import json
+import marshal
+import os
+import threading
+from types import MappingProxyType
+from typing import Dict, Iterable, Tuple
+
+"""
+A process-wide registry of the parsed templates properties.
+
+Templates are parsed once and keyed by their path, modification time and size, so that the thousands of models built
+from the same few templates do not read and parse the template files again. The registry hands out immutable
+structures (read-only mappings and tuples) that can be shared between models; mutable copies are available for the
+users that complete the properties in place.
+
+The registry can be saved to and loaded from an on-disk cache (marshal of the plain properties), so that new worker
+processes warm up without parsing the templates again.
+"""
+
+SOURCE_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+TEMPLATES_DIRECTORIES = (os.path.join(SOURCE_DIR, "basic_templates"), os.path.join(SOURCE_DIR, "templates"))
+DEFAULT_CACHE_FILE = os.path.join(SOURCE_DIR, "templates", ".templates_cache")
+CACHE_FORMAT_VERSION = 1
+
+TemplateKey = Tuple[int, int]
+
+
+def freeze(props):
+    """
+    :param props: Properties made of dictionaries, lists and scalars, as read from json.
+    :return: The same properties with the dictionaries replaced by read-only mappings and the lists by tuples.
+    """
+    if isinstance(props, dict):
+        return MappingProxyType({key: freeze(value) for key, value in props.items()})
+    if isinstance(props, list):
+        return tuple(freeze(value) for value in props)
+    return props
+
+
+def _mapping_proxy(mapping: dict) -> MappingProxyType:
+    return MappingProxyType(mapping)
+
+
+def _reduce_mapping_proxy(mapping: MappingProxyType):
+    return _mapping_proxy, (dict(mapping),)
+
+
+# models hold the frozen properties of their template and must stay picklable
+copyreg.pickle(MappingProxyType, _reduce_mapping_proxy)
+
+
+def thaw(props):
+    """
+    :param props: Properties, frozen or not.
+    :return: A mutable deep copy of the properties, made of dictionaries and lists.
+    """
+    if isinstance(props, (dict, MappingProxyType)):
+        return {key: thaw(value) for key, value in props.items()}
+    if isinstance(props, (list, tuple)):
+        return [thaw(value) for value in props]
+    return props
+
+
+def parse_template(source_file: str) -> dict:
+    """
+    Parses the properties of a template: json templates hold the properties directly, generated python templates hold
+    them between the BEGIN_PROPS and END_PROPS markers.
+
+    :param source_file: The path of the template file.
+    :return: The properties of the template.
+    """
+    with open(source_file, "r") as file:
+        text = file.read()
+    if not source_file.endswith(".json"):
+        text = text.split("BEGIN_PROPS")[1]
+        text = text.split("END_PROPS")[0]
+    return json.loads(text)
+
+
+class TemplateRegistry:
+    """
+    Caches the parsed properties of the templates.
+
+    Attributes:
+        entries (Dict[str, Tuple[TemplateKey, MappingProxyType]]): Maps the real path of each template to the
+            (modification time, size) of the file when it was parsed and its frozen properties.
+        parsed (int): The number of templates files parsed by the registry.
+    """
+
+    def __init__(self):
+        self.entries: Dict[str, Tuple[TemplateKey, MappingProxyType]] = {}
+        self.parsed = 0
+        self._real_paths: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(path: str) -> TemplateKey:
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def get(self, source_file: str) -> MappingProxyType:
+        """
+        :param source_file: The path of the template file.
+        :return: The frozen properties of the template, parsed again only if the file changed since the last parse.
+        """
+        path = self._real_paths.get(source_file)
+        if path is None:
+            path = self._real_paths.setdefault(source_file, os.path.realpath(source_file))
+        key = self._key(path)
+        entry = self.entries.get(path)
+        if entry is not None and entry[0] == key:
+            return entry[1]
+        props = freeze(parse_template(path))
+        with self._lock:
+            self.entries[path] = (key, props)
+            self.parsed += 1
+        return props
+
+    def get_mutable(self, source_file: str) -> dict:
+        """
+        :param source_file: The path of the template file.
+        :return: A mutable copy of the properties of the template, that the caller is free to complete.
+        """
+        return thaw(self.get(source_file))
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+
+    def warm(self, directories: Iterable[str] = TEMPLATES_DIRECTORIES):
+        """
+        Parses all the templates of the given directories that are not up to date in the registry.
+        """
+        for directory in directories:
+            if not os.path.isdir(directory):
+                continue
+            for file_name in sorted(os.listdir(directory)):
+                if file_name.endswith(".json") or file_name.endswith(".py"):
+                    try:
+                        self.get(os.path.join(directory, file_name))
+                    except (IndexError, ValueError):
+                        # python files without properties are not templates
+                        continue
+
+    def save(self, cache_file: str = DEFAULT_CACHE_FILE):
+        """
+        Writes the registry to an on-disk cache. The file is replaced atomically so that concurrent readers never see
+        a partially written cache.
+        """
+        with self._lock:
+            data = (CACHE_FORMAT_VERSION,
+                    {path: (key, thaw(props)) for path, (key, props) in self.entries.items()})
+        os.makedirs(os.path.dirname(os.path.abspath(cache_file)), exist_ok=True)
+        temporary_file = f"{cache_file}.{os.getpid()}.tmp"
+        with open(temporary_file, "wb") as file:
+            marshal.dump(data, file)
+        os.replace(temporary_file, cache_file)
+
+    def load(self, cache_file: str = DEFAULT_CACHE_FILE) -> bool:
+        """
+        Loads the entries of an on-disk cache. Entries of files that changed since the cache was written are kept but
+        never returned, as their key does not match the file anymore.
+
+        :return: True if the cache was loaded, False if it is missing or unreadable.
+        """
+        try:
+            with open(cache_file, "rb") as file:
+                version, entries = marshal.load(file)
+        except (OSError, EOFError, ValueError, TypeError):
+            return False
+        if version != CACHE_FORMAT_VERSION:
+            return False
+        with self._lock:
+            for path, (key, props) in entries.items():
+                self.entries.setdefault(path, (tuple(key), freeze(props)))
+        return True
+
+    def warm_from_cache(self, cache_file: str = DEFAULT_CACHE_FILE,
+                        directories: Iterable[str] = TEMPLATES_DIRECTORIES):
+        """
+        Loads the on-disk cache, parses the templates that are missing or outdated, and writes the cache back if
+        anything had to be parsed. Meant to be called once when a worker process starts.
+        """
+        self.load(cache_file)
+        parsed = self.parsed
+        self.warm(directories)
+        if self.parsed != parsed or not os.path.exists(cache_file):
+            self.save(cache_file)
+
+
+template_registry = TemplateRegistry()
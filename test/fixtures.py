@@ -0,0 +1,259 @@
+from Base.Network import Layer, LayerModel, Variable, Network
+from Base.modelskeleton import ModelSkeleton
+from Base.modeltemplate import ModelTemplate
+
+import copy
+import importlib
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+
+"""
+Skeletons, networks and templates shared by the test modules.
+"""
+
+LINEAR_PROPS = {
+    "name": "Linear",
+    "source": "basic_templates",
+    "variables": {"X": {"dim": 1, "IO": "in"}, "Y": {"dim": 1, "IO": "out"}},
+    "parameters": {"input_dim": {"type": "int", "default": 4}, "output_dim": {"type": "int", "default": 4}},
+    "constraints": [["equality", ["input_dim", "_X_0"]], ["equality", ["output_dim", "_Y_0"]]],
+}
+ADD_PROPS = {
+    "name": "Add",
+    "source": "basic_templates",
+    "variables": {"X1": {"dim": 1, "IO": "in"}, "X2": {"dim": 1, "IO": "in"}, "Y": {"dim": 1, "IO": "out"}},
+    "parameters": {},
+    "constraints": [["equality", ["_X1_0", "_X2_0", "_Y_0"]]],
+}
+CONCAT_PROPS = {
+    "name": "Concat",
+    "source": "templates",
+    "variables": {"X1": {"dim": 1, "IO": "in"}, "X2": {"dim": 1, "IO": "in"}, "Y": {"dim": 1, "IO": "out"}},
+    "parameters": {},
+    "constraints": [["symbolic", [["_Y_0", "_X1_0", "_X2_0"], "$0 = $1 + $2 "]]],
+}
+HEADS_PROPS = {
+    "name": "Heads",
+    "source": "templates",
+    "variables": {"X": {"dim": 1, "IO": "in"}, "Y": {"dim": 1, "IO": "out"}},
+    "parameters": {
+        "input_dim": {"type": "int"},
+        "output_dim": {"type": "int", "constrained": True},
+        "heads": {"type": "int", "default": 2},
+    },
+    "constraints": [
+        ["equality", ["input_dim", "_X_0"]],
+        ["equality", ["output_dim", "_Y_0"]],
+        ["symbolic", [["output_dim", "input_dim", "heads"], "$0 = $1 * $2 "]],
+    ],
+}
+
+
+def make_template(props):
+    template = ModelTemplate(props["name"], props["source"])
+    template.properties = copy.deepcopy(props)
+    return template
+
+
+def random_run(rng, skeleton):
+    model_id = rng.choice(list(skeleton.submodels))
+    n_runs = len(skeleton.runs)
+    inputs = {}
+    for variable, variable_props in skeleton.submodels[model_id].properties["variables"].items():
+        if variable_props["IO"] == "in":
+            source = rng.randrange(-1, n_runs) if n_runs else -1
+            inputs[variable] = [source, "x"] if source == -1 else [source, "Y"]
+    return {"id": model_id, "inputs": inputs}
+
+
+def random_skeleton(rng, n_runs):
+    submodels = {}
+    for i in range(max(2, n_runs // 4)):
+        submodels[f"linear{i}"] = make_template(LINEAR_PROPS)
+    for i in range(2):
+        submodels[f"add{i}"] = make_template(ADD_PROPS)
+        submodels[f"concat{i}"] = make_template(CONCAT_PROPS)
+        submodels[f"heads{i}"] = make_template(HEADS_PROPS)
+    skeleton = ModelSkeleton(submodels, [], {})
+    # the first run takes the input so that every skeleton has one
+    skeleton.add_run({"id": "linear0", "inputs": {"X": [-1, "x"]}})
+    while len(skeleton.runs) < n_runs:
+        skeleton.add_run(random_run(rng, skeleton))
+    skeleton.outputs = {"y": [len(skeleton.runs) - 1, "Y"]}
+    skeleton.remove_unused_submodels()
+    skeleton.inputs = skeleton.find_inputs()
+    return skeleton
+
+
+def fresh_copy(skeleton):
+    """
+    :return: A copy of the skeleton with its own templates, as rebuilt by another part of the search.
+    """
+    submodels = {name: make_template(template.properties) for name, template in skeleton.submodels.items()}
+    return ModelSkeleton(submodels, copy.deepcopy(skeleton.runs), copy.deepcopy(skeleton.outputs))
+
+
+def random_dag_skeleton(rng, n_runs):
+    """
+    Builds a skeleton whose runs form a random DAG, stored in a random order (runs may use the outputs of runs stored
+    after them).
+    """
+    order = list(range(n_runs))
+    rng.shuffle(order)
+    runs = [None] * n_runs
+    for position, run_id in enumerate(order):
+        inputs = {}
+        for variable in range(rng.randint(1, 3)):
+            source = order[rng.randrange(position)] if position and rng.random() < 0.9 else -1
+            inputs[f"X{variable}"] = [source, "x" if source == -1 else "Y"]
+        runs[run_id] = {"id": f"model{run_id % 5}", "inputs": inputs}
+    outputs = {"y": [order[-1], "Y"]}
+    return ModelSkeleton({f"model{i}": None for i in range(5)}, runs, outputs, inputs=["x"])
+
+
+def build_diamonds_network(n_diamonds):
+    """
+    Builds a network made of a chain of diamonds: each diamond splits its input in two linear layers
+    and sums them back with an add layer.
+    """
+    input_variables = [Variable.Variable("input", 1, "out", float, instantiable=False)]
+    input_model = LayerModel.InputModel("input", input_variables)
+    input_layer = Layer.Layer(input_model, "input_layer")
+    output_variables = [Variable.Variable("output", 1, "in", float)]
+    output_model = LayerModel.OutputModel("output", output_variables)
+    output_layer = Layer.Layer(output_model, "output_layer")
+
+    linear_model = LayerModel.TemplatedModel("linear", "src/basic_templates/Linear.json")
+    add_model = LayerModel.TemplatedModel("add", "src/basic_templates/Add.json")
+
+    layers = [input_layer]
+    previous_layer, previous_variable = input_layer, "input"
+    for i in range(n_diamonds):
+        left = Layer.Layer(linear_model, f"left_{i}")
+        right = Layer.Layer(linear_model, f"right_{i}")
+        add = Layer.Layer(add_model, f"add_{i}")
+        Layer.LayerIOLink(previous_layer, previous_variable, left, "X").make_link()
+        Layer.LayerIOLink(previous_layer, previous_variable, right, "X").make_link()
+        Layer.LayerIOLink(left, "Y", add, "X1").make_link()
+        Layer.LayerIOLink(right, "Y", add, "X2").make_link()
+        layers += [left, right, add]
+        previous_layer, previous_variable = add, "Y"
+    Layer.LayerIOLink(previous_layer, previous_variable, output_layer, "output").make_link()
+    layers.append(output_layer)
+
+    network = Network.Network(
+        [input_model, linear_model, add_model, output_model],
+        layers,
+        input_layer,
+        output_layer,
+    )
+    return network, layers
+
+
+# templates importable by the generated models, written to a temporary package
+TEMPLATES_PACKAGE = "author_test_templates"
+TEMPLATES_SOURCES = {
+    "Linear": """import torch
+class Linear(torch.nn.Module):
+    def __init__(self, input_dim, output_dim, device='cpu', dtype=torch.float32):
+        super().__init__()
+        self.linear = torch.nn.Linear(input_dim, output_dim, device=device, dtype=dtype)
+    def forward(self, X):
+        return {"Y": self.linear(X["X"])}
+""",
+    "Add": """import torch
+class Add(torch.nn.Module):
+    def __init__(self, device='cpu', dtype=torch.float32):
+        super().__init__()
+    def forward(self, X):
+        return {"Y": X["X1"] + X["X2"]}
+""",
+}
+
+
+class TemplatesPackage:
+    """
+    The test templates written to a temporary package, importable by the generated models between install and remove.
+    Each test module that loads models owns its instance, installed by its setUpModule.
+    """
+    def __init__(self):
+        self.directory = None
+
+    @property
+    def path(self):
+        return self.directory.name
+
+    def install(self):
+        self.directory = tempfile.TemporaryDirectory()
+        package = os.path.join(self.path, TEMPLATES_PACKAGE)
+        os.mkdir(package)
+        open(os.path.join(package, "__init__.py"), "w").close()
+        for name, source in TEMPLATES_SOURCES.items():
+            with open(os.path.join(package, name + ".py"), "w") as file:
+                file.write(source)
+        sys.path.insert(0, self.path)
+        importlib.invalidate_caches()
+
+    def remove(self):
+        sys.path.remove(self.path)
+        # the modules imported from the directory must not outlive it
+        for name in list(sys.modules):
+            if name == TEMPLATES_PACKAGE or name.startswith(TEMPLATES_PACKAGE + "."):
+                del sys.modules[name]
+        self.directory.cleanup()
+        self.directory = None
+
+
+def residual_skeleton(n_blocks):
+    """
+    :return: A skeleton of n_blocks residual blocks (y = x + linear(x)), built from the test templates.
+    """
+    submodels = {}
+    runs = []
+    previous = [-1, "x"]
+    for i in range(n_blocks):
+        submodels[f"linear{i}"] = make_template(dict(copy.deepcopy(LINEAR_PROPS), source=TEMPLATES_PACKAGE))
+        submodels[f"add{i}"] = make_template(dict(copy.deepcopy(ADD_PROPS), source=TEMPLATES_PACKAGE))
+        runs.append({"id": f"linear{i}", "inputs": {"X": list(previous)}})
+        runs.append({"id": f"add{i}", "inputs": {"X1": list(previous), "X2": [len(runs) - 1, "Y"]}})
+        previous = [len(runs) - 1, "Y"]
+    return ModelSkeleton(submodels, runs, {"y": previous}, inputs=["x"])
+
+
+def random_residual_skeleton(rng, n_runs):
+    """
+    :return: A skeleton of linear and add runs taking random previous outputs, with one or two outputs.
+    """
+    submodels = {}
+    runs = []
+    for run_id in range(n_runs):
+        sources = [[-1, "x"]] + [[i, "Y"] for i in range(run_id)]
+        if run_id and rng.random() < 0.5:
+            submodels[f"add{run_id}"] = make_template(dict(copy.deepcopy(ADD_PROPS), source=TEMPLATES_PACKAGE))
+            runs.append({"id": f"add{run_id}", "inputs": {"X1": list(rng.choice(sources)),
+                                                         "X2": list(rng.choice(sources))}})
+        else:
+            submodels[f"linear{run_id}"] = make_template(dict(copy.deepcopy(LINEAR_PROPS), source=TEMPLATES_PACKAGE))
+            runs.append({"id": f"linear{run_id}", "inputs": {"X": list(rng.choice(sources))}})
+    outputs = {"y": [n_runs - 1, "Y"]}
+    if rng.random() < 0.5:
+        outputs["z"] = [rng.randrange(n_runs), "Y"]
+    skeleton = ModelSkeleton(submodels, runs, outputs, inputs=["x"])
+    skeleton.prune_unused()
+    return skeleton
+
+
+def parameters_count(model, skeleton):
+    return sum(parameter.numel() for parameter in model.parameters())
+
+
+def population(seed, size):
+    rng = random.Random(seed)
+    return [random_residual_skeleton(rng, rng.randint(1, 8)) for _ in range(size)]
+
+
+def fork_context():
+    return multiprocessing.get_context("fork")
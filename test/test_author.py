@@ -0,0 +1,177 @@
+from Base.author import Author, ModulesManifest, tensor_slots
+from Base.modelloader import ModelLoader
+
+import json
+import linecache
+import logging
+import multiprocessing
+import os
+import random
+import tempfile
+import unittest
+
+import torch
+
+from test.fixtures import TemplatesPackage, fresh_copy, random_residual_skeleton, random_skeleton, residual_skeleton
+
+templates = TemplatesPackage()
+
+
+def setUpModule():
+    templates.install()
+
+
+def tearDownModule():
+    templates.remove()
+
+
+def record_modules(save_dir, process_id, n_modules):
+    manifest = ModulesManifest(save_dir)
+    for i in range(n_modules):
+        manifest.record(f"skeleton_{process_id}_{i}", f"module_{process_id}_{i}", "hash")
+
+
+class TestAuthorOutput(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.save_dir = self.directory.name
+        logging.disable(logging.INFO)
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+        self.directory.cleanup()
+
+    def path(self, module_name):
+        return os.path.join(self.save_dir, module_name + ".py")
+
+    def test_generated_source(self):
+        author = Author("candidate", random_skeleton(random.Random(0), 10), save_dir=self.save_dir)
+        self.assertTrue(author.written)
+        self.assertEqual(author.module_name, "candidate")
+        with open(self.path("candidate")) as file:
+            compile(file.read(), self.path("candidate"), "exec")
+        self.assertEqual(sorted(os.listdir(self.save_dir)), ["candidate.py", "models_manifest.json"])
+
+    def test_props_round_trip(self):
+        author = Author("candidate", random_skeleton(random.Random(6), 10), export=False)
+        source = author.generate()
+        self.assertEqual(source, "".join(line + "\n" for line in author.full_model()))
+        props = source[source.index("BEGIN_PROPS") + len("BEGIN_PROPS"):source.index("END_PROPS")]
+        self.assertEqual(json.loads(props), json.loads(json.dumps(author.props)))
+
+    def test_unchanged_source_is_not_rewritten(self):
+        skeleton = random_skeleton(random.Random(1), 10)
+        Author("candidate", fresh_copy(skeleton), save_dir=self.save_dir)
+        stat = os.stat(self.path("candidate"))
+        author = Author("candidate", fresh_copy(skeleton), save_dir=self.save_dir, reuse_modules=False)
+        self.assertFalse(author.written)
+        self.assertEqual(os.stat(self.path("candidate")).st_mtime_ns, stat.st_mtime_ns)
+
+    def test_identical_skeletons_share_a_module(self):
+        skeleton = random_skeleton(random.Random(2), 10)
+        first = Author("first", fresh_copy(skeleton), save_dir=self.save_dir)
+        second = Author("second", fresh_copy(skeleton), save_dir=self.save_dir)
+        self.assertEqual(second.module_name, "first")
+        self.assertFalse(second.written)
+        self.assertFalse(os.path.exists(self.path("second")))
+
+        other = Author("other", random_skeleton(random.Random(3), 10), save_dir=self.save_dir)
+        self.assertEqual(other.module_name, "other")
+        self.assertEqual(ModulesManifest(self.save_dir).skeletons,
+                         {first.skeleton_key: "first", other.skeleton_key: "other"})
+
+    def test_overwritten_module_leaves_the_manifest(self):
+        first = Author("candidate", random_skeleton(random.Random(4), 10), save_dir=self.save_dir)
+        second = Author("candidate", random_skeleton(random.Random(5), 12), save_dir=self.save_dir)
+        self.assertTrue(second.written)
+        manifest = ModulesManifest(self.save_dir)
+        self.assertNotIn(first.skeleton_key, manifest.skeletons)
+        self.assertEqual(manifest.modules, {"candidate": second.content_hash})
+
+        os.remove(self.path("candidate"))
+        third = Author("again", random_skeleton(random.Random(5), 12), save_dir=self.save_dir)
+        self.assertEqual(third.module_name, "again")
+        self.assertTrue(third.written)
+
+    def test_module_replaced_before_its_record(self):
+        skeleton = random_skeleton(random.Random(6), 10)
+        first = Author("candidate", fresh_copy(skeleton), save_dir=self.save_dir)
+        # another process writes another model in the module and has not recorded it yet
+        other = Author("candidate", random_skeleton(random.Random(7), 12), export=False)
+        with open(self.path("candidate"), "w") as file:
+            file.write(other.generate())
+        self.assertIsNone(ModulesManifest(self.save_dir).get_module(first.skeleton_key))
+        second = Author("second", fresh_copy(skeleton), save_dir=self.save_dir)
+        self.assertEqual(second.module_name, "second")
+        self.assertTrue(second.written)
+
+    @unittest.skipUnless("fork" in multiprocessing.get_all_start_methods(), "fork start method not available")
+    def test_manifest_shared_by_processes(self):
+        context = multiprocessing.get_context("fork")
+        processes = [context.Process(target=record_modules, args=(self.save_dir, process_id, 50))
+                     for process_id in range(4)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        self.assertEqual([process.exitcode for process in processes], [0] * 4)
+        # no update is lost
+        self.assertEqual(len(ModulesManifest(self.save_dir).skeletons), 200)
+
+    def test_in_memory(self):
+        author = Author("in_memory", residual_skeleton(3), save_dir=self.save_dir, export=False)
+        self.assertEqual(os.listdir(self.save_dir), [])
+        loader = ModelLoader()
+        model_class = author.load(loader)
+        self.assertEqual(model_class.__name__, "in_memory")
+        self.assertEqual(os.listdir(self.save_dir), [])
+
+        model = loader.new("generated", "in_memory", {}, reload=True)
+        self.assertIsInstance(model, torch.nn.Module)
+        x = torch.randn(2, 4)
+        self.assertEqual(model({"x": x})["y"].shape, (2, 4))
+
+        # the module written on export is the one loaded in memory
+        author.export()
+        with open(self.path("in_memory")) as file:
+            self.assertEqual(file.read(), author.source)
+
+    def test_unregistered_module_leaves_linecache(self):
+        loader = ModelLoader()
+        Author("released", residual_skeleton(1), export=False).load(loader)
+        module = loader.models_modules["generated"]["released"]
+        self.assertIn(module.__file__, linecache.cache)
+        # registered twice, the lines are kept until the last registration is dropped
+        loader.register_module("other", "released", module)
+        loader.unregister_module("generated", "released")
+        self.assertIn(module.__file__, linecache.cache)
+        loader.unregister_module("other", "released")
+        self.assertNotIn(module.__file__, linecache.cache)
+
+    def test_forward_slots(self):
+        rng = random.Random(7)
+        loader = ModelLoader()
+        for i in range(10):
+            skeleton = random_residual_skeleton(rng, rng.randint(1, 15))
+            dicts = Author(f"dicts{i}", fresh_copy(skeleton), export=False).load(loader)()
+            slots = Author(f"slots{i}", fresh_copy(skeleton), export=False, forward_slots=True).load(loader)()
+            slots.load_state_dict(dicts.state_dict())
+            x = torch.randn(3, 4)
+            expected = dicts({"x": x})
+            result = slots({"x": x})
+            self.assertEqual(result.keys(), expected.keys())
+            for name in expected:
+                self.assertTrue(torch.equal(result[name], expected[name]))
+
+    def test_tensor_slots(self):
+        skeleton = residual_skeleton(50)
+        skeleton.reorder_runs()
+        slots, released, n_slots = tensor_slots(skeleton)
+        # the input of a block and the output of its linear run
+        self.assertEqual(n_slots, 2)
+        self.assertEqual(released[3], [1])
+        self.assertEqual(slots[(len(skeleton.runs) - 1, "Y")], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+from Base.Base import Hashable, WORKER_ID_SHIFT, remapped_ids
+from Base.Network.Parameter import Parameter
+
+import multiprocessing
+import os
+import pickle
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from test.fixtures import build_diamonds_network
+
+
+def allocate_ids(n):
+    return [Hashable().hash for _ in range(n)]
+
+
+def send_ids(queue, n):
+    queue.put(allocate_ids(n))
+
+
+def process_namespace(_):
+    return Hashable.get_namespace(Hashable().hash)
+
+
+class TestHashableIds(unittest.TestCase):
+    def tearDown(self):
+        Hashable.set_namespace(0)
+
+    def test_unique_across_threads(self):
+        with ThreadPoolExecutor(8) as executor:
+            batches = list(executor.map(allocate_ids, [20_000] * 8))
+        ids = [hash_value for batch in batches for hash_value in batch]
+        self.assertEqual(len(set(ids)), len(ids))
+
+    def test_namespaces(self):
+        Hashable.set_namespace(3)
+        first = Hashable()
+        self.assertEqual(Hashable.get_namespace(first.hash), 3)
+        self.assertGreaterEqual(first.hash, 3 << WORKER_ID_SHIFT)
+        Hashable.set_namespace(0)
+        self.assertEqual(Hashable.get_namespace(Hashable().hash), 0)
+        # going back to a namespace resumes its ids
+        Hashable.set_namespace(3)
+        self.assertEqual(Hashable().hash, first.hash + 1)
+        with self.assertRaises(ValueError):
+            Hashable.set_namespace(-1)
+
+    @unittest.skipUnless("fork" in multiprocessing.get_all_start_methods(), "fork start method not available")
+    def test_unique_across_forked_processes(self):
+        context = multiprocessing.get_context("fork")
+        with context.Pool(2) as pool:
+            batches = pool.map(allocate_ids, [1000, 1000, 1000])
+        ids = [hash_value for batch in batches for hash_value in batch] + allocate_ids(1000)
+        self.assertEqual(len(set(ids)), len(ids))
+
+    def test_unique_across_spawned_processes(self):
+        for start_method in ("spawn", "forkserver"):
+            if start_method not in multiprocessing.get_all_start_methods():
+                continue
+            with self.subTest(start_method=start_method):
+                context = multiprocessing.get_context(start_method)
+                # the module is imported while the process object is unpickled, before the bootstrap of the process
+                queue = context.Queue()
+                process = context.Process(target=send_ids, args=(queue, 1000))
+                process.start()
+                ids = queue.get(timeout=60)
+                process.join()
+                self.assertEqual(len({Hashable.get_namespace(hash_value) for hash_value in ids}), 1)
+                self.assertNotEqual(Hashable.get_namespace(ids[0]), 0)
+                # the module is imported by the task, after the bootstrap of the process
+                with context.Pool(1) as pool:
+                    ids += pool.apply(allocate_ids, (1000,))
+                ids += allocate_ids(1000)
+                self.assertEqual(len(set(ids)), len(ids))
+
+    def test_replaced_workers(self):
+        # every task runs in a new worker: the replacement workers may reuse the pids of the retired ones, but never
+        # their namespaces
+        for start_method in ("fork", "spawn"):
+            if start_method not in multiprocessing.get_all_start_methods():
+                continue
+            with self.subTest(start_method=start_method):
+                context = multiprocessing.get_context(start_method)
+                with context.Pool(2, maxtasksperchild=1) as pool:
+                    namespaces = pool.map(process_namespace, range(6), chunksize=1)
+                self.assertEqual(len(set(namespaces)), len(namespaces))
+                self.assertNotIn(0, namespaces)
+
+    def test_equality(self):
+        parameter = Parameter("p", int)
+        self.assertNotEqual(parameter, None)
+        self.assertNotEqual(parameter, parameter.hash)
+        self.assertEqual(parameter, parameter)
+
+
+class TestRemappedIds(unittest.TestCase):
+    def test_network_round_trip(self):
+        network, layers = build_diamonds_network(3)
+        data = pickle.dumps((network, layers))
+
+        with remapped_ids() as mapping:
+            new_network, new_layers = pickle.loads(data)
+        old_ids = {layer.hash for layer in layers}
+        self.assertTrue(old_ids.isdisjoint(layer.hash for layer in new_layers))
+        self.assertEqual([mapping[layer.hash] for layer in layers], [layer.hash for layer in new_layers])
+
+        # containers keyed by the remapped objects are consistent
+        self.assertTrue(new_layers[-1].is_following_from(new_layers[0]))
+        self.assertEqual(list(new_network.layers_heights.values()), list(network.layers_heights.values()))
+        left = new_layers[1]
+        self.assertIs(left.model.named_variables["X"].instances[left].hooks[0], left)
+        self.assertEqual(set(new_layers[3].get_input_layers()), {new_layers[1], new_layers[2]})
+
+    def test_without_remapping(self):
+        parameter = Parameter("p", int)
+        copy = pickle.loads(pickle.dumps(parameter))
+        self.assertEqual(copy.hash, parameter.hash)
+        self.assertEqual(copy.name, "p")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+from Base.evaluationengine import EvaluationEngine
+
+import logging
+import multiprocessing
+import os
+import signal
+import time
+import unittest
+
+from test.fixtures import TemplatesPackage, fork_context, fresh_copy, parameters_count, population, residual_skeleton
+
+templates = TemplatesPackage()
+
+
+def setUpModule():
+    templates.install()
+
+
+def tearDownModule():
+    templates.remove()
+
+
+def slow_score(model, skeleton):
+    if len(skeleton.runs) > 2:
+        time.sleep(10)
+    return len(skeleton.runs)
+
+
+def crashing_score(model, skeleton):
+    if len(skeleton.runs) > 2:
+        os._exit(1)
+    return len(skeleton.runs)
+
+
+def stuck_score(model, skeleton):
+    if len(skeleton.runs) > 2:
+        # the deadline cannot interrupt the worker, as in native code
+        signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGALRM})
+        time.sleep(30)
+    return len(skeleton.runs)
+
+
+@unittest.skipUnless("fork" in multiprocessing.get_all_start_methods(), "fork start method not available")
+class TestEvaluationEngine(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.INFO)
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+
+    def test_workers_match_current_process(self):
+        skeletons = population(0, 12)
+        with EvaluationEngine(0, score=parameters_count) as engine:
+            expected = engine.evaluate([fresh_copy(skeleton) for skeleton in skeletons])
+        with EvaluationEngine(2, score=parameters_count, chunk_size=5, mp_context=fork_context(),
+                              sys_paths=[templates.path]) as engine:
+            streamed = list(engine.submit([fresh_copy(skeleton) for skeleton in skeletons]))
+            # the workers are kept for the next populations
+            results = engine.evaluate([fresh_copy(skeleton) for skeleton in skeletons], names=[
+                f"model_{i}" for i in range(len(skeletons))])
+        self.assertEqual(sorted(result.index for result in streamed), list(range(len(skeletons))))
+        self.assertEqual([result.error for result in results], [None] * len(skeletons))
+        self.assertEqual([result.score for result in results], [result.score for result in expected])
+        self.assertEqual(results[3].name, "model_3")
+        # linear runs have 4 * 4 weights and 4 biases
+        for result, skeleton in zip(results, skeletons):
+            n_linear = sum(run["id"].startswith("linear") for run in skeleton.runs)
+            self.assertEqual(result.score, 20 * n_linear)
+
+    def test_failures(self):
+        skeletons = [residual_skeleton(1), residual_skeleton(2)]
+        broken = residual_skeleton(1)
+        broken.submodels["linear0"].source = "missing_templates"
+        with EvaluationEngine(1, score=slow_score, timeout=0.5, mp_context=fork_context(),
+                              sys_paths=[templates.path]) as engine:
+            start = time.perf_counter()
+            results = engine.evaluate(skeletons + [broken])
+            self.assertLess(time.perf_counter() - start, 5)
+        self.assertEqual(results[0].score, 2)
+        self.assertIsNone(results[0].error)
+        self.assertTrue(results[1].error.startswith("TimeoutError"))
+        self.assertTrue(results[2].error.startswith("ModuleNotFoundError"))
+
+    def test_crashing_candidate(self):
+        skeletons = [residual_skeleton(1), residual_skeleton(2), residual_skeleton(1), residual_skeleton(1)]
+        with EvaluationEngine(2, score=crashing_score, chunk_size=2, mp_context=fork_context(),
+                              sys_paths=[templates.path]) as engine:
+            results = engine.evaluate(skeletons)
+            # the pool was replaced, the engine is still usable
+            again = engine.evaluate(skeletons[:1])
+        self.assertTrue(results[1].error.startswith("BrokenProcessPool"))
+        for result in results[:1] + results[2:] + again:
+            self.assertIsNone(result.error)
+            self.assertEqual(result.score, 2)
+
+    @unittest.skipUnless(hasattr(signal, "pthread_sigmask"), "signals can not be blocked")
+    def test_stuck_candidate(self):
+        skeletons = [residual_skeleton(1), residual_skeleton(2), residual_skeleton(1)]
+        with EvaluationEngine(2, score=stuck_score, chunk_size=2, timeout=0.5, mp_context=fork_context(),
+                              sys_paths=[templates.path]) as engine:
+            start = time.perf_counter()
+            results = engine.evaluate(skeletons)
+            self.assertLess(time.perf_counter() - start, 15)
+            again = engine.evaluate(skeletons[:1])
+        self.assertTrue(results[1].error.startswith("TimeoutError"))
+        for result in results[:1] + results[2:] + again:
+            self.assertIsNone(result.error)
+            self.assertEqual(result.score, 2)
+
+    def test_arguments(self):
+        with self.assertRaises(ValueError):
+            EvaluationEngine(0, chunk_size=0)
+        with self.assertRaises(ValueError):
+            EvaluationEngine(0).submit([residual_skeleton(1)], names=[])
+
+
+if __name__ == "__main__":
+    unittest.main()
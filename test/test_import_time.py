@@ -0,0 +1,56 @@
+# load test libraries
+import os
+import subprocess
+import sys
+import unittest
+
+SOURCE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+# cumulative import time allowed for each module, in microseconds. Importing sympy alone takes several hundred
+# milliseconds and torch several seconds, so any of them being imported eagerly exceeds the budget.
+IMPORT_TIME_BUDGET_US = 150_000
+HEAVY_MODULES = ["sympy", "torch", "numpy"]
+
+
+def import_in_fresh_interpreter(module):
+    """
+    Imports a module in a new interpreter with -X importtime.
+
+    Returns the cumulative import time of the module in microseconds and the heavy modules that got imported.
+    """
+    code = f"import sys, {module}; print(' '.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=SOURCE_DIR,
+        env=dict(os.environ, PYTHONPATH=SOURCE_DIR),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    cumulative = None
+    for line in result.stderr.splitlines():
+        fields = line.split("|")
+        if len(fields) == 3 and fields[2].strip() == module:
+            cumulative = int(fields[1])
+    return cumulative, result.stdout.split()
+
+
+class TestImportTime(unittest.TestCase):
+    def check_module(self, module):
+        cumulative, heavy_modules = import_in_fresh_interpreter(module)
+        self.assertEqual(heavy_modules, [], f"{module} imports {heavy_modules} eagerly")
+        self.assertIsNotNone(cumulative)
+        self.assertLess(cumulative, IMPORT_TIME_BUDGET_US, f"{module} takes {cumulative / 1000:.1f}ms to import")
+
+    def test_modelskeleton(self):
+        self.check_module("Base.modelskeleton")
+
+    def test_network(self):
+        self.check_module("Base.Network.Network")
+
+    def test_modelproperties(self):
+        self.check_module("Base.modelproperties")
+
+
+if __name__ == "__main__":
+    unittest.main()
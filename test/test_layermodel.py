@@ -0,0 +1,80 @@
+from Base.Network.Layer import Layer, LayerIOLink
+from Base.Network.LayerModel import TemplatedModel
+
+import json
+import os
+import tempfile
+import unittest
+
+LINEAR_TEMPLATE = "src/basic_templates/Linear.json"
+
+
+def describe(model):
+    return (
+        [(v.name, v.dimension, v.variable_io, len(v.global_parameters)) for v in model.input_variables],
+        [(v.name, v.dimension, v.variable_io, len(v.global_parameters)) for v in model.output_variables],
+        [(p.name, p.parameter_type) for p in model.parameters],
+        sorted(model.named_variables),
+        sorted(model.named_parameters),
+    )
+
+
+class TestTemplatedModelPrototype(unittest.TestCase):
+    def tearDown(self):
+        TemplatedModel.use_prototypes = True
+
+    def test_same_structure_as_built_model(self):
+        TemplatedModel.use_prototypes = False
+        built = TemplatedModel("built", LINEAR_TEMPLATE)
+        TemplatedModel.use_prototypes = True
+        TemplatedModel("first", LINEAR_TEMPLATE)
+        copied = TemplatedModel("copied", LINEAR_TEMPLATE)
+        self.assertEqual(describe(copied), describe(built))
+        self.assertEqual(copied.template_name, "Linear")
+
+    def test_copies_have_their_own_identity(self):
+        first = TemplatedModel("first", LINEAR_TEMPLATE)
+        second = TemplatedModel("second", LINEAR_TEMPLATE)
+        self.assertNotEqual(first.hash, second.hash)
+        first_x, second_x = first.named_variables["X"], second.named_variables["X"]
+        self.assertIsNot(first_x, second_x)
+        self.assertNotEqual(first_x.hash, second_x.hash)
+        self.assertIs(first_x, first.input_variables[0])
+        self.assertIs(first_x.attached_model, first)
+        self.assertIs(second_x.attached_model, second)
+        self.assertIs(first_x.global_parameters[0].parent, first_x)
+        for parameter in second.parameters:
+            self.assertIs(parameter.parent, second)
+        self.assertTrue(set(first.parameters).isdisjoint(second.parameters))
+
+    def test_layers_and_links(self):
+        first = TemplatedModel("first", LINEAR_TEMPLATE)
+        second = TemplatedModel("second", LINEAR_TEMPLATE)
+        first_layer, second_layer = Layer(first), Layer(second)
+        LayerIOLink(first_layer, "Y", second_layer, "X").make_link()
+        self.assertEqual(second_layer.get_input_layers(), [first_layer])
+        self.assertIn(first_layer, first.named_variables["Y"].instances)
+        # the prototype is never attached
+        prototype = TemplatedModel._prototypes[(TemplatedModel, LINEAR_TEMPLATE)]
+        self.assertEqual(prototype.attached_layers, [])
+        self.assertEqual(prototype.named_variables["Y"].instances, {})
+
+    def test_prototype_follows_template_changes(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "Model.json")
+            props = {"name": "Model", "source": "", "parameters": {},
+                     "variables": {"X": {"dim": 1, "IO": "in"}}}
+            with open(path, "w") as file:
+                json.dump(props, file)
+            self.assertEqual(sorted(TemplatedModel("first", path).named_variables), ["X"])
+            self.assertEqual(sorted(TemplatedModel("second", path).named_variables), ["X"])
+
+            props["variables"]["Y"] = {"dim": 2, "IO": "out"}
+            with open(path, "w") as file:
+                json.dump(props, file)
+            self.assertEqual(sorted(TemplatedModel("third", path).named_variables), ["X", "Y"])
+            self.assertEqual(TemplatedModel("fourth", path).named_variables["Y"].dimension, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+from Base.linearconstraints import InconsistentSystem, LinearExpression, parse_linear_equation, \
+    solve_linear_constraints
+
+# load test libraries
+import random
+import unittest
+from fractions import Fraction
+
+from sympy import Eq, solve, sympify
+
+
+class TestParseLinearEquation(unittest.TestCase):
+    def test_parse(self):
+        self.assertEqual(parse_linear_equation("a = b * 4 "), LinearExpression({"a": 1, "b": -4}))
+        self.assertEqual(parse_linear_equation("a = (b + c) / 2 - 3 "),
+                         LinearExpression({"a": 1, "b": Fraction(-1, 2), "c": Fraction(-1, 2)}, 3))
+        self.assertEqual(parse_linear_equation("2 * -a = 2 ** 3 * b "), LinearExpression({"a": -2, "b": -8}))
+        self.assertIsNone(parse_linear_equation("a < b "))
+
+    def test_non_linear(self):
+        for formula in ["a = b * c ", "a = b / c ", "a = b ** 2 ", "a = ceiling(b) "]:
+            self.assertIsNone(solve_linear_constraints([formula]), formula)
+
+
+class TestSolveLinearConstraints(unittest.TestCase):
+    def test_pivots(self):
+        solution = solve_linear_constraints(["out = in * 4 ", "a = b + c "])
+        self.assertEqual(solution, {"out": LinearExpression({"in": 4}), "a": LinearExpression({"b": 1, "c": 1})})
+
+        solution = solve_linear_constraints(["out = in * 4 "], constrained_params=["in"])
+        self.assertEqual(solution, {"in": LinearExpression({"out": Fraction(1, 4)})})
+
+    def test_inconsistent(self):
+        with self.assertRaises(InconsistentSystem):
+            solve_linear_constraints(["a = b + 1 ", "a = b "])
+
+    def test_random_systems(self):
+        rng = random.Random(0)
+        names = [f"model{i}__param" for i in range(8)]
+        for _ in range(30):
+            formulas = []
+            for _ in range(rng.randrange(1, 7)):
+                terms = [f"{rng.randint(-3, 3)} * {rng.choice(names)}" for _ in range(rng.randrange(1, 4))]
+                formulas.append(f"{rng.choice(names)} = {' + '.join(terms)} + {rng.randint(-5, 5)} ")
+            sympy_solutions = solve([Eq(*map(sympify, formula.split(" = "))) for formula in formulas], dict=True)
+            if sympy_solutions == []:
+                with self.assertRaises(InconsistentSystem):
+                    solve_linear_constraints(formulas)
+                continue
+            solution = solve_linear_constraints(formulas)
+            if not solution:
+                continue
+            # same number of degrees of freedom as sympy, and every equation holds identically
+            self.assertEqual(len(solution), len(sympy_solutions[0]))
+            for param in solution:
+                self.assertFalse(set(solution[param].coefficients) & set(solution))
+            for formula in formulas:
+                self.assertTrue(parse_linear_equation(formula).substitute(solution).is_constant())
+                self.assertEqual(parse_linear_equation(formula).substitute(solution).constant, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,218 @@
+from Base.modelskeleton import ModelSkeleton
+from Base.modelproperties import ModelParameters, Subsets
+from Base.linearconstraints import InconsistentSystem, LinearExpression
+from Base.parameterscache import ParametersCache
+
+# load test libraries
+import copy
+import random
+import tempfile
+import unittest
+
+from sympy import Symbol
+
+from test.fixtures import (CONCAT_PROPS, HEADS_PROPS, LINEAR_PROPS, fresh_copy, make_template, random_run,
+                           random_skeleton)
+
+def mutate(rng, skeleton):
+    child = ModelSkeleton(dict(skeleton.submodels), copy.deepcopy(skeleton.runs), copy.deepcopy(skeleton.outputs))
+    if rng.random() < 0.5 or len(child.runs) < 3:
+        child.outputs["y"][0] = child.add_run(random_run(rng, child))
+    else:
+        # delete a run that is not used by any other run nor as output
+        used = {source for run in child.runs for source, _ in run["inputs"].values()}
+        used.update(output[0] for output in child.outputs.values())
+        candidates = [i for i in range(1, len(child.runs)) if i not in used]
+        if candidates:
+            child.del_run(rng.choice(candidates))
+    child.inputs = child.find_inputs()
+    return child
+
+
+def canonical_solution(parameters):
+    """
+    Returns the partition of the parameters and the symbolic solution expressed with a canonical representative
+    (the smallest name) of each equivalence class.
+    """
+    subset = parameters.param_subset
+    canonical = {ref: min(subset.get_equivalence_class(ref)) for ref in subset.reduced_list}
+    partition = {frozenset(subset.get_equivalence_class(ref)) for ref in subset.reduced_list}
+    renaming = {Symbol(ref): Symbol(name) for ref, name in canonical.items()}
+    constrained = {}
+    for param, expression in parameters.sympy_data["constrained"].items():
+        if isinstance(expression, LinearExpression):
+            expression = expression.to_sympy()
+        constrained[canonical[param]] = expression.subs(renaming)
+    free = {canonical[param] for param in parameters.sympy_data["free"]}
+    return partition, constrained, free
+
+
+class TestSubsets(unittest.TestCase):
+    def test_merge(self):
+        subsets = Subsets(range(10))
+        for i in range(0, 8, 2):
+            subsets.merge(i, i + 2)
+        subsets.merge(1, 3)
+
+        self.assertEqual(subsets.get_equivalence_class(4), {0, 2, 4, 6, 8})
+        self.assertEqual(subsets.get_equivalence_class(3), {1, 3})
+        self.assertEqual(len({subsets[i] for i in (0, 2, 4, 6, 8)}), 1)
+        self.assertEqual(len(subsets.reduced_list), 5)
+        self.assertEqual({subsets[i] for i in range(10)}, subsets.reduced_list)
+
+        # merging inside a class changes nothing
+        subsets.merge(0, 8)
+        self.assertEqual(len(subsets.reduced_list), 5)
+        with self.assertRaises(ValueError):
+            subsets.merge(0, 10)
+        with self.assertRaises(KeyError):
+            subsets[10]
+
+    def test_matches_naive_classes(self):
+        rng = random.Random(0)
+        n = 500
+        subsets = Subsets(range(n))
+        naive = {i: {i} for i in range(n)}
+        for _ in range(400):
+            a, b = rng.randrange(n), rng.randrange(n)
+            subsets.merge(a, b)
+            union = naive[a] | naive[b]
+            for el in union:
+                naive[el] = union
+            # classes are cached and must follow the merges
+            self.assertEqual(subsets.get_equivalence_class(a), naive[a])
+        for i in range(n):
+            self.assertEqual(subsets.get_equivalence_class(i), naive[i])
+            self.assertIn(subsets[i], naive[i])
+        self.assertEqual(len(subsets.reduced_list), len({id(c) for c in naive.values()}))
+
+    def test_copy_split_discard(self):
+        subsets = Subsets(["a", "b", "c", "d"])
+        subsets.merge("a", "b")
+        subsets.merge("b", "c")
+        copy_subsets = subsets.copy()
+
+        subsets.split(["a"])
+        self.assertEqual(subsets.reduced_list, {"a", "b", "c", "d"})
+        self.assertEqual(copy_subsets.get_equivalence_class("c"), {"a", "b", "c"})
+
+        copy_subsets.discard("b")
+        self.assertNotIn("b", copy_subsets)
+        self.assertEqual(set(copy_subsets), {"a", "c", "d"})
+        self.assertEqual(copy_subsets.get_equivalence_class("a"), {"a"})
+        copy_subsets.check_extend(["b", "e"])
+        copy_subsets.merge("e", "a")
+        self.assertEqual(copy_subsets.get_equivalence_class("e"), {"a", "e"})
+        self.assertEqual(copy_subsets.reduced_list, {copy_subsets["a"], "b", "c", "d"})
+
+
+class TestModelParameters(unittest.TestCase):
+    def test_symbolic_solution(self):
+        submodels = {"linear": make_template(LINEAR_PROPS), "heads": make_template(HEADS_PROPS)}
+        runs = [{"id": "linear", "inputs": {"X": [-1, "x"]}}, {"id": "heads", "inputs": {"X": [0, "Y"]}}]
+        parameters = ModelParameters(ModelSkeleton(submodels, runs, {"y": [1, "Y"]}))
+
+        self.assertEqual(parameters.get_global_parameter("heads", "input_dim"),
+                         parameters.get_global_parameter("linear", "output_dim"))
+        output_dim = parameters.get_global_parameter("heads", "output_dim")
+        heads = Symbol(parameters.get_global_parameter("heads", "heads"))
+        input_dim = Symbol(parameters.get_global_parameter("heads", "input_dim"))
+        self.assertEqual(parameters.sympy_data["constrained"][output_dim], heads * input_dim)
+        self.assertNotIn(output_dim, parameters.sympy_data["free"])
+        # the number of heads is a parameter, the constraint is not linear
+        self.assertEqual(parameters.sympy_data["paths"], {"linear": 0, "sympy": 1})
+
+    def test_linear_solution(self):
+        submodels = {"linear1": make_template(LINEAR_PROPS), "linear2": make_template(LINEAR_PROPS),
+                     "concat": make_template(CONCAT_PROPS)}
+        runs = [{"id": "linear1", "inputs": {"X": [-1, "x"]}}, {"id": "linear2", "inputs": {"X": [-1, "x"]}},
+                {"id": "concat", "inputs": {"X1": [0, "Y"], "X2": [1, "Y"]}}]
+        parameters = ModelParameters(ModelSkeleton(submodels, runs, {"y": [2, "Y"]}))
+
+        self.assertEqual(parameters.sympy_data["paths"], {"linear": 1, "sympy": 0})
+        concat_output = parameters.get_global_parameter("concat", "_Y_0")
+        output_1 = parameters.get_global_parameter("linear1", "output_dim")
+        output_2 = parameters.get_global_parameter("linear2", "output_dim")
+        self.assertEqual(parameters.sympy_data["constrained"][concat_output],
+                         LinearExpression({output_1: 1, output_2: 1}))
+
+    def test_inconsistent_constraints(self):
+        # the contradiction is not left to sympy, which would solve the component with no constraint
+        with self.assertRaises(InconsistentSystem):
+            ModelParameters._solve_symbolic_component(["a = b + 1 ", "a = b "], ())
+
+
+class TestIncrementalModelParameters(unittest.TestCase):
+    def test_matches_full_solve(self):
+        rng = random.Random(0)
+        for _ in range(3):
+            parent_skeleton = random_skeleton(rng, 12)
+            parent = ModelParameters(parent_skeleton)
+            for _ in range(5):
+                child_skeleton = mutate(rng, parent_skeleton)
+                child = ModelParameters(child_skeleton, parent=parent)
+                self.assertEqual(canonical_solution(child), canonical_solution(ModelParameters(child_skeleton)))
+                parent_skeleton, parent = child_skeleton, child
+
+    def test_reuses_parent_state(self):
+        rng = random.Random(1)
+        skeleton = random_skeleton(rng, 10)
+        parent = ModelParameters(skeleton)
+        child_skeleton = ModelSkeleton(dict(skeleton.submodels), copy.deepcopy(skeleton.runs),
+                                       copy.deepcopy(skeleton.outputs))
+        child = ModelParameters(child_skeleton, parent=parent)
+
+        for origin, constraints in child._constraints_origins.items():
+            self.assertIs(constraints, parent._constraints_origins[origin])
+        self.assertEqual(child._symbolic_solutions.keys(), parent._symbolic_solutions.keys())
+        for key, solution in child._symbolic_solutions.items():
+            self.assertIs(solution, parent._symbolic_solutions[key])
+
+
+class TestParametersCache(unittest.TestCase):
+    def test_hit(self):
+        rng = random.Random(2)
+        cache = ParametersCache()
+        skeleton = random_skeleton(rng, 12)
+        first = ModelParameters(fresh_copy(skeleton), cache=cache)
+        second = ModelParameters(fresh_copy(skeleton), cache=cache)
+        self.assertEqual(cache.stats(), {"size": 1, "hits": 1, "disk_hits": 0, "misses": 1, "evictions": 0})
+        self.assertIs(second.sympy_data, first.sympy_data)
+        self.assertEqual(canonical_solution(second), canonical_solution(ModelParameters(fresh_copy(skeleton))))
+        self.assertEqual(second.get_high_order_props(), first.get_high_order_props())
+
+    def test_miss_on_change(self):
+        rng = random.Random(3)
+        cache = ParametersCache()
+        skeleton = random_skeleton(rng, 12)
+        ModelParameters(fresh_copy(skeleton), cache=cache)
+        ModelParameters(mutate(rng, fresh_copy(skeleton)), cache=cache)
+        changed_template = fresh_copy(skeleton)
+        changed_template.submodels["linear0"].properties["parameters"]["input_dim"]["default"] = 7
+        ModelParameters(changed_template, cache=cache)
+        self.assertEqual(cache.misses, 3)
+        self.assertEqual(cache.hits, 0)
+
+    def test_eviction(self):
+        rng = random.Random(4)
+        cache = ParametersCache(max_size=2)
+        skeletons = [random_skeleton(rng, 6) for _ in range(3)]
+        for skeleton in skeletons:
+            ModelParameters(fresh_copy(skeleton), cache=cache)
+        self.assertEqual((len(cache), cache.evictions), (2, 1))
+        ModelParameters(fresh_copy(skeletons[0]), cache=cache)
+        self.assertEqual(cache.misses, 4)
+
+    def test_directory(self):
+        rng = random.Random(5)
+        skeleton = random_skeleton(rng, 12)
+        with tempfile.TemporaryDirectory() as directory:
+            expected = ModelParameters(fresh_copy(skeleton), cache=ParametersCache(directory=directory))
+            cache = ParametersCache(directory=directory)
+            parameters = ModelParameters(fresh_copy(skeleton), cache=cache)
+            self.assertEqual(cache.disk_hits, 1)
+            self.assertEqual(canonical_solution(parameters), canonical_solution(expected))
+
+
+if __name__ == "__main__":
+    unittest.main()
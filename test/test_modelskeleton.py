@@ -0,0 +1,254 @@
+from Base.modelskeleton import ModelSkeleton
+
+import copy
+import random
+import time
+import unittest
+
+from test.fixtures import random_dag_skeleton
+
+
+def naive_parents(skeleton, run_id):
+    parents = set()
+    stack = [run_id]
+    while stack:
+        current = stack.pop()
+        if current == -1:
+            continue
+        for source, _ in skeleton.runs[current]["inputs"].values():
+            if source not in parents:
+                parents.add(source)
+                stack.append(source)
+    return parents
+
+
+def naive_direct_children(skeleton, run_id):
+    return sorted({index for index, run in enumerate(skeleton.runs)
+                   for source, _ in run["inputs"].values() if source == run_id})
+
+
+class TestModelSkeletonIndexes(unittest.TestCase):
+    def check_indexes(self, skeleton):
+        n_runs = len(skeleton.runs)
+        parents = {run_id: naive_parents(skeleton, run_id) for run_id in range(n_runs)}
+        outputs = {output[0] for output in skeleton.outputs.values()}
+        for run_id in range(n_runs):
+            self.assertEqual(set(skeleton.get_parents(run_id)), parents[run_id])
+            self.assertEqual(sorted(skeleton.get_direct_parents(run_id)),
+                             sorted({source for source, _ in skeleton.runs[run_id]["inputs"].values()}))
+            self.assertEqual(skeleton.get_direct_children(run_id), naive_direct_children(skeleton, run_id))
+            self.assertEqual(set(skeleton.get_children(run_id)),
+                             {child for child in range(n_runs) if run_id in parents[child]})
+            self.assertEqual(skeleton.is_connected_to_input(run_id), -1 in parents[run_id])
+            self.assertEqual(skeleton.is_connected_to_output(run_id),
+                             any(run_id == output or run_id in parents[output] for output in outputs))
+            for other in range(-1, n_runs):
+                self.assertEqual(skeleton.is_parent(other, run_id), other in parents[run_id])
+        self.assertEqual(skeleton.get_direct_children(-1), naive_direct_children(skeleton, -1))
+
+    def test_random_dags(self):
+        rng = random.Random(0)
+        for _ in range(20):
+            self.check_indexes(random_dag_skeleton(rng, rng.randint(1, 40)))
+
+    def test_mutations(self):
+        rng = random.Random(1)
+        skeleton = random_dag_skeleton(rng, 30)
+        self.check_indexes(skeleton)
+        for _ in range(10):
+            run_id = skeleton.add_run({"id": "model0",
+                                       "inputs": {"X": [rng.randrange(-1, len(skeleton.runs)), "Y"]}})
+            skeleton.outputs["y"][0] = run_id
+        self.check_indexes(skeleton)
+        skeleton.reorder_runs(list(reversed(range(len(skeleton.runs)))))
+        self.check_indexes(skeleton)
+        skeleton.del_run(skeleton.get_unused_runs()[0] if skeleton.get_unused_runs() else 0)
+        self.check_indexes(skeleton)
+        skeleton.runs = [{"id": "model0", "inputs": {"X": [-1, "x"]}}, {"id": "model1", "inputs": {"X": [0, "Y"]}}]
+        skeleton.outputs["y"][0] = 1
+        self.check_indexes(skeleton)
+
+    def test_in_place_edit(self):
+        skeleton = ModelSkeleton({"model": None}, [{"id": "model", "inputs": {"X": [-1, "x"]}},
+                                                   {"id": "model", "inputs": {"X": [-1, "x"]}}], {"y": [1, "Y"]})
+        self.assertFalse(skeleton.is_parent(0, 1))
+        skeleton.runs[1]["inputs"]["X"] = [0, "Y"]
+        skeleton.invalidate_indexes()
+        self.assertTrue(skeleton.is_parent(0, 1))
+        self.assertTrue(skeleton.is_connected_to_output(0))
+
+    def test_cycle(self):
+        skeleton = ModelSkeleton({"model": None}, [{"id": "model", "inputs": {"X": [1, "Y"]}},
+                                                   {"id": "model", "inputs": {"X": [0, "Y"]}}], {"y": [1, "Y"]},
+                                 inputs=[])
+        self.assertEqual(skeleton.get_direct_parents(0), [1])
+        with self.assertRaises(Exception):
+            skeleton.is_parent(0, 1)
+        skeleton.add_run({"id": "model", "inputs": {"X": [2, "Y"]}})
+        with self.assertRaises(Exception):
+            skeleton.get_parents(2)
+
+
+class TestModelSkeletonDeletion(unittest.TestCase):
+    def assert_same_skeleton(self, skeleton, expected):
+        self.assertEqual(skeleton.runs, expected.runs)
+        self.assertEqual(skeleton.outputs, expected.outputs)
+        self.assertEqual(list(skeleton.submodels), list(expected.submodels))
+
+    def test_del_runs_matches_del_run(self):
+        # property: deleting any set of runs at once is the same as deleting them one by one
+        rng = random.Random(2)
+        for _ in range(200):
+            skeleton = random_dag_skeleton(rng, rng.randint(1, 30))
+            skeleton.submodels["unused"] = None
+            indices = rng.sample(range(len(skeleton.runs)), rng.randint(0, len(skeleton.runs)))
+            expected = copy.deepcopy(skeleton)
+            for index in sorted(indices, reverse=True):
+                expected.del_run(index)
+            runs = skeleton.runs
+            skeleton.del_runs(indices + indices[:1])
+            self.assertIs(skeleton.runs, runs)
+            self.assert_same_skeleton(skeleton, expected)
+
+    def test_prune_unused(self):
+        rng = random.Random(3)
+        for _ in range(50):
+            skeleton = random_dag_skeleton(rng, rng.randint(1, 30))
+            expected = copy.deepcopy(skeleton)
+            for index in sorted(expected.get_unused_runs(), reverse=True):
+                expected.del_run(index)
+            unused = skeleton.get_unused_runs()
+            self.assertEqual(skeleton.prune_unused(), unused)
+            self.assert_same_skeleton(skeleton, expected)
+            self.assertEqual(skeleton.get_unused_runs(), [])
+            self.check_connected(skeleton)
+
+    def check_connected(self, skeleton):
+        for run_id in range(len(skeleton.runs)):
+            self.assertTrue(skeleton.is_connected_to_output(run_id))
+
+    def test_out_of_range(self):
+        skeleton = random_dag_skeleton(random.Random(4), 5)
+        with self.assertRaises(IndexError):
+            skeleton.del_runs([5])
+        with self.assertRaises(IndexError):
+            skeleton.del_runs([-1])
+
+
+def reference_heights(skeleton):
+    """
+    The recursive computation of the heights that ModelSkeleton used before, exponential on diamonds.
+    """
+    runs_size = len(skeleton.runs)
+    heights = [-1 for i in range(runs_size)]
+
+    def set_height(run_id, height):
+        if run_id == -1:
+            return
+        if height > heights[run_id]:
+            heights[run_id] = height
+            for input_var in skeleton.runs[run_id]["inputs"]:
+                set_height(skeleton.runs[run_id]["inputs"][input_var][0], height + 1)
+
+    for output in skeleton.outputs:
+        set_height(skeleton.outputs[output][0], 0)
+    return heights
+
+
+def diamonds_skeleton(n_diamonds):
+    runs = [{"id": "linear", "inputs": {"X": [-1, "x"]}}]
+    for i in range(n_diamonds):
+        top = len(runs) - 1
+        runs.append({"id": "linear", "inputs": {"X": [top, "Y"]}})
+        runs.append({"id": "linear", "inputs": {"X": [top, "Y"]}})
+        runs.append({"id": "add", "inputs": {"X1": [top + 1, "Y"], "X2": [top + 2, "Y"]}})
+    return ModelSkeleton({"linear": None, "add": None}, runs, {"y": [len(runs) - 1, "Y"]}, inputs=["x"])
+
+
+class TestModelSkeletonHeights(unittest.TestCase):
+    def test_random_dags(self):
+        rng = random.Random(5)
+        for _ in range(100):
+            skeleton = random_dag_skeleton(rng, rng.randint(1, 40))
+            if rng.random() < 0.5:
+                skeleton.outputs["z"] = [rng.randrange(len(skeleton.runs)), "Y"]
+            heights = reference_heights(skeleton)
+            self.assertEqual(skeleton.get_runs_heights(), heights)
+            self.assertEqual(skeleton.get_unused_runs(), [i for i, h in enumerate(heights) if h == -1])
+            order = skeleton.find_runs_order()
+            self.assertEqual(order, sorted((i for i, h in enumerate(heights) if h != -1),
+                                           key=lambda i: (-heights[i], i)))
+
+            skeleton.reorder_runs()
+            self.assertEqual(skeleton.get_runs_heights(), reference_heights(skeleton))
+            self.assertEqual(skeleton.find_runs_order(), list(range(len(skeleton.runs))))
+            for run_id, run in enumerate(skeleton.runs):
+                self.assertTrue(all(source < run_id for source, _ in run["inputs"].values()))
+
+    def test_large_diamonds(self):
+        skeleton = diamonds_skeleton(2000)
+        start = time.perf_counter()
+        heights = skeleton.get_runs_heights()
+        self.assertLess(time.perf_counter() - start, 1.0)
+        self.assertEqual(heights[0], 4000)
+        self.assertEqual(heights[-1], 0)
+        self.assertEqual(skeleton.find_runs_order(), list(range(len(skeleton.runs))))
+
+    def test_cache_invalidation(self):
+        skeleton = diamonds_skeleton(3)
+        self.assertEqual(skeleton.get_unused_runs(), [])
+        skeleton.outputs["y"][0] = 3
+        self.assertEqual(skeleton.get_unused_runs(), [4, 5, 6, 7, 8, 9])
+        skeleton.add_run({"id": "linear", "inputs": {"X": [9, "Y"]}})
+        skeleton.outputs["y"][0] = 10
+        self.assertEqual(skeleton.get_unused_runs(), [])
+        self.assertEqual(skeleton.get_runs_heights()[0], 7)
+        skeleton.add_run({"id": "linear", "inputs": {"X": [10, "Y"]}})
+        self.assertEqual(skeleton.get_unused_runs(), [11])
+        self.assertEqual(len(skeleton.get_runs_heights()), 12)
+
+    def test_cycle(self):
+        skeleton = ModelSkeleton({"model": None}, [{"id": "model", "inputs": {"X": [1, "Y"]}},
+                                                   {"id": "model", "inputs": {"X": [0, "Y"]}}], {"y": [1, "Y"]},
+                                 inputs=[])
+        with self.assertRaises(Exception):
+            skeleton.get_runs_heights()
+
+
+def reference_reorder_runs(skeleton, new_order):
+    """
+    The reordering of the runs that ModelSkeleton used before, rewriting the references in the new order of the runs.
+    """
+    inverter = [-1 for i in range(len(skeleton.runs))]
+    for index, value in enumerate(new_order):
+        inverter[value] = index
+    skeleton.runs = [skeleton.runs[i] for i in new_order]
+    for run in skeleton.runs:
+        for input_var in run["inputs"]:
+            if run["inputs"][input_var][0] != -1:
+                run["inputs"][input_var][0] = inverter[run["inputs"][input_var][0]]
+    for output in skeleton.outputs:
+        skeleton.outputs[output][0] = inverter[skeleton.outputs[output][0]]
+    skeleton.invalidate_indexes()
+
+
+class TestModelSkeletonReorder(unittest.TestCase):
+    def test_random_dags(self):
+        rng = random.Random(6)
+        for _ in range(100):
+            skeleton = random_dag_skeleton(rng, rng.randint(1, 40))
+            n_runs = len(skeleton.runs)
+            # the default order, a permutation and a partial order dropping runs
+            orders = [None, rng.sample(range(n_runs), n_runs), rng.sample(range(n_runs), rng.randint(1, n_runs))]
+            for new_order in orders:
+                expected = copy.deepcopy(skeleton)
+                reference_reorder_runs(expected, expected.find_runs_order() if new_order is None else new_order)
+                reordered = copy.deepcopy(skeleton)
+                reordered.reorder_runs(new_order)
+                self.assertEqual(reordered.runs, expected.runs)
+                self.assertEqual(reordered.outputs, expected.outputs)
+                self.assertEqual(reordered.get_runs_heights(), expected.get_runs_heights())
+
+
+if __name__ == "__main__":
+    unittest.main()
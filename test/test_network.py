@@ -4,6 +4,8 @@ from Base.Network import Layer, LayerModel, ModelTemplate, Variable, Network
 import unittest
 from pathlib import Path
 
+from test.fixtures import build_diamonds_network
+
 
 class TestIONetwork(unittest.TestCase):
     def test_init(self):
@@ -138,5 +140,115 @@ class TestMultipleLinearNetwork(unittest.TestCase):
             print(f"{name}: {height}")
 
 
+class TestNetworkReachability(unittest.TestCase):
+    def test_diamonds(self):
+        # exponential number of paths, must be handled without walking each of them
+        network, layers = build_diamonds_network(60)
+        input_layer, output_layer = layers[0], layers[-1]
+
+        self.assertTrue(output_layer.is_following_from(input_layer))
+        self.assertTrue(input_layer.is_followed_by(output_layer))
+        self.assertFalse(input_layer.is_following_from(output_layer))
+        self.assertFalse(layers[1].is_following_from(layers[2]))
+        self.assertEqual(set(output_layer.get_all_previous_layers()), set(layers[:-1]))
+        self.assertEqual(set(layers[3].get_all_previous_layers()), {input_layer, layers[1], layers[2]})
+
+    def test_matches_walk_without_network(self):
+        network, layers = build_diamonds_network(3)
+        for layer in layers:
+            with_network = set(layer.get_all_previous_layers())
+            layer.network = None
+            self.assertEqual(with_network, set(layer.get_all_previous_layers()))
+            layer.network = network
+
+    def test_cycle_detection(self):
+        network, layers = build_diamonds_network(2)
+        # link the last add back to the first linear layer of the chain
+        network.add_layers_link(Layer.LayerIOLink(layers[6], "Y", layers[1], "X"))
+        with self.assertRaises(Exception):
+            network.check_network()
+
+    def test_incremental_updates(self):
+        network, layers = build_diamonds_network(2)
+        linear_model = layers[1].get_model()
+
+        extra_layer = Layer.Layer(linear_model, "extra")
+        network.add_layer(extra_layer)
+        self.assertFalse(extra_layer.is_following_from(layers[0]))
+
+        network.add_layers_link(Layer.LayerIOLink(layers[3], "Y", extra_layer, "X"))
+        self.assertTrue(extra_layer.is_following_from(layers[0]))
+        self.assertTrue(extra_layer.is_following_from(layers[3]))
+        self.assertFalse(extra_layer.is_following_from(layers[4]))
+
+        network.remove_layer(layers[2])
+        self.assertFalse(layers[3].is_following_from(layers[2]))
+        self.assertTrue(layers[3].is_following_from(layers[1]))
+        self.assertTrue(extra_layer.is_following_from(layers[0]))
+
+
+class TestNetworkHeights(unittest.TestCase):
+    def test_diamonds_heights(self):
+        n_diamonds = 1500
+        network, layers = build_diamonds_network(n_diamonds)
+        heights = network.layers_heights
+
+        self.assertEqual(heights[layers[-1]], 0)
+        self.assertEqual(heights[layers[0]], 2 * n_diamonds + 1)
+        for i in range(n_diamonds):
+            left, right, add = layers[3 * i + 1: 3 * i + 4]
+            self.assertEqual(heights[add], 2 * (n_diamonds - i) - 1)
+            self.assertEqual(heights[left], heights[add] + 1)
+            self.assertEqual(heights[right], heights[add] + 1)
+
+        orders = network.layers_orders
+        self.assertEqual(orders[0], layers[0])
+        self.assertEqual(orders[-1], layers[-1])
+        positions = {layer: i for i, layer in enumerate(orders)}
+        for layer in layers:
+            for input_layer in layer.get_input_layers():
+                self.assertLess(positions[input_layer], positions[layer])
+
+    def test_cache_invalidation(self):
+        network, layers = build_diamonds_network(2)
+        self.assertEqual(set(network.used_layers), set(layers))
+        self.assertEqual(network.unused_layers, [])
+
+        dangling_layer = Layer.Layer(layers[1].get_model(), "dangling")
+        network.add_layer(dangling_layer)
+        network.add_layers_link(Layer.LayerIOLink(layers[0], "input", dangling_layer, "X"))
+        self.assertEqual(network.layers_heights[dangling_layer], -1)
+        self.assertEqual(network.unused_layers, [dangling_layer])
+        self.assertNotIn(dangling_layer, network.layers_orders)
+
+        network.remove_ghost_layers()
+        self.assertNotIn(dangling_layer, network.layers)
+        self.assertEqual(set(network.used_layers), set(layers))
+        self.assertEqual(network.layers_heights[layers[0]], 5)
+
+
+class TestCompactObjects(unittest.TestCase):
+    def test_slots(self):
+        network, layers = build_diamonds_network(2)
+        variable = layers[1].model.named_variables["X"]
+        for obj in [layers[1], variable, variable.instances[layers[1]], variable.global_parameters[0]]:
+            self.assertFalse(hasattr(obj, "__dict__"), obj.__class__.__name__)
+
+    def test_lazy_containers(self):
+        variable = Variable.Variable("v", 2, "in", float)
+        self.assertIsNone(variable._instances)
+        self.assertIsNone(variable._linked_variables)
+        self.assertIsNone(variable.global_parameters[0]._listeners)
+        instance = variable.make_new_instance(variable.global_parameters[0])
+        self.assertIsNone(instance._linked_instances)
+        self.assertIsNone(instance._instance_parameters)
+        self.assertEqual(instance.linked_instances, set())
+        self.assertEqual(variable.global_parameters[1].listeners, [])
+
+        other = Variable.Variable("w", 1, "out", float, linked_variables={variable})
+        self.assertEqual(other.linked_variables, {variable})
+        self.assertEqual(variable.linked_variables, {other})
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,123 @@
+from Base.modelloader import ModelLoader
+from Base.populationauthor import PopulationAuthor
+
+import copy
+import linecache
+import logging
+import os
+import random
+import tempfile
+import unittest
+
+import torch
+
+from test.fixtures import (ADD_PROPS, LINEAR_PROPS, TEMPLATES_PACKAGE, TemplatesPackage, fresh_copy, make_template,
+                           random_residual_skeleton, residual_skeleton)
+
+templates = TemplatesPackage()
+
+
+def setUpModule():
+    templates.install()
+
+
+def tearDownModule():
+    templates.remove()
+
+
+def with_tail(skeleton, tail):
+    """
+    :return: A copy of the skeleton whose output goes through the given runs ('linear' or 'add' of the output with
+    itself) before being returned.
+    """
+    child = fresh_copy(skeleton)
+    child.inputs = list(skeleton.inputs)
+    for i, kind in enumerate(tail):
+        previous = list(child.outputs["y"])
+        model_id = f"tail_{kind}{i}"
+        if kind == "linear":
+            child.submodels[model_id] = make_template(dict(copy.deepcopy(LINEAR_PROPS), source=TEMPLATES_PACKAGE))
+            inputs = {"X": previous}
+        else:
+            child.submodels[model_id] = make_template(dict(copy.deepcopy(ADD_PROPS), source=TEMPLATES_PACKAGE))
+            inputs = {"X1": previous, "X2": list(previous)}
+        child.outputs["y"] = [child.add_run({"id": model_id, "inputs": inputs}), "Y"]
+    return child
+
+
+class TestPopulationAuthor(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.INFO)
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+
+    def check_population(self, author):
+        loader = ModelLoader()
+        population = author.load(loader)()
+        x = torch.randn(3, 4)
+        results = population({"x": x})
+        self.assertEqual(len(results), len(author.authors))
+        for candidate, result in enumerate(results):
+            # a candidate with the submodels of the population computes the same outputs
+            model = loader.new("generated", author.authors[candidate].model_name, {})
+            for model_id, attribute in author.submodels_attributes(candidate).items():
+                getattr(model, f"model_{model_id}").load_state_dict(getattr(population, attribute).state_dict())
+            expected = model({"x": x})
+            self.assertEqual(result.keys(), expected.keys())
+            for name in expected:
+                self.assertTrue(torch.allclose(result[name], expected[name]))
+
+    def test_shared_prefix(self):
+        base = residual_skeleton(3)
+        tails = [[], ["linear"], ["add"], ["linear", "add"], ["linear", "linear"]]
+        author = PopulationAuthor("population", [with_tail(base, tail) for tail in tails], export=False)
+        # the 6 runs of the base are run once, the tails fork after them (the two tails starting with a linear run
+        # share it)
+        self.assertEqual(len(author.nodes), 6 + 4)
+        self.assertEqual(author.paths[3][:7], author.paths[4][:7])
+        self.assertNotEqual(author.paths[3][7], author.paths[4][7])
+        self.check_population(author)
+
+    def test_random_population(self):
+        rng = random.Random(0)
+        skeletons = [random_residual_skeleton(rng, rng.randint(1, 10)) for _ in range(8)]
+        skeletons += [fresh_copy(skeletons[0]), fresh_copy(skeletons[1])]
+        for skeleton in skeletons[-2:]:
+            skeleton.inputs = ["x"]
+        author = PopulationAuthor("random_population", skeletons, forward_slots=True, export=False)
+        n_runs = sum(len(skeleton.runs) for skeleton in skeletons)
+        self.assertLessEqual(len(author.nodes), n_runs - len(skeletons[0].runs) - len(skeletons[1].runs))
+        self.assertEqual(author.paths[-2], author.paths[0])
+        self.check_population(author)
+
+    def test_export(self):
+        with tempfile.TemporaryDirectory() as save_dir:
+            author = PopulationAuthor("exported", [residual_skeleton(2), residual_skeleton(3)], save_dir=save_dir)
+            self.assertTrue(author.written)
+            with open(os.path.join(save_dir, "exported.py")) as file:
+                source = file.read()
+            self.assertEqual(source, author.source)
+            self.assertEqual(source.count("import torch"), 1)
+            self.assertEqual(os.listdir(save_dir), ["exported.py"])
+
+    def test_unregistered_module_leaves_linecache(self):
+        loader = ModelLoader()
+        author = PopulationAuthor("released_population", [residual_skeleton(1), residual_skeleton(2)], export=False)
+        author.load(loader)
+        filename = loader.models_modules["generated"]["released_population"].__file__
+        # the module is registered under the name of every candidate and of the population
+        for name in [candidate.model_name for candidate in author.authors] + ["released_population"]:
+            self.assertIn(filename, linecache.cache)
+            loader.unregister_module("generated", name)
+        self.assertNotIn(filename, linecache.cache)
+
+    def test_names(self):
+        with self.assertRaises(ValueError):
+            PopulationAuthor("population", [residual_skeleton(1)], model_names=["population"], export=False)
+        with self.assertRaises(ValueError):
+            PopulationAuthor("population", [residual_skeleton(1)] * 2, model_names=["a"], export=False)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,152 @@
+from Base.evaluationengine import EvaluationEngine
+from Base.populationstore import PopulationStore
+
+import logging
+import multiprocessing
+import random
+import unittest
+
+from test.fixtures import TemplatesPackage, fork_context, parameters_count, population, random_skeleton
+
+templates = TemplatesPackage()
+
+
+def setUpModule():
+    templates.install()
+
+
+def tearDownModule():
+    templates.remove()
+
+
+class TestPopulationStore(unittest.TestCase):
+    def setUp(self):
+        self.store = PopulationStore(8, 16384)
+
+    def tearDown(self):
+        self.store.close()
+        self.store.unlink()
+
+    def check_view(self, store, slot, skeleton):
+        # the view is released when the method returns
+        view = store.get(slot)
+        self.assertEqual(len(view.runs), len(skeleton.runs))
+        self.assertEqual(list(view.runs), skeleton.runs)
+        self.assertEqual(view.outputs, skeleton.outputs)
+        self.assertEqual(view.inputs, skeleton.inputs)
+        self.assertEqual(list(view.submodels), list(skeleton.submodels))
+        self.assertEqual(view.find_inputs(), skeleton.find_inputs())
+        self.assertEqual(view.get_runs_by_model(), skeleton.get_runs_by_model())
+        self.assertEqual(view.find_runs_order(), skeleton.find_runs_order())
+        for run_id in range(len(skeleton.runs)):
+            self.assertEqual(view.get_direct_children(run_id), skeleton.get_direct_children(run_id))
+            self.assertEqual(view.get_parents(run_id), skeleton.get_parents(run_id))
+        copy = view.to_skeleton()
+        self.assertEqual(copy.runs, skeleton.runs)
+        self.assertEqual(copy.submodels[skeleton.runs[0]["id"]]._props,
+                         skeleton.submodels[skeleton.runs[0]["id"]]._props)
+        return view.individual
+
+    def test_views(self):
+        rng = random.Random(0)
+        skeletons = [random_skeleton(rng, rng.randint(1, 40)) for _ in range(8)]
+        slots = [self.store.append(skeleton) for skeleton in skeletons]
+        self.assertEqual(slots, list(range(8)))
+        worker_store = PopulationStore.attach(self.store.name)
+        try:
+            self.assertTrue(worker_store.read_only)
+            for slot, skeleton in zip(slots, skeletons):
+                self.assertEqual(self.check_view(worker_store, slot, skeleton), slot)
+        finally:
+            worker_store.close()
+
+    def test_retire_and_append(self):
+        rng = random.Random(1)
+        for _ in range(8):
+            self.store.append(random_skeleton(rng, 10))
+        with self.assertRaises(ValueError):
+            self.store.append(random_skeleton(rng, 10))
+        self.store.retire(5)
+        self.store.retire(2)
+        self.assertEqual(len(self.store), 6)
+        self.assertEqual(self.store.individual(2), -1)
+        with self.assertRaises(ValueError):
+            self.store.get(2)
+        with self.assertRaises(ValueError):
+            self.store.retire(2)
+        child = random_skeleton(rng, 20)
+        # the children take the first free slots, with new individual ids
+        self.assertEqual(self.store.append(child), 2)
+        self.assertEqual(self.store.individual(2), 8)
+        self.assertEqual(self.check_view(self.store, 2, child), 8)
+        self.assertEqual(self.store.slots(), [0, 1, 2, 3, 4, 6, 7])
+
+    def test_read_only(self):
+        skeleton = random_skeleton(random.Random(2), 10)
+        self.store.append(skeleton)
+        worker_store = PopulationStore.attach(self.store.name)
+        try:
+            with self.assertRaises(PermissionError):
+                worker_store.append(skeleton)
+            with self.assertRaises(PermissionError):
+                worker_store.retire(0)
+            view = worker_store.get(0)
+            with self.assertRaises(TypeError):
+                view.reorder_runs()
+            with self.assertRaises(TypeError):
+                view.add_run({"id": "linear0", "inputs": {"X": [-1, "x"]}})
+            with self.assertRaises(TypeError):
+                view.record.strings.blob[0] = 0
+            del view
+        finally:
+            worker_store.close()
+
+    def test_slot_size(self):
+        small_store = PopulationStore(1, 64)
+        try:
+            with self.assertRaises(ValueError):
+                small_store.append(random_skeleton(random.Random(3), 10))
+        finally:
+            small_store.close()
+            small_store.unlink()
+
+
+@unittest.skipUnless("fork" in multiprocessing.get_all_start_methods(), "fork start method not available")
+class TestEvaluateStore(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.INFO)
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+
+    def test_workers_read_the_store(self):
+        skeletons = population(1, 6)
+        with PopulationStore(8, 16384) as store:
+            for skeleton in skeletons:
+                store.append(skeleton)
+            store.retire(4)
+            with EvaluationEngine(2, score=parameters_count, chunk_size=2, mp_context=fork_context(),
+                                  sys_paths=[templates.path]) as engine:
+                results = engine.evaluate_store(store)
+                expected = engine.evaluate(skeletons[:4] + skeletons[5:])
+        self.assertEqual([result.error for result in results], [None] * 5)
+        self.assertEqual([result.score for result in results], [result.score for result in expected])
+
+    def test_retired_individual(self):
+        skeletons = population(2, 2)
+        with PopulationStore(2, 16384) as store:
+            for skeleton in skeletons:
+                store.append(skeleton)
+            with EvaluationEngine(0, score=parameters_count) as engine:
+                # the candidates are evaluated as the results are read: the slot 1 holds another individual by then
+                results = engine.submit_store(store, [0, 1], names=["first", "second"])
+                store.retire(1)
+                store.append(skeletons[0])
+                results = list(results)
+        self.assertIsNone(results[0].error)
+        self.assertEqual(results[1].name, "second")
+        self.assertTrue(results[1].error.startswith("ValueError"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+from Base.author import Author
+from Base.runtable import RunTable, reorder_tables
+
+import copy
+import logging
+import random
+import unittest
+
+from test.fixtures import (TemplatesPackage, fresh_copy, random_dag_skeleton, random_run, random_skeleton,
+                           residual_skeleton)
+
+templates = TemplatesPackage()
+
+
+def setUpModule():
+    templates.install()
+
+
+def tearDownModule():
+    templates.remove()
+
+
+def skeleton_with_unused_runs(rng, n_runs):
+    skeleton = random_skeleton(rng, n_runs)
+    # runs added after the outputs are set are not used by them
+    for _ in range(rng.randint(0, 3)):
+        skeleton.add_run(random_run(rng, skeleton))
+    return skeleton
+
+
+def removable_runs(rng, skeleton):
+    """
+    :return: Random runs that can be deleted without leaving references to deleted runs.
+    """
+    output_runs = {run_id for run_id, _ in skeleton.outputs.values()}
+    deleted = set()
+    for run_id in reversed(range(len(skeleton.runs))):
+        if (run_id not in output_runs and set(skeleton.get_direct_children(run_id)) <= deleted
+                and rng.random() < 0.5):
+            deleted.add(run_id)
+    return sorted(deleted)
+
+
+class TestRunTable(unittest.TestCase):
+    def assertSameRuns(self, table, skeleton):
+        self.assertEqual(list(table.runs), skeleton.runs)
+        self.assertEqual(table.outputs, skeleton.outputs)
+        self.assertEqual(list(table.submodels), list(skeleton.submodels))
+
+    def test_queries(self):
+        rng = random.Random(0)
+        for _ in range(30):
+            skeleton = skeleton_with_unused_runs(rng, rng.randint(1, 50))
+            table = RunTable.from_skeleton(skeleton)
+            self.assertSameRuns(table, skeleton)
+            self.assertEqual(table.find_inputs(), skeleton.find_inputs())
+            self.assertEqual(table.find_models_variables_connected_to_input("x"),
+                             skeleton.find_models_variables_connected_to_input("x"))
+            self.assertEqual(table.get_runs_by_model(), skeleton.get_runs_by_model())
+            self.assertEqual(table.get_runs_heights(), skeleton.get_runs_heights())
+            self.assertEqual(table.get_unused_runs(), skeleton.get_unused_runs())
+            self.assertEqual(table.find_runs_order(), skeleton.find_runs_order())
+            for run_id in range(-1, len(skeleton.runs)):
+                self.assertEqual(table.get_direct_children(run_id), skeleton.get_direct_children(run_id))
+                self.assertEqual(table.get_direct_parents(run_id), skeleton.get_direct_parents(run_id))
+
+    def test_mutations(self):
+        rng = random.Random(1)
+        for _ in range(30):
+            skeleton = skeleton_with_unused_runs(rng, rng.randint(2, 50))
+            table = RunTable.from_skeleton(skeleton)
+            new_order = list(range(len(skeleton.runs)))
+            rng.shuffle(new_order)
+            skeleton.reorder_runs(new_order)
+            table.reorder_runs(new_order)
+            self.assertSameRuns(table, skeleton)
+            deleted = removable_runs(rng, skeleton)
+            skeleton.del_runs(deleted)
+            table.del_runs(deleted)
+            self.assertSameRuns(table, skeleton)
+            self.assertEqual(table.prune_unused(), skeleton.prune_unused())
+            skeleton.reorder_runs()
+            table.reorder_runs()
+            self.assertSameRuns(table, skeleton)
+            self.assertEqual(table.to_skeleton().runs, skeleton.runs)
+        with self.assertRaises(IndexError):
+            table.del_run(len(skeleton.runs))
+
+    def test_batch_reorder(self):
+        rng = random.Random(2)
+        skeletons = [random_dag_skeleton(rng, rng.randint(1, 40)) for _ in range(20)]
+        for default_order in (True, False):
+            tables = [RunTable.from_skeleton(skeleton) for skeleton in skeletons]
+            expected = [copy.deepcopy(skeleton) for skeleton in skeletons]
+            if default_order:
+                new_orders = None
+                for skeleton in expected:
+                    skeleton.reorder_runs()
+            else:
+                # permutations and partial orders dropping runs
+                new_orders = [rng.sample(range(len(skeleton.runs)), rng.randint(1, len(skeleton.runs)))
+                              for skeleton in skeletons]
+                for skeleton, new_order in zip(expected, new_orders):
+                    skeleton.reorder_runs(new_order)
+            reorder_tables(tables, new_orders)
+            for table, skeleton in zip(tables, expected):
+                self.assertSameRuns(table, skeleton)
+                self.assertEqual(table.get_runs_heights(), skeleton.get_runs_heights())
+        with self.assertRaises(ValueError):
+            reorder_tables(tables, [[0]])
+
+    def test_view_of_the_runs(self):
+        skeleton = residual_skeleton(2)
+        table = RunTable.from_skeleton(skeleton)
+        run = table.runs[-1]
+        self.assertEqual(run["id"], skeleton.runs[-1]["id"])
+        self.assertEqual(dict(run["inputs"]), skeleton.runs[-1]["inputs"])
+        with self.assertRaises(TypeError):
+            run["inputs"]["X"] = [0, "Y"]
+        with self.assertRaises(IndexError):
+            table.runs[len(skeleton.runs)]
+        # the codes of the strings are shared by the submodels ids and the variables
+        self.assertEqual(len(table.strings), len(set(table.strings)))
+
+    def test_author_reads_the_table(self):
+        logging.disable(logging.INFO)
+        try:
+            author = Author("run_table_model", fresh_copy(residual_skeleton(3)), export=False, forward_slots=True)
+        finally:
+            logging.disable(logging.NOTSET)
+        expected = list(author.full_model())
+        author.graph = RunTable.from_skeleton(author.graph)
+        self.assertEqual(list(author.full_model()), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+from Base.modelskeleton import ModelSkeleton
+from Base.modeltemplate import InputTemplate, OutputTemplate
+from Base.serialization import (SkeletonRecord, NetworkRecord, decode, decode_network, decode_skeleton, encode,
+                                encode_network, encode_skeleton)
+
+import random
+import unittest
+
+from test.fixtures import build_diamonds_network, random_skeleton
+
+
+def links_by_name(network):
+    return sorted((input_layer.name, input_variable.name, layer.name, variable.name)
+                  for layer in network.layers for variable, link in layer.inputs.items() if link is not None
+                  for input_layer, input_variable in [link])
+
+
+class TestSkeletonSerialization(unittest.TestCase):
+    def assertSameSkeleton(self, decoded, skeleton):
+        self.assertEqual(decoded.runs, skeleton.runs)
+        self.assertEqual(decoded.outputs, skeleton.outputs)
+        self.assertEqual(decoded.inputs, skeleton.inputs)
+        self.assertEqual(list(decoded.submodels), list(skeleton.submodels))
+        for name, submodel in skeleton.submodels.items():
+            if submodel is None or isinstance(submodel, dict):
+                self.assertEqual(decoded.submodels[name], submodel)
+            else:
+                self.assertIs(type(decoded.submodels[name]), type(submodel))
+                self.assertEqual(decoded.submodels[name].template_type, submodel.template_type)
+                self.assertEqual(decoded.submodels[name].source, submodel.source)
+                self.assertEqual(decoded.submodels[name]._props, submodel._props)
+
+    def test_random_skeletons(self):
+        rng = random.Random(0)
+        for _ in range(20):
+            skeleton = random_skeleton(rng, rng.randint(1, 40))
+            record = encode_skeleton(skeleton)
+            self.assertSameSkeleton(decode_skeleton(record), skeleton)
+            self.assertSameSkeleton(decode(bytearray(record)), skeleton)
+
+    def test_submodel_kinds(self):
+        skeleton = ModelSkeleton({"in": InputTemplate(), "out": OutputTemplate(), "custom": {"size": [1, 2]},
+                                  "unused": None}, [{"id": "custom", "inputs": {"X": [-1, "x"]}}],
+                                 {"y": [0, "Y"]}, inputs=["x"])
+        self.assertSameSkeleton(decode(encode(skeleton)), skeleton)
+
+    def test_record_in_place(self):
+        skeleton = random_skeleton(random.Random(1), 30)
+        record = SkeletonRecord(memoryview(encode_skeleton(skeleton)))
+        self.assertEqual(record.n_runs, len(skeleton.runs))
+        self.assertEqual(record.n_submodels, len(skeleton.submodels))
+        for run_id, run in enumerate(skeleton.runs):
+            self.assertEqual(record.get_run_model(run_id), run["id"])
+            self.assertEqual(record.get_run(run_id), run)
+            self.assertEqual(len(record.get_run_edges(run_id)), 3 * len(run["inputs"]))
+
+    def test_invalid_records(self):
+        record = encode_skeleton(random_skeleton(random.Random(2), 10))
+        with self.assertRaises(ValueError):
+            SkeletonRecord(b"XXXX" + record[4:])
+        with self.assertRaises(ValueError):
+            NetworkRecord(record)
+        with self.assertRaises(ValueError):
+            SkeletonRecord(record[:4] + (2).to_bytes(4, "little") + record[8:])
+        with self.assertRaises(ValueError):
+            SkeletonRecord(record[:-1])
+        with self.assertRaises(TypeError):
+            encode([])
+
+
+class TestNetworkSerialization(unittest.TestCase):
+    def test_diamonds_network(self):
+        network, _ = build_diamonds_network(20)
+        decoded = decode_network(memoryview(encode_network(network)))
+        # the network keeps its layers in no particular order
+        self.assertEqual(sorted((layer.name, layer.model.name) for layer in decoded.layers),
+                         sorted((layer.name, layer.model.name) for layer in network.layers))
+        self.assertEqual(links_by_name(decoded), links_by_name(network))
+        self.assertEqual(decoded.input_layer.name, network.input_layer.name)
+        self.assertEqual(decoded.output_layer.name, network.output_layer.name)
+        for model, expected in zip(decoded.models, network.models):
+            self.assertIs(type(model), type(expected))
+            self.assertEqual([(variable.name, variable.dimension, variable.data_type)
+                              for variable in model.input_variables + model.output_variables],
+                             [(variable.name, variable.dimension, variable.data_type)
+                              for variable in expected.input_variables + expected.output_variables])
+        # the decoded objects are new objects
+        self.assertFalse({layer.hash for layer in decoded.layers} & {layer.hash for layer in network.layers})
+
+    def test_record_in_place(self):
+        network, _ = build_diamonds_network(3)
+        record = NetworkRecord(encode(network))
+        self.assertEqual(record.n_layers, len(network.layers))
+        self.assertEqual(record.n_models, len(network.models))
+        self.assertEqual(record.layers_names[record.input_layer], "input_layer")
+        self.assertEqual(record.layers_names[record.output_layer], "output_layer")
+        self.assertEqual(len(record.links), len(links_by_name(network)))
+
+
+if __name__ == "__main__":
+    unittest.main()
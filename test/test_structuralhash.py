@@ -0,0 +1,142 @@
+from Base.modelproperties import ModelParameters
+from Base.modelskeleton import ModelSkeleton
+from Base.structuralhash import SkeletonDeduplicator, structural_hash
+
+import copy
+import random
+import unittest
+
+from test.fixtures import LINEAR_PROPS, make_template, random_dag_skeleton
+
+
+TYPES = ["Linear", "Add", "Concat"]
+
+
+def typed_skeleton(rng, n_runs):
+    skeleton = random_dag_skeleton(rng, n_runs)
+    skeleton.submodels = {name: {"type": rng.choice(TYPES), "source": "basic_templates"}
+                          for name in skeleton.submodels}
+    return skeleton
+
+
+def shuffled(rng, skeleton):
+    """
+    :return: An equivalent skeleton, with the runs in another order and the submodels renamed.
+    """
+    order = list(range(len(skeleton.runs)))
+    rng.shuffle(order)
+    position = {run_id: new_id for new_id, run_id in enumerate(order)}
+    names = list(skeleton.submodels)
+    rng.shuffle(names)
+    renaming = {name: f"renamed_{i}" for i, name in enumerate(names)}
+
+    runs = []
+    for run_id in order:
+        run = copy.deepcopy(skeleton.runs[run_id])
+        run["id"] = renaming[run["id"]]
+        for source in run["inputs"].values():
+            if source[0] != -1:
+                source[0] = position[source[0]]
+        runs.append(run)
+    submodels = {renaming[name]: skeleton.submodels[name] for name in names}
+    outputs = {name: [position[output[0]], output[1]] for name, output in skeleton.outputs.items()}
+    return ModelSkeleton(submodels, runs, outputs, inputs=list(skeleton.inputs))
+
+
+def skeleton(runs, submodels, output):
+    return ModelSkeleton({name: {"type": type, "source": "basic_templates"} for name, type in submodels.items()},
+                         runs, {"y": [output, "Y"]}, inputs=["x"])
+
+
+class TestStructuralHash(unittest.TestCase):
+    def test_invariant_to_order_and_names(self):
+        rng = random.Random(0)
+        for _ in range(50):
+            original = typed_skeleton(rng, rng.randint(1, 25))
+            self.assertEqual(structural_hash(shuffled(rng, original)), structural_hash(original))
+
+    def test_structural_changes(self):
+        rng = random.Random(1)
+        for _ in range(50):
+            original = typed_skeleton(rng, rng.randint(2, 25))
+            changed = copy.deepcopy(original)
+            change = rng.randrange(3)
+            if change == 0:
+                name = rng.choice(changed.runs)["id"]
+                changed.submodels[name]["type"] = "Other"
+            elif change == 1:
+                changed.outputs["y"][1] = "Z"
+            else:
+                changed.runs[0]["inputs"]["extra"] = [-1, "x"]
+            self.assertNotEqual(structural_hash(changed), structural_hash(original))
+
+    def test_shared_submodels(self):
+        separate = skeleton([{"id": "a", "inputs": {"X": [-1, "x"]}},
+                             {"id": "b", "inputs": {"X": [0, "Y"]}}], {"a": "Linear", "b": "Linear"}, 1)
+        shared = skeleton([{"id": "a", "inputs": {"X": [-1, "x"]}},
+                           {"id": "a", "inputs": {"X": [0, "Y"]}}], {"a": "Linear"}, 1)
+        self.assertNotEqual(structural_hash(separate), structural_hash(shared))
+
+    def test_sharing_across_branches(self):
+        # two branches of two Linear runs merged by an Add: the same links, but the submodels are shared by the runs
+        # at the same depth of the branches or crosswise
+        def branches(first, second):
+            runs = [{"id": first[0], "inputs": {"X": [-1, "x"]}}, {"id": first[1], "inputs": {"X": [0, "Y"]}},
+                    {"id": second[0], "inputs": {"X": [-1, "x"]}}, {"id": second[1], "inputs": {"X": [2, "Y"]}},
+                    {"id": "c", "inputs": {"X1": [1, "Y"], "X2": [3, "Y"]}}]
+            return skeleton(runs, {"a": "Linear", "b": "Linear", "c": "Add"}, 4)
+
+        self.assertEqual(structural_hash(branches("ab", "ab")), structural_hash(branches("ba", "ba")))
+        self.assertNotEqual(structural_hash(branches("ab", "ab")), structural_hash(branches("ab", "ba")))
+
+    def test_template_properties(self):
+        def linear(output_dim):
+            props = copy.deepcopy(LINEAR_PROPS)
+            props["parameters"]["output_dim"]["default"] = output_dim
+            return ModelSkeleton({"linear": make_template(props)}, [{"id": "linear", "inputs": {"X": [-1, "x"]}}],
+                                 {"y": [0, "Y"]}, inputs=["x"])
+
+        # the skeletons only differ by the default of a parameter of their template
+        small, large = linear(4), linear(64)
+        self.assertNotEqual(ModelParameters(linear(4)).get_global_defaults(),
+                            ModelParameters(linear(64)).get_global_defaults())
+        self.assertNotEqual(structural_hash(small), structural_hash(large))
+        # solving the parameters completes the properties of the templates in place, the hash does not change
+        before = structural_hash(small)
+        ModelParameters(small)
+        self.assertEqual(structural_hash(small), before)
+        self.assertEqual(structural_hash(small), structural_hash(linear(4)))
+
+    def test_cycle(self):
+        cycle = skeleton([{"id": "a", "inputs": {"X": [1, "Y"]}}, {"id": "b", "inputs": {"X": [0, "Y"]}}],
+                         {"a": "Linear", "b": "Linear"}, 1)
+        with self.assertRaises(ValueError):
+            structural_hash(cycle)
+
+    def test_shared_parent(self):
+        # same tree unfolding, but one parent run feeds both inputs instead of two parallel runs
+        parallel = skeleton([{"id": "a", "inputs": {"X": [-1, "x"]}},
+                             {"id": "b", "inputs": {"X": [-1, "x"]}},
+                             {"id": "c", "inputs": {"X1": [0, "Y"], "X2": [1, "Y"]}}],
+                            {"a": "Linear", "b": "Linear", "c": "Add"}, 2)
+        shared = skeleton([{"id": "a", "inputs": {"X": [-1, "x"]}},
+                           {"id": "c", "inputs": {"X1": [0, "Y"], "X2": [0, "Y"]}}],
+                          {"a": "Linear", "c": "Add"}, 1)
+        self.assertNotEqual(structural_hash(parallel), structural_hash(shared))
+
+    def test_deduplicator(self):
+        rng = random.Random(2)
+        originals = [typed_skeleton(rng, 10) for _ in range(10)]
+        population = originals + [shuffled(rng, original) for original in originals]
+        rng.shuffle(population)
+        deduplicator = SkeletonDeduplicator()
+        unique = deduplicator.filter(population)
+        self.assertEqual(len(unique), len({structural_hash(original) for original in originals}))
+        self.assertEqual(deduplicator.duplicates, len(population) - len(unique))
+        self.assertIn(originals[0], deduplicator)
+        self.assertIsNotNone(deduplicator.get_representative(shuffled(rng, originals[0])))
+        self.assertFalse(deduplicator.check_add(shuffled(rng, originals[1])))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+from Base.templatecache import TemplateRegistry, freeze, thaw
+from Base.modeltemplate import ModelTemplate
+from Base.Network.LayerModel import TemplatedModel
+
+import json
+import os
+import tempfile
+import unittest
+
+LINEAR_TEMPLATE = "src/basic_templates/Linear.json"
+
+PYTHON_TEMPLATE = '''import torch
+"""
+BEGIN_PROPS
+{props}
+END_PROPS
+"""
+'''
+
+
+class TestTemplateRegistry(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.registry = TemplateRegistry()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write_template(self, name, props):
+        path = os.path.join(self.directory.name, name)
+        with open(path, "w") as file:
+            if name.endswith(".json"):
+                json.dump(props, file)
+            else:
+                file.write(PYTHON_TEMPLATE.format(props=json.dumps(props)))
+        return path
+
+    def test_parsed_once(self):
+        first = self.registry.get(LINEAR_TEMPLATE)
+        second = self.registry.get(os.path.abspath(LINEAR_TEMPLATE))
+        self.assertIs(first, second)
+        self.assertEqual(self.registry.parsed, 1)
+        self.assertEqual(first["variables"]["X"]["IO"], "in")
+
+    def test_frozen(self):
+        props = self.registry.get(LINEAR_TEMPLATE)
+        with self.assertRaises(TypeError):
+            props["name"] = "other"
+        with self.assertRaises(TypeError):
+            props["parameters"]["input_dim"]["type"] = "float"
+        self.assertEqual(thaw(freeze({"a": [1, {"b": 2}]})), {"a": [1, {"b": 2}]})
+
+    def test_invalidated_on_change(self):
+        path = self.write_template("Model.py", {"name": "Model", "parameters": {}})
+        self.assertEqual(self.registry.get(path)["name"], "Model")
+        self.write_template("Model.py", {"name": "ChangedModel", "parameters": {}})
+        self.assertEqual(self.registry.get(path)["name"], "ChangedModel")
+        self.assertEqual(self.registry.parsed, 2)
+
+    def test_mutable_copies_are_independent(self):
+        template = ModelTemplate("Linear", "basic_templates", LINEAR_TEMPLATE)
+        other_template = ModelTemplate("Linear", "basic_templates", LINEAR_TEMPLATE)
+        template.properties["parameters"]["virtual_param"] = {"type": "int"}
+        self.assertNotIn("virtual_param", other_template.properties["parameters"])
+
+    def test_templated_models_share_props(self):
+        first = TemplatedModel("first", LINEAR_TEMPLATE)
+        second = TemplatedModel("second", LINEAR_TEMPLATE)
+        self.assertIs(first._props, second._props)
+        self.assertEqual([variable.name for variable in first.input_variables], ["X"])
+
+    def test_disk_cache(self):
+        self.write_template("Linear.json", {"name": "Linear", "parameters": {}})
+        self.write_template("Model.py", {"name": "Model", "parameters": {"p": {"type": "int"}}})
+        self.write_template("helpers.py", {})
+        with open(os.path.join(self.directory.name, "helpers.py"), "w") as file:
+            file.write("import torch\n")
+        cache_file = os.path.join(self.directory.name, "cache", "templates")
+
+        self.registry.warm_from_cache(cache_file, [self.directory.name])
+        self.assertEqual(self.registry.parsed, 2)
+        self.assertTrue(os.path.exists(cache_file))
+
+        worker_registry = TemplateRegistry()
+        worker_registry.warm_from_cache(cache_file, [self.directory.name])
+        self.assertEqual(worker_registry.parsed, 0)
+        props = worker_registry.get(os.path.join(self.directory.name, "Model.py"))
+        self.assertEqual(props["parameters"]["p"]["type"], "int")
+        self.assertEqual(worker_registry.parsed, 0)
+
+    def test_missing_cache(self):
+        self.assertFalse(self.registry.load(os.path.join(self.directory.name, "missing")))
+
+
+if __name__ == "__main__":
+    unittest.main()